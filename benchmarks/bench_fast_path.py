@@ -0,0 +1,50 @@
+"""Caminho determinístico (fast_path.py) sobre o corpus sintético: taxa de acerto, motivos e tempo.
+
+Para cada layout e tipo de extrato, tenta montar o resultado sem o LLM e mostra
+quanto tempo isso levou por documento e, quando o documento iria para o crew,
+por quê (página sem texto, data sem ano, sem totais para conferir...).
+
+Uso:
+    python benchmarks/bench_fast_path.py [--pages 5] [--kinds native mixed]
+"""
+import argparse
+import time
+from collections import Counter
+
+from synthetic_corpus import KINDS, LAYOUTS, generate_statement
+
+from quartavia_ocr.categorizer import MerchantCategorizer
+from quartavia_ocr.fast_path import FastPathSettings, try_fast_path
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=["native", "mixed"])
+    parser.add_argument("--layouts", nargs="+", choices=sorted(LAYOUTS), default=sorted(LAYOUTS))
+    args = parser.parse_args(argv)
+
+    settings = FastPathSettings()
+    categorizer = MerchantCategorizer(memo_path=None)
+    hits, reasons = 0, Counter()
+    for layout in args.layouts:
+        for kind in args.kinds:
+            source, _ = generate_statement(kind, args.pages, layout)
+            start = time.perf_counter()
+            outcome = try_fast_path(source, settings, categorizer)
+            elapsed = time.perf_counter() - start
+            if outcome.result is not None:
+                hits += 1
+                verdict = f"OK, {outcome.result.transactions_count} transações ({', '.join(outcome.checks)})"
+            else:
+                reasons[outcome.reason] += 1
+                verdict = f"crew: {outcome.reason}" + (f" ({outcome.detail})" if outcome.detail else "")
+            print(f"{layout:9s} {kind:7s} {elapsed * 1000:8.1f} ms  {verdict}")
+
+    total = hits + sum(reasons.values())
+    print(f"\ntaxa de acerto: {hits}/{total}  motivos: {dict(reasons.most_common())}")
+    return {"hits": hits, "documents": total, "fallback_reasons": dict(reasons)}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Tempo de importação (python -X importtime) dos pontos de entrada e dos workers.
+
+Cada módulo é importado num interpretador novo, como numa invocação de CLI ou
+no spawn de um worker. Também lista as dependências pesadas que acabaram
+carregadas (crewai, openai, fitz, agentops) e falha se algum módulo do
+orçamento passar do limite.
+
+Uso:
+    python benchmarks/bench_import_time.py [--budget 1.0]
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+HEAVY_MODULES = ("crewai", "openai", "litellm", "fitz", "agentops")
+
+# Devem subir bem abaixo de um segundo: CLIs, serviço e workers do pool nativo
+BUDGETED_MODULES = [
+    "quartavia_ocr.main",
+    "quartavia_ocr.batch",
+    "quartavia_ocr.service",
+    "quartavia_ocr.tools.native_extraction",
+    "quartavia_ocr.tools.extraction_cache",
+    "quartavia_ocr.categorizer",
+]
+# Importam o crewAI por definição; medidos só como referência
+REFERENCE_MODULES = ["quartavia_ocr.tools.custom_tool", "quartavia_ocr.crew"]
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)\s*$')
+
+
+def measure_import(module: str) -> tuple[float, list[str]]:
+    """(segundos cumulativos da importação, dependências pesadas carregadas)."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, check=True)
+    micros = 0
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match and match.group(2) == module:
+            micros = int(match.group(1))
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return micros / 1e6, heavy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=float, default=1.0, help="Limite em segundos por módulo do orçamento")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in BUDGETED_MODULES + REFERENCE_MODULES:
+        seconds, heavy = measure_import(module)
+        budgeted = module in BUDGETED_MODULES
+        if budgeted and (seconds > args.budget or heavy):
+            over_budget.append(module)
+        flag = "" if not budgeted else ("  ESTOUROU" if module in over_budget else "  ok")
+        print(f"{module:42s} {seconds * 1000:8.1f} ms  pesados={','.join(heavy) or '-'}{flag}")
+    if over_budget:
+        sys.exit(f"Fora do orçamento de {args.budget:.1f}s: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Micro-benchmark: LineClassifier pré-compilado vs. filtro original linha a linha.
+
+Uso:
+    python benchmarks/bench_line_classifier.py [--pages 200] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+from quartavia_ocr.tools.text_filters import DEFAULT_CLASSIFIER, legacy_clean_and_filter_lines
+
+SAMPLE_LINES = [
+    "{d:02d}/10/2025   PIX ENVIADO {name}                          R$ {v},{c:02d}",
+    "{d:02d}/10/2025   COMPRA CARTAO DEB SUPERMERCADO {name}         -{v},{c:02d}",
+    "{d:02d} de outubro de 2025   POSTO SHELL {name}   R$ {v},{c:02d}",
+    "      Saldo do dia                                    {v}.{c:02d}",
+    "Total da fatura R$ {v},{c:02d}",
+    "Ouvidoria 0800 727 9933  SAC 0800 704 8383",
+    "Caso o pagamento seja feito após o vencimento, serão cobrados juros",
+    "23790.12345 60000.123456 78901.234567 8 {v}{c:02d}0000010000",
+    "5234********{v:04d}",
+    "{name} {name} {name}",
+    "",
+    "   ",
+    "Pontos Loop creditados em {d:02d}/10",
+    "TED RECEBIDA {name} {v},{c:02d}",
+]
+NAMES = ["ACME LTDA", "JOAO DA SILVA", "MERCADO CENTRAL", "SPOTIFY", "UBER TRIP", "DROGASIL"]
+
+
+def synthetic_page_lines(rng: random.Random, lines_per_page: int = 80) -> list[str]:
+    return [
+        rng.choice(SAMPLE_LINES).format(
+            d=rng.randint(1, 28), v=rng.randint(1, 9999), c=rng.randint(0, 99), name=rng.choice(NAMES)
+        )
+        for _ in range(lines_per_page)
+    ]
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    pages = [synthetic_page_lines(rng) for _ in range(args.pages)]
+    total_lines = sum(len(p) for p in pages)
+
+    legacy_out = [legacy_clean_and_filter_lines(p) for p in pages]
+    compiled_out = ["\n".join(DEFAULT_CLASSIFIER.filter_lines(p)) for p in pages]
+    assert legacy_out == compiled_out, "LineClassifier divergiu do filtro original"
+
+    legacy = best_of(args.repeat, lambda: [legacy_clean_and_filter_lines(p) for p in pages])
+    compiled = best_of(args.repeat, lambda: [DEFAULT_CLASSIFIER.filter_lines(p) for p in pages])
+
+    print(f"{args.pages} páginas / {total_lines} linhas")
+    print(f"original : {legacy * 1000:8.1f} ms  ({total_lines / legacy:,.0f} linhas/s)")
+    print(f"compilado: {compiled * 1000:8.1f} ms  ({total_lines / compiled:,.0f} linhas/s)")
+    print(f"speedup  : {legacy / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Extração nativa por página: motor de leitura única ('singlepass') x cadeia de tentativas ('chain').
+
+Páginas densas (extrato sintético nativo), esparsas (poucas linhas de texto) e
+sem texto (páginas-imagem). Confere que os dois motores devolvem as mesmas linhas
+e mede o tempo por página e o pico de memória do Python (tracemalloc) ao percorrer
+o documento, com e sem liberar o cache de cada página.
+
+Uso:
+    python benchmarks/bench_native_engine.py [--pages 10] [--repeat 3]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import fitz
+import pdfplumber
+from synthetic_corpus import generate_statement
+
+from quartavia_ocr.tools.native_extraction import extract_page_lines_chain, extract_page_lines_single_pass
+
+ENGINES = {"chain": extract_page_lines_chain, "singlepass": extract_page_lines_single_pass}
+
+
+def sparse_statement(pages: int) -> bytes:
+    """Páginas quase vazias: um cabeçalho e um lançamento, como nas últimas páginas de uma fatura."""
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), "FATURA DO CARTÃO - CONTINUAÇÃO", fontsize=10)
+        page.insert_text((72, 100), f"{n % 28 + 1:02d}/10/2025  ANUIDADE PARC {n + 1}/12  R$ 35,90", fontsize=10)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def run_pages(source: bytes, engine, release: bool = True) -> list:
+    results = []
+    with pdfplumber.open(io.BytesIO(source)) as pdf:
+        for page in pdf.pages:
+            results.append(engine(page))
+            if release:
+                page.close()
+    return results
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = {
+        "densa": generate_statement("native", args.pages, "bradesco")[0],
+        "esparsa": sparse_statement(args.pages),
+        "sem texto": generate_statement("image", args.pages, "bradesco", image_dpi=72)[0],
+    }
+    for name, source in cases.items():
+        assert run_pages(source, ENGINES["chain"]) == run_pages(source, ENGINES["singlepass"]), name
+        timings = {engine: best_of(args.repeat, lambda e=fn: run_pages(source, e)) for engine, fn in ENGINES.items()}
+        print(f"{name:10s} " + "  ".join(f"{engine}: {seconds / args.pages * 1000:7.2f} ms/pág"
+                                         for engine, seconds in timings.items())
+              + f"  ({timings['chain'] / timings['singlepass']:.1f}x)")
+
+    source = cases["densa"]
+    kept = peak_memory_mb(lambda: run_pages(source, ENGINES["singlepass"], release=False))
+    released = peak_memory_mb(lambda: run_pages(source, ENGINES["singlepass"], release=True))
+    print(f"pico de memória ({args.pages} páginas densas): {kept:.1f} MB sem page.close(), "
+          f"{released:.1f} MB liberando cada página")
+
+
+if __name__ == "__main__":
+    main()
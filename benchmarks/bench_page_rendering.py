@@ -0,0 +1,87 @@
+"""Bytes por página e tempo de renderização: PNG colorido 2x (original) vs. pipeline adaptativo.
+
+Sem --pdf, usa um extrato sintético (páginas com texto vetorial e uma página
+"escaneada"). Com --pdf, mede um documento real, para calibrar formato e
+qualidade por banco (variáveis OCR_RENDER_*).
+
+Uso:
+    python benchmarks/bench_page_rendering.py [--pdf extrato.pdf] [--pages 10]
+"""
+import argparse
+import io
+import time
+
+import fitz
+from PIL import Image
+
+from quartavia_ocr.tools.page_rendering import RenderSettings, format_render_report, render_pages
+
+CONFIGS = {
+    "auto (padrão)": RenderSettings(),
+    "jpeg q70": RenderSettings(image_format="jpeg", quality=70),
+    "jpeg q50": RenderSettings(image_format="jpeg", quality=50),
+    "webp q60": RenderSettings(image_format="webp", quality=60),
+    "png cinza": RenderSettings(image_format="png"),
+    "auto sem corte": RenderSettings(trim=False),
+}
+
+
+def synthetic_statement(pages: int) -> bytes:
+    doc = fitz.open()
+    for n in range(pages - 1):
+        page = doc.new_page()
+        page.insert_text((40, 40), "EXTRATO CONTA CORRENTE - BANCO EXEMPLO", fontsize=12)
+        for i in range(45):
+            page.insert_text((40, 70 + i * 16), f"{i % 28 + 1:02d}/10/2025  PIX ENVIADO FORNECEDOR {n}-{i}"
+                             f"{' ' * 20}R$ {i * 13 % 997},{i % 100:02d}", fontsize=8)
+    scan = doc.new_page(width=612, height=792)
+    buffer = io.BytesIO()
+    Image.effect_noise((1275, 1650), 25).point(lambda v: 200 + v // 5).save(buffer, format="PNG")
+    scan.insert_image(scan.rect, stream=buffer.getvalue())
+    scan.insert_text((72, 100), "05/10/2025 COMPRA CARTAO RECIBO ESCANEADO R$ 77,00", fontsize=11, render_mode=3)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def legacy_render(source: bytes) -> tuple[int, float]:
+    start = time.perf_counter()
+    total = 0
+    with fitz.open(stream=source, filetype="pdf") as doc:
+        for page in doc:
+            total += len(page.get_pixmap(matrix=fitz.Matrix(2, 2)).tobytes("png"))
+    return total, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf", help="PDF real a medir (padrão: extrato sintético)")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--report", action="store_true", help="Mostra o relatório por página da configuração padrão")
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            source = f.read()
+    else:
+        source = synthetic_statement(args.pages)
+    with fitz.open(stream=source, filetype="pdf") as doc:
+        page_count = len(doc)
+
+    legacy_bytes, legacy_seconds = legacy_render(source)
+    print(f"{page_count} páginas")
+    print(f"{'original (png 2x)':18s} {legacy_bytes / 1024 / page_count:8.1f} KB/página "
+          f"{legacy_seconds * 1000 / page_count:7.1f} ms/página")
+    for name, settings in CONFIGS.items():
+        start = time.perf_counter()
+        pages = render_pages(source, settings=settings)
+        seconds = time.perf_counter() - start
+        total = sum(p.bytes for p in pages)
+        print(f"{name:18s} {total / 1024 / page_count:8.1f} KB/página {seconds * 1000 / page_count:7.1f} ms/página "
+              f"({legacy_bytes / total:.1f}x menor)")
+    if args.report:
+        print(format_render_report(render_pages(source)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Pico de memória (RSS) do OCR por página em função do tamanho do documento.
+
+Cada medida roda num processo novo (o pico de RSS é do processo): gera um extrato
+só de imagens com N páginas, faz o OCR com uma API falsa (sem rede) e mede o pico
+de RSS durante a extração. Com a janela de streaming (QUARTAVIA_STREAM_WINDOW) o
+pico fica estável quando N cresce; com a janela do tamanho do documento (como era
+antes: todas as páginas renderizadas antes da primeira chamada) ele cresce com N.
+
+Uso:
+    python benchmarks/bench_stream_memory.py [--sizes 10 40 80] [--window 4]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB no Linux
+
+
+def measure_in_process(pages: int, window: int) -> dict:
+    """Executado no processo filho: devolve o pico de RSS antes e depois da extração."""
+    from synthetic_corpus import generate_statement
+
+    from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+
+    def create(model, messages, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content="05/10/2025 PIX ENVIADO FULANO R$ 10,00"))])
+
+    source, _ = generate_statement("image", pages, "bradesco", image_dpi=100)
+    tool = PDFToOCRTool(cache=None, max_pages_in_memory=window)
+    tool.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    tool.model_name = "fake-model"
+    # Aquece importações e a primeira renderização para medir só o que cresce com o documento
+    tool._extract_from_source(generate_statement("image", 1, "bradesco", image_dpi=100)[0])
+    before = _peak_rss_mb()
+    pages_done = sum(1 for page in tool.iter_pages(source) if page.error is None)
+    return {"pages": pages, "window": window, "pages_ok": pages_done,
+            "baseline_mb": round(before, 1), "peak_mb": round(_peak_rss_mb(), 1),
+            "growth_mb": round(_peak_rss_mb() - before, 1)}
+
+
+def measure(pages: int, window: int) -> dict:
+    """Mede num processo novo (sem herdar o pico de RSS de quem chama)."""
+    code = (f"import json, sys; sys.path.insert(0, {HERE!r}); import bench_stream_memory as b; "
+            f"print(json.dumps(b.measure_in_process({pages}, {window})))")
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> list[dict]:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 40, 80])
+    parser.add_argument("--window", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for pages in args.sizes:
+        for label, window in (("janela", args.window), ("documento inteiro", pages)):
+            row = measure(pages, window)
+            rows.append(row)
+            print(f"{pages:4d} páginas, {label:17s}: pico {row['peak_mb']:7.1f} MB (+{row['growth_mb']:.1f} MB)")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
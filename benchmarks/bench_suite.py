@@ -0,0 +1,229 @@
+"""Suíte de benchmarks reprodutível sobre o corpus sintético (synthetic_corpus.py).
+
+Para cada combinação de tipo (native/image/mixed), layout e nº de páginas,
+mede por estágio o tempo, as páginas por segundo e o pico de RSS:
+    native      NativePDFExtractorTool (pdfplumber + filtro), sem cache
+    filter      clean_and_filter_lines sobre as linhas desenhadas no documento
+    ocr_render  renderização das páginas do PDFToOCRTool
+    ocr_api     OCR das páginas com um cliente falso (latência configurável)
+    ocr_filter  filtro do texto devolvido pelo OCR
+    condense    condensação (text_condenser) do texto bruto com layout das páginas nativas,
+                com os tokens antes/depois
+O resultado vai para um JSON (metadados da máquina e do commit + uma linha por
+caso e estágio); com --compare, mostra a variação de páginas/s contra uma
+execução anterior.
+
+Uso:
+    python benchmarks/bench_suite.py [--sizes 1,10,100] [--kinds native,image,mixed] [--layouts bradesco,inter]
+    python benchmarks/bench_suite.py --sizes 1,10,100,500 -o resultados.json --compare benchmarks/results/anterior.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import psutil
+
+from synthetic_corpus import KINDS, LAYOUTS, generate_statement
+
+STAGES = ("native", "filter", "ocr_render", "ocr_api", "ocr_filter", "condense")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class PeakRSS:
+    """Amostra o RSS do processo numa thread enquanto o bloco roda."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRSS":
+        self.baseline = self.peak = self.process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+class StubCompletions:
+    """Cliente OpenAI falso: devolve linhas de transação plausíveis após `latency` segundos."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        text = "\n".join(f"{d:02d}/10/2025 COMPRA SUPERMERCADO CENTRAL R$ {d * 7},{d:02d}" for d in range(1, 41))
+        text += "\nOuvidoria 0800 727 9933  SAC 0800 704 8383"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def _make_ocr_tool(latency: float):
+    from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tool = PDFToOCRTool(cache=None)
+    tool.client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions(latency)))
+    tool._client_pending = False
+    tool.model_name = "stub"
+    return tool
+
+
+def _measure(stage: str, pages: int, fn) -> tuple[dict, object]:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), PeakRSS() as rss:
+        start = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - start
+    return {
+        "stage": stage,
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(pages / seconds, 2) if seconds > 0 else None,
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+        "rss_growth_mb": round((rss.peak - rss.baseline) / 2**20, 1),  # acima do RSS no início do estágio
+    }, value
+
+
+def run_case(kind: str, layout: str, pages: int, stages=STAGES, ocr_latency: float = 0.0, seed: int = 0) -> list[dict]:
+    """Gera um documento e mede os estágios pedidos; uma linha por estágio."""
+    from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool
+    from quartavia_ocr.tools.text_filters import clean_and_filter_lines
+
+    generate_start = time.perf_counter()
+    source, page_lines = generate_statement(kind, pages, layout, seed)
+    case = {"kind": kind, "layout": layout, "pages": pages, "pdf_kb": round(len(source) / 1024, 1),
+            "generate_seconds": round(time.perf_counter() - generate_start, 3)}
+
+    rows = []
+    if "native" in stages:
+        tool = NativePDFExtractorTool(cache=None)
+        rows.append(_measure("native", pages, lambda: tool._extract_from_source(source))[0])
+    if "filter" in stages:
+        rows.append(_measure("filter", pages, lambda: [clean_and_filter_lines(lines) for lines in page_lines])[0])
+    if any(stage.startswith("ocr_") for stage in stages):
+        ocr_tool = _make_ocr_tool(ocr_latency)
+        row, rendered = _measure("ocr_render", pages, lambda: ocr_tool._render_pages(source))
+        row["kb_per_page"] = round(sum(p.bytes for p in rendered) / 1024 / max(pages, 1), 1)
+        rows.append(row)
+        row, results = _measure("ocr_api", pages, lambda: ocr_tool._ocr_pages(rendered))
+        row["failed_pages"] = sum(1 for _, error in results if error)
+        rows.append(row)
+        text_lines = [line for text, _ in results if text for line in text.split("\n")]
+        rows.append(_measure("ocr_filter", pages, lambda: ocr_tool._clean_and_filter(text_lines))[0])
+    if "condense" in stages:
+        from quartavia_ocr.tools.native_extraction import extract_page_lines
+        from quartavia_ocr.tools.document_fetcher import open_pdfplumber
+        from quartavia_ocr.tools.text_condenser import CondenseSettings, condense
+
+        with open_pdfplumber(source) as pdf:
+            raw = "\n".join(f"--- PÁGINA {i + 1} (BRUTO) ---\n" + "\n".join(extract_page_lines(page) or [])
+                            for i, page in enumerate(pdf.pages))
+        row, condensed = _measure("condense", pages, lambda: condense(raw, CondenseSettings(token_budget=0)))
+        row.update(tokens_before=condensed.tokens_before, tokens_after=condensed.tokens_after,
+                   token_counter=condensed.counter)
+        rows.append(row)
+    return [{**case, **row} for row in rows if row["stage"] in stages]
+
+
+def _git_commit() -> str | None:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return proc.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(sizes, kinds=KINDS, layouts=tuple(LAYOUTS), stages=STAGES, ocr_latency: float = 0.0,
+              seed: int = 0) -> dict:
+    results = []
+    for kind in kinds:
+        for layout in layouts:
+            for pages in sizes:
+                rows = run_case(kind, layout, pages, stages, ocr_latency, seed)
+                for row in rows:
+                    print(f"{kind:6s} {layout:9s} {pages:4d}p {row['stage']:10s} {row['seconds'] * 1000:9.1f} ms "
+                          f"{row['pages_per_second'] or 0:9.1f} pág/s {row['peak_rss_mb']:7.1f} MB")
+                results.extend(rows)
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": list(sizes), "kinds": list(kinds), "layouts": list(layouts), "stages": list(stages),
+            "ocr_latency": ocr_latency, "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, previous: dict) -> list[str]:
+    """Variação de páginas/s por caso e estágio presentes nas duas execuções."""
+    def key(row):
+        return row["kind"], row["layout"], row["pages"], row["stage"]
+
+    before = {key(row): row for row in previous["results"]}
+    lines = []
+    for row in current["results"]:
+        old = before.get(key(row))
+        if old and old.get("pages_per_second") and row.get("pages_per_second"):
+            ratio = row["pages_per_second"] / old["pages_per_second"]
+            lines.append(f"{' '.join(map(str, key(row)))}: {old['pages_per_second']} -> {row['pages_per_second']} "
+                         f"pág/s ({ratio:.2f}x) RSS {old['peak_rss_mb']} -> {row['peak_rss_mb']} MB")
+    return lines
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100", help="Nº de páginas dos documentos (até 500)")
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--ocr-latency", type=float, default=0.0, help="Latência simulada por chamada de OCR (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON de saída (padrão: benchmarks/results/suite-<data>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    report = run_suite([int(s) for s in _csv(args.sizes)], _csv(args.kinds), _csv(args.layouts), _csv(args.stages),
+                       args.ocr_latency, args.seed)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"suite-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Resultados em {output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print("\n".join(compare(report, json.load(f))))
+    return report
+
+
+if __name__ == "__main__":
+    main()
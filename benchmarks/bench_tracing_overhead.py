@@ -0,0 +1,56 @@
+"""Custo da instrumentação: extração nativa + filtro com o tracing desligado, em memória e em JSONL.
+
+Uso:
+    python benchmarks/bench_tracing_overhead.py [--pages 10] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic_corpus import generate_statement
+
+from quartavia_ocr import tracing
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source, _ = generate_statement("native", args.pages, "bradesco")
+    tool = NativePDFExtractorTool(cache=None)
+    trace_path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+
+    def extract():
+        tool._extract_from_source(source)
+
+    # Chamadas de span() por página: o custo do caminho desligado, isolado
+    calls = 100_000
+    tracing.configure(None)
+    noop_ns = best_of(args.repeat, lambda: [tracing.span("filter", lines_in=1).__enter__() for _ in range(calls)])
+    print(f"span() desligado: {noop_ns / calls * 1e9:.0f} ns/chamada")
+
+    baseline = None
+    for name, sink in (("desligado", None), ("memória", tracing.MemorySink()), ("jsonl", "jsonl")):
+        tracing.configure(sink, path=trace_path)
+        seconds = best_of(args.repeat, extract)
+        baseline = baseline or seconds
+        print(f"{name:10s} {seconds * 1000:8.1f} ms ({args.pages / seconds:6.1f} pág/s, "
+              f"{(seconds / baseline - 1) * 100:+5.1f}%)")
+    tracing.configure(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Extratos sintéticos (PyMuPDF) para os benchmarks: texto nativo, só imagem ou mistos.
+
+Cada layout imita um formato de banco (colunas Crédito/Débito/Saldo, fatura de
+cartão, data abreviada, valor com sinal) com cabeçalho, linhas de transação e o
+rodapé de ruído (SAC, ouvidoria, avisos) que o filtro precisa descartar. A
+geração é determinística pela seed, para que execuções diferentes meçam o mesmo
+documento.
+
+Uso:
+    python benchmarks/synthetic_corpus.py --kind mixed --layout bradesco --pages 50 -o extrato.pdf
+"""
+import argparse
+import random
+from dataclasses import dataclass
+
+import fitz
+
+KINDS = ("native", "image", "mixed")
+MONTHS = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
+MERCHANTS = ["SUPERMERCADO CENTRAL", "POSTO SHELL", "DROGASIL", "UBER TRIP", "SPOTIFY", "IFOOD", "AMAZON MARKETPLACE",
+             "LATAM AIRLINES", "PADARIA BOM PAO", "NETFLIX.COM", "MERCADO LIVRE", "LOJAS RENNER"]
+PEOPLE = ["JOAO DA SILVA", "MARIA SOUZA", "ACME LTDA", "FULANO DE TAL", "CONDOMINIO EDIF SOL"]
+FOOTER = [
+    "Ouvidoria 0800 727 9933  SAC 0800 704 8383  Deficiente auditivo 0800 722 0099",
+    "Caso o pagamento seja feito após o vencimento, serão cobrados juros e multa.",
+    "Os lançamentos estão sujeitos a confirmação. Consulte as condições no site.",
+]
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+@dataclass
+class Layout:
+    """Como um banco desenha a página: título, cabeçalho de colunas e as células de cada linha."""
+    name: str
+    title: str
+    columns: list[tuple[float, str]]  # (x, título) do cabeçalho; vazio para layouts sem cabeçalho
+    rows_per_page: int = 40
+    font_size: float = 8
+
+    def row_cells(self, rng: random.Random, day: int, balance: float) -> tuple[list[tuple[float, str]], float]:
+        raise NotImplementedError
+
+
+class ColumnsLayout(Layout):
+    """Conta corrente com colunas Crédito / Débito / Saldo (estilo Bradesco)."""
+
+    def row_cells(self, rng, day, balance):
+        credit = rng.random() < 0.3
+        value = round(rng.uniform(5, 3000 if credit else 800), 2)
+        balance += value if credit else -value
+        description = f"PIX RECEBIDO {rng.choice(PEOPLE)}" if credit else f"COMPRA {rng.choice(MERCHANTS)}"
+        return [(40, f"{day:02d}/10/2025"), (110, description), (330 if credit else 410, _money(value)),
+                (490, _money(balance))], balance
+
+
+class CardLayout(Layout):
+    """Fatura de cartão: data por extenso, valor com R$ e parcelas (estilo Inter)."""
+
+    def row_cells(self, rng, day, balance):
+        value = round(rng.uniform(5, 900), 2)
+        description = rng.choice(MERCHANTS)
+        if rng.random() < 0.2:
+            total = rng.randint(2, 12)
+            description += f" PARC {rng.randint(1, total)}/{total}"
+        return [(40, f"{day:02d} de out. 2025"), (150, description), (450, f"R$ {_money(value)}")], balance
+
+
+class ShortDateLayout(Layout):
+    """Data abreviada e valor sem símbolo (estilo Nubank)."""
+
+    def row_cells(self, rng, day, balance):
+        value = round(rng.uniform(5, 600), 2)
+        return [(40, f"{day:02d} {MONTHS[9].upper()}"), (100, rng.choice(MERCHANTS)), (470, _money(value))], balance
+
+
+class SignedLayout(Layout):
+    """Lançamentos com sinal e linhas de saldo do dia (estilo Itaú)."""
+
+    def row_cells(self, rng, day, balance):
+        if rng.random() < 0.1:
+            return [(40, f"{day:02d}/10"), (100, "SALDO DO DIA"), (470, _money(balance))], balance
+        credit = rng.random() < 0.25
+        value = round(rng.uniform(5, 2500), 2)
+        balance += value if credit else -value
+        description = f"TED RECEBIDA {rng.choice(PEOPLE)}" if credit else f"PAG BOLETO {rng.choice(MERCHANTS)}"
+        return [(40, f"{day:02d}/10"), (100, description), (470, ("" if credit else "-") + _money(value))], balance
+
+
+LAYOUTS = {layout.name: layout for layout in (
+    ColumnsLayout("bradesco", "BRADESCO - EXTRATO CONTA CORRENTE",
+                  [(40, "Data"), (110, "Histórico"), (330, "Crédito"), (410, "Débito"), (490, "Saldo")]),
+    CardLayout("inter", "Banco Inter - Fatura do cartão", [(40, "Data"), (150, "Estabelecimento"), (450, "Valor")]),
+    ShortDateLayout("nubank", "Nu Pagamentos S.A. - Fatura", []),
+    SignedLayout("itau", "Itaú Unibanco - Extrato mensal", [(40, "data"), (100, "lançamentos"), (470, "valor (R$)")]),
+)}
+
+
+def _draw_page(page, layout: Layout, rng: random.Random, page_number: int, balance: float) -> tuple[list[str], float]:
+    """Desenha uma página e devolve as linhas de texto (na ordem) e o saldo final."""
+    lines = [f"{layout.title}  página {page_number}"]
+    page.insert_text((40, 40), lines[0], fontsize=11)
+    y = 62
+    if layout.columns:
+        for x, title in layout.columns:
+            page.insert_text((x, y), title, fontsize=layout.font_size)
+        lines.append(" ".join(title for _, title in layout.columns))
+        y += 14
+    for i in range(layout.rows_per_page):
+        cells, balance = layout.row_cells(rng, min(28, 1 + (page_number * layout.rows_per_page + i) // 12 % 28), balance)
+        for x, text in cells:
+            page.insert_text((x, y), text, fontsize=layout.font_size)
+        lines.append(" ".join(text for _, text in cells))
+        y += 15
+    for text in FOOTER:
+        page.insert_text((40, y + 10), text, fontsize=6)
+        lines.append(text)
+        y += 10
+    return lines, balance
+
+
+def generate_statement(kind: str, pages: int, layout: str = "bradesco", seed: int = 0,
+                       image_dpi: int = 150) -> tuple[bytes, list[list[str]]]:
+    """PDF sintético e, por página, as linhas de texto desenhadas (a "verdade" de cada página).
+
+    kind: 'native' (texto vetorial), 'image' (cada página é só uma imagem, como um
+    scan) ou 'mixed' (uma a cada três páginas é imagem).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Tipo desconhecido: {kind} (disponíveis: {', '.join(KINDS)})")
+    page_layout = LAYOUTS[layout]
+    rng = random.Random(f"{seed}-{layout}")
+    balance = 1000.0
+    doc = fitz.open()
+    page_lines = []
+    for n in range(pages):
+        as_image = kind == "image" or (kind == "mixed" and n % 3 == 2)
+        if not as_image:
+            lines, balance = _draw_page(doc.new_page(), page_layout, rng, n + 1, balance)
+        else:
+            # Desenha a página num documento à parte e insere só a imagem dela (sem camada de texto)
+            with fitz.open() as scratch:
+                lines, balance = _draw_page(scratch.new_page(), page_layout, rng, n + 1, balance)
+                pix = scratch[0].get_pixmap(dpi=image_dpi, colorspace=fitz.csGRAY)
+            target = doc.new_page()
+            target.insert_image(target.rect, pixmap=pix)
+        page_lines.append(lines)
+    content = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return content, page_lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kind", choices=KINDS, default="native")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="bradesco")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="extrato_sintetico.pdf")
+    args = parser.parse_args()
+
+    content, _ = generate_statement(args.kind, args.pages, args.layout, args.seed)
+    with open(args.output, "wb") as f:
+        f.write(content)
+    print(f"{args.output}: {args.pages} páginas ({args.kind}, {args.layout}), {len(content) / 1024:.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
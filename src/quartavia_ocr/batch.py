@@ -0,0 +1,205 @@
+"""Processamento em lote: um diretório de PDFs ou um manifesto JSONL de caminhos/URLs.
+
+Cada documento roda um crew num pool de workers que vive o lote inteiro (a
+importação do crewAI e a criação das ferramentas acontecem uma vez por worker,
+não uma vez por documento). Cada resultado vira uma linha ExtractionResult no
+JSONL de saída, gravada assim que o documento termina; esse arquivo é também o
+checkpoint: ao reexecutar, os documentos já presentes nele são pulados (com
+--retry-failed, os que falharam são reprocessados e vale a última linha de cada
+documento).
+
+Uso:
+    quartavia_batch uploads/ -o resultados.jsonl -w 4
+    quartavia_batch manifesto.jsonl --retry-failed
+    quartavia_batch uploads/ --chunked   (modo em partes, ver chunked.py)
+
+Antes do crew, cada documento passa pelo caminho determinístico (fast_path.py):
+as estatísticas do lote trazem a taxa de acerto dele e os motivos de desvio.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable
+
+from quartavia_ocr import tracing
+from quartavia_ocr.chunked import process_document_chunked
+from quartavia_ocr.fast_path import run_with_fast_path, summarize_paths
+from quartavia_ocr.models import ExtractionResult
+from quartavia_ocr.tools.ocr_scheduler import PRIORITY_BATCH, ocr_job
+
+
+def default_batch_workers() -> int:
+    """Workers do lote (QUARTAVIA_BATCH_WORKERS, lido a cada uso: o .env só é carregado pelo main)."""
+    return int(os.getenv("QUARTAVIA_BATCH_WORKERS", "4"))
+
+
+def iter_sources(target: str) -> list[str]:
+    """Lista os documentos de um diretório (*.pdf, recursivo) ou de um manifesto JSONL.
+
+    Cada linha do manifesto é um JSON com 'file_path' (ou 'path'/'url'), ou
+    simplesmente o caminho/URL entre aspas. Linhas vazias e duplicadas são ignoradas.
+    """
+    if os.path.isdir(target):
+        sources = []
+        for root, _, files in os.walk(target):
+            sources.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+        return sorted(sources)
+
+    sources = []
+    seen = set()
+    with open(target, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict):
+                entry = entry.get("file_path") or entry.get("path") or entry.get("url")
+            if not isinstance(entry, str) or not entry:
+                raise ValueError(f"Linha {line_number} do manifesto sem caminho/URL: {line}")
+            if entry not in seen:
+                seen.add(entry)
+                sources.append(entry)
+    return sources
+
+
+def load_checkpoint(output_path: str, retry_failed: bool = False) -> set[str]:
+    """Documentos já gravados no JSONL de saída (só os bem-sucedidos se retry_failed)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # última linha cortada por uma interrupção
+            if record.get("source") and (record.get("success") or not retry_failed):
+                done.add(record["source"])
+    return done
+
+
+def kickoff_crew(source: str) -> ExtractionResult:
+    """Roda o crew completo para um documento."""
+    from quartavia_ocr.crew import QuartaviaOcr
+
+    with tracing.span("crew_kickoff", entry="batch"):
+        result = QuartaviaOcr().crew().kickoff(inputs={"file_path": source})
+    return ExtractionResult.from_raw(result.raw or "")
+
+
+def process_document(source: str) -> ExtractionResult:
+    """Caminho determinístico quando os totais do documento batem; senão o crew completo."""
+    return run_with_fast_path(source, kickoff_crew)
+
+
+def _timed(processor: Callable[[str], ExtractionResult], source: str) -> dict:
+    """Executa no worker; nunca levanta, para que uma falha não derrube o lote."""
+    start = time.perf_counter()
+    try:
+        # Cada documento é um job na fila justa do agendador de OCR (com --executor thread, compartilhada)
+        with ocr_job(source, PRIORITY_BATCH):
+            result = processor(source)
+    except Exception as e:
+        result = ExtractionResult.failure(f"{type(e).__name__}: {e}")
+    result.source = source
+    result.elapsed_seconds = round(time.perf_counter() - start, 3)
+    return result.model_dump(mode="json", exclude_none=True)
+
+
+def _warm_up_worker() -> None:
+    # Paga a importação do crewAI uma vez por worker, antes do primeiro documento
+    import quartavia_ocr.crew  # noqa: F401
+
+
+def _make_executor(kind: str, workers: int, warm_up: bool) -> Executor:
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_warm_up_worker if warm_up else None)
+
+
+def summarize(latencies: list[float], failed: int, wall_seconds: float) -> dict:
+    """Vazão do lote e latência por documento (média, p50, p95, máx.)."""
+    stats = {"documents": len(latencies), "failed": failed, "wall_seconds": round(wall_seconds, 3)}
+    if latencies:
+        ordered = sorted(latencies)
+        stats.update(
+            docs_per_minute=round(len(latencies) / wall_seconds * 60, 2) if wall_seconds > 0 else None,
+            latency_mean=round(statistics.fmean(ordered), 3),
+            latency_p50=round(ordered[int(0.50 * (len(ordered) - 1))], 3),
+            latency_p95=round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+            latency_max=round(ordered[-1], 3),
+        )
+    return stats
+
+
+def run_batch(
+    sources: Iterable[str],
+    output_path: str,
+    workers: int | None = None,
+    executor: str = "process",
+    retry_failed: bool = False,
+    processor: Callable[[str], ExtractionResult] = process_document,
+) -> dict:
+    """Processa os documentos ainda não presentes no checkpoint e devolve as estatísticas."""
+    done = load_checkpoint(output_path, retry_failed)
+    pending = [source for source in sources if source not in done]
+    print(f"Lote: {len(pending)} documentos a processar ({len(done)} já no checkpoint).")
+
+    latencies: list[float] = []
+    records: list[dict] = []
+    failed = 0
+    start = time.perf_counter()
+    if pending:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, "a", encoding="utf-8") as out, \
+                _make_executor(executor, max(1, workers or default_batch_workers()),
+                               processor in (process_document, process_document_chunked)) as pool:
+            futures = [pool.submit(_timed, processor, source) for source in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                # Grava e sincroniza a cada documento: uma interrupção perde no máximo os que estavam em curso
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+                latencies.append(record["elapsed_seconds"])
+                records.append(record)
+                failed += 0 if record["success"] else 1
+                print(f"[{len(latencies)}/{len(pending)}] {'OK ' if record['success'] else 'ERRO'} "
+                      f"{record['elapsed_seconds']:.1f}s {record['source']}")
+    return {**summarize(latencies, failed, time.perf_counter() - start), **summarize_paths(records)}
+
+
+def main(argv: list[str] | None = None) -> dict:
+    tracing.load_env()
+    parser = argparse.ArgumentParser(prog="quartavia_batch", description="Processa PDFs em lote com o crew.")
+    parser.add_argument("target", help="Diretório com PDFs ou manifesto JSONL de caminhos/URLs")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="JSONL de saída (um ExtractionResult por documento); também é o checkpoint")
+    parser.add_argument("-w", "--workers", type=int, default=default_batch_workers())
+    parser.add_argument("--executor", choices=("process", "thread"), default="process",
+                        help="Pool de processos (padrão) ou de threads")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Reprocessa documentos que falharam numa execução anterior")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Modo em partes: categoriza faixas de páginas em paralelo e junta o resultado")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    tracing.configure_logging()
+    processor = process_document_chunked if args.chunked else process_document
+    stats = run_batch(iter_sources(args.target), args.output, args.workers, args.executor, args.retry_failed,
+                      processor)
+    print("\n--- ESTATÍSTICAS DO LOTE ---")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Categorizador local de transações (CATEGORIA > Subcategoria).
+
+Compila a taxonomia que está no prompt da tarefa 'tarefa_processamento_completo'
+(config/tasks.yaml) num índice de palavras-chave sobre descrições normalizadas e
+mantém um memo persistente descrição -> (categoria, subcategoria) aprendido das
+saídas anteriores do crew. Comerciantes conhecidos são categorizados localmente;
+só os desconhecidos precisam do LLM.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+
+import yaml
+
+TASKS_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "tasks.yaml")
+DEFAULT_MEMO_PATH = os.path.join(os.path.expanduser("~"), ".cache", "quartavia_ocr", "category_memo.json")
+
+# Palavras dos exemplos do prompt que sozinhas não identificam nada (ou colidem
+# com termos comuns de extrato, como 'POS' de maquininha)
+AMBIGUOUS_KEYWORDS = {
+    "pos", "apps", "app", "banco", "outros", "outras", "presente", "gift", "animal",
+    "extra", "net", "oi", "99", "pao", "tv", "internet", "consulta particular",
+}
+
+_CATEGORY_HEADER_RE = re.compile(r'^\s*([A-Z_]+):\s*$')
+_SUBCATEGORY_RE = re.compile(r'^\s*•\s*(.+?)\s*(?:\(ex:\s*(.*)\))?\s*$')
+
+
+def normalize_description(text: str) -> str:
+    """Minúsculas, sem acentos, sem dígitos/pontuação e com espaços colapsados."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    text = re.sub(r'\b\d+\b', ' ', text)
+    return " ".join(text.split())
+
+
+def parse_taxonomy(description: str) -> list[tuple[str, str, list[str]]]:
+    """Extrai [(categoria, subcategoria, palavras-chave)] do texto do prompt."""
+    taxonomy = []
+    category = None
+    in_subcategories = False
+    for line in description.splitlines():
+        if "SUBCATEGORIAS" in line:
+            in_subcategories = True
+            continue
+        if not in_subcategories:
+            continue
+        if line.strip().startswith("**INSTRUÇÕES"):
+            break
+        header = _CATEGORY_HEADER_RE.match(line)
+        if header:
+            category = header.group(1)
+            continue
+        bullet = _SUBCATEGORY_RE.match(line)
+        if bullet and category:
+            subcategory, examples = bullet.group(1), bullet.group(2) or ""
+            # 'Apps (Netflix, Spotify, Prime, etc)' -> 'Apps', como nas instruções do prompt
+            subcategory = re.sub(r'\s*\(.*\)$', '', subcategory)
+            keywords = [k.strip() for k in examples.split(",") if k.strip()]
+            taxonomy.append((category, subcategory, keywords))
+    return taxonomy
+
+
+def load_taxonomy(tasks_config_path: str = TASKS_CONFIG_PATH) -> list[tuple[str, str, list[str]]]:
+    with open(tasks_config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    return parse_taxonomy(config["tarefa_processamento_completo"]["description"])
+
+
+class MerchantCategorizer:
+    """Índice de palavras-chave + memo aprendido para categorizar descrições."""
+
+    def __init__(self, taxonomy: list[tuple[str, str, list[str]]] | None = None, memo_path: str | None = None):
+        self.taxonomy = taxonomy if taxonomy is not None else load_taxonomy()
+        self.memo_path = memo_path
+        self._lock = threading.Lock()
+        self._memo: dict[str, list[str]] = self._load_memo()
+        # frase normalizada -> (categoria, subcategoria); a primeira ocorrência na taxonomia vence
+        self._index: dict[str, tuple[str, str]] = {}
+        for category, subcategory, keywords in self.taxonomy:
+            for keyword in keywords:
+                phrase = normalize_description(keyword)
+                if phrase and phrase not in AMBIGUOUS_KEYWORDS:
+                    self._index.setdefault(phrase, (category, subcategory))
+        self._max_phrase_words = max((len(p.split()) for p in self._index), default=1)
+
+    def _load_memo(self) -> dict[str, list[str]]:
+        if not self.memo_path or not os.path.exists(self.memo_path):
+            return {}
+        try:
+            with open(self.memo_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_memo(self) -> None:
+        if not self.memo_path:
+            return
+        os.makedirs(os.path.dirname(self.memo_path) or ".", exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.memo_path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._memo, f, ensure_ascii=False)
+        os.replace(tmp_path, self.memo_path)
+
+    def categorize(self, description: str) -> tuple[str, str] | None:
+        """(categoria, subcategoria) ou None quando é preciso perguntar ao LLM."""
+        key = normalize_description(description)
+        if not key:
+            return None
+        memo = self._memo.get(key)
+        if memo:
+            return memo[0], memo[1]
+
+        tokens = key.split()
+        matches: dict[tuple[str, str], int] = {}
+        for n in range(min(self._max_phrase_words, len(tokens)), 0, -1):
+            for start in range(len(tokens) - n + 1):
+                hit = self._index.get(" ".join(tokens[start:start + n]))
+                if hit:
+                    matches[hit] = max(matches.get(hit, 0), n)
+        if not matches:
+            return None
+        best = max(matches.values())
+        winners = [hit for hit, score in matches.items() if score == best]
+        # Empate entre subcategorias diferentes: deixa para o LLM decidir
+        return winners[0] if len(winners) == 1 else None
+
+    def learn(self, description: str, category: str, subcategory: str) -> None:
+        key = normalize_description(description)
+        if key and category and subcategory:
+            with self._lock:
+                self._memo[key] = [category, subcategory]
+
+    def learn_from_result(self, result: dict | str) -> int:
+        """Aprende com um ExtractionResult (dict ou JSON) e persiste o memo. Retorna quantas aprendeu."""
+        if isinstance(result, str):
+            # A saída do agente pode vir cercada de ```json ... ```
+            start, end = result.find("{"), result.rfind("}")
+            try:
+                result = json.loads(result[start:end + 1]) if start != -1 else {}
+            except ValueError:
+                return 0
+        learned = 0
+        for transaction in (result or {}).get("transactions") or []:
+            category, subcategory = transaction.get("categoria"), transaction.get("subcategoria")
+            # 'DIVERSOS > Outros' é o palpite de último caso do LLM, não vale memorizar
+            if category and subcategory and not (category == "DIVERSOS" and subcategory == "Outros"):
+                self.learn(transaction.get("descricao") or "", category, subcategory)
+                learned += 1
+        if learned:
+            with self._lock:
+                self._save_memo()
+        return learned
+
+
+_default_categorizer: MerchantCategorizer | None = None
+_default_lock = threading.Lock()
+
+
+def get_default_categorizer() -> MerchantCategorizer:
+    """Categorizador do processo (memo em QUARTAVIA_CATEGORY_MEMO)."""
+    global _default_categorizer
+    with _default_lock:
+        if _default_categorizer is None:
+            _default_categorizer = MerchantCategorizer(memo_path=os.getenv("QUARTAVIA_CATEGORY_MEMO", DEFAULT_MEMO_PATH))
+        return _default_categorizer
@@ -0,0 +1,302 @@
+"""Modo em partes (map-reduce): o documento é dividido em faixas de páginas e
+cada faixa é categorizada por um crew próprio, em paralelo.
+
+O crew completo (QuartaviaOcr.crew) faz uma única tarefa sequencial sobre o
+documento inteiro: num extrato longo, o contexto do agente cresce com o número
+de páginas e a latência é a de uma só conversa longa. Aqui:
+  1. o texto é extraído uma vez pelo Extrator Híbrido (nativo + OCR só das
+     páginas escaneadas), sem condensação;
+  2. as páginas são agrupadas em partes de QUARTAVIA_CHUNK_PAGES páginas, cada
+     uma condensada dentro do orçamento de tokens. Cada parte (menos a primeira)
+     começa repetindo as últimas QUARTAVIA_CHUNK_OVERLAP_LINES linhas de
+     lançamento da parte anterior, para que uma transação quebrada na virada de
+     página não se perca;
+  3. as partes rodam a tarefa 'tarefa_processamento_parcial' com kickoff_async,
+     no máximo QUARTAVIA_CHUNK_CONCURRENCY ao mesmo tempo;
+  4. as listas de transações são juntadas na ordem das páginas num único
+     ExtractionResult: as linhas repetidas na fronteira (as que vieram da
+     sobreposição) aparecem no fim de uma parte e no começo da seguinte e ficam
+     uma vez só; transactions_count é recalculado.
+
+Uso:
+    quartavia_chunked extrato.pdf
+    quartavia_batch uploads/ --chunked
+"""
+import asyncio
+import logging
+import os
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from quartavia_ocr import tracing
+from quartavia_ocr.fast_path import run_with_fast_path
+from quartavia_ocr.models import ExtractionResult, Transaction
+from quartavia_ocr.tools.text_condenser import (
+    PAGE_MARKER_RE,
+    CondenseSettings,
+    condense_tool_output,
+    is_data_line,
+    page_number,
+    split_pages,
+)
+
+logger = logging.getLogger(__name__)
+
+CONTINUATION_MARKER = "--- CONTINUAÇÃO DA PARTE ANTERIOR ---"
+_UNDETERMINED_TYPES = ("unknown", "other")
+NO_TRANSACTIONS = "Nenhuma transação encontrada no documento"  # mensagem da tarefa para uma parte sem lançamentos
+
+
+@dataclass
+class ChunkSettings:
+    """Parâmetros do modo em partes (variáveis QUARTAVIA_CHUNK_*).
+
+    pages_per_chunk: páginas (com dados) por parte.
+    overlap_lines: linhas de lançamento do fim da parte anterior repetidas no começo da seguinte; 0 desliga
+        a sobreposição e, com ela, a remoção de duplicatas na fronteira.
+    max_concurrency: partes processadas ao mesmo tempo.
+    """
+    pages_per_chunk: int = 8
+    overlap_lines: int = 3
+    max_concurrency: int = 4
+
+    @classmethod
+    def from_env(cls) -> "ChunkSettings":
+        return cls(
+            pages_per_chunk=int(os.getenv("QUARTAVIA_CHUNK_PAGES", "8")),
+            overlap_lines=int(os.getenv("QUARTAVIA_CHUNK_OVERLAP_LINES", "3")),
+            max_concurrency=int(os.getenv("QUARTAVIA_CHUNK_CONCURRENCY", "4")),
+        )
+
+
+@dataclass
+class Chunk:
+    index: int
+    first_page: int | None
+    last_page: int | None
+    text: str
+    overlap_lines: int = 0  # linhas repetidas do fim da parte anterior
+
+    @property
+    def page_range(self) -> str:
+        if self.first_page is None:
+            return "documento inteiro"
+        if self.first_page == self.last_page:
+            return f"página {self.first_page}"
+        return f"páginas {self.first_page} a {self.last_page}"
+
+
+ChunkProcessor = Callable[[Chunk], Awaitable[ExtractionResult]]
+
+
+def split_into_chunks(text: str, pages_per_chunk: int, overlap_lines: int = 0) -> list[Chunk]:
+    """Agrupa as páginas (marcadores '--- ... PÁGINA n ... ---') em partes de pages_per_chunk páginas.
+
+    O que vem antes do primeiro marcador (cabeçalho da ferramenta) vai para a primeira parte;
+    um texto sem marcadores vira uma única parte.
+    """
+    pages = split_pages(text)
+    preamble: list[str] = []
+    if pages and not PAGE_MARKER_RE.match(pages[0][0]):
+        preamble = pages.pop(0)
+    if not pages:
+        return [Chunk(0, None, None, text.strip("\n"))] if text.strip() else []
+
+    chunks = []
+    size = max(1, pages_per_chunk)
+    for start in range(0, len(pages), size):
+        group = pages[start:start + size]
+        lines = [line for page in group for line in page]
+        overlap: list[str] = []
+        if start == 0:
+            lines = preamble + lines
+        elif overlap_lines > 0:
+            previous = [line for line in pages[start - 1] if is_data_line(line) and not PAGE_MARKER_RE.match(line)]
+            overlap = previous[-overlap_lines:]
+            if overlap:
+                lines = [CONTINUATION_MARKER, *overlap, "", *lines]
+        chunks.append(Chunk(len(chunks), page_number(group[0][0]), page_number(group[-1][0]),
+                            "\n".join(lines).strip("\n"), len(overlap)))
+    return chunks
+
+
+def _row_key(transaction: Transaction) -> tuple:
+    return (transaction.data.strip(), " ".join(transaction.descricao.split()).casefold(), round(transaction.valor, 2))
+
+
+def _document_field(results: list[ExtractionResult], field: str, undetermined: tuple[str, ...]) -> str | None:
+    return next((getattr(r, field) for r in results if getattr(r, field) not in undetermined), None)
+
+
+def drop_overlap(previous: list[Transaction], rows: list[Transaction],
+                 window: int) -> tuple[list[Transaction], int]:
+    """Transações de uma parte sem as repetidas da parte anterior (regra de merge_results) e quantas saíram."""
+    if not (window and previous and rows):
+        return rows, 0
+    tail = Counter(_row_key(t) for t in previous[-window:])
+    head = []
+    for transaction in rows[:window]:
+        key = _row_key(transaction)
+        if tail[key]:
+            tail[key] -= 1
+            continue
+        head.append(transaction)
+    return head + rows[window:], min(window, len(rows)) - len(head)
+
+
+def merge_results(results: list[ExtractionResult], overlaps: list[int] | None = None) -> ExtractionResult:
+    """Junta os resultados das partes (na ordem das páginas) num único ExtractionResult.
+
+    overlaps[i] é o número de linhas da parte anterior repetidas no começo da parte i: das
+    primeiras overlaps[i] transações da parte i, as iguais (data, descrição e valor) a uma das
+    últimas overlaps[i] transações da parte anterior são descartadas, cada uma casando com no
+    máximo uma. Repetições dentro de uma mesma parte nunca são removidas: duas compras iguais no
+    mesmo dia são duas transações.
+    """
+    overlaps = overlaps or [0] * len(results)
+    successful = [r for r in results if r.success]
+    if not successful:
+        messages = "; ".join(dict.fromkeys(r.error_message for r in results if r.error_message))
+        return ExtractionResult.failure(messages or NO_TRANSACTIONS)
+
+    transactions: list[Transaction] = []
+    previous: list[Transaction] = []
+    duplicates = 0
+    for result, window in zip(results, overlaps):
+        rows, dropped = drop_overlap(previous, list(result.transactions) if result.success else [], window)
+        duplicates += dropped
+        transactions.extend(rows)
+        previous = rows
+
+    if duplicates:
+        logger.info("Modo em partes: %d transação(ões) repetida(s) na fronteira entre partes removida(s)", duplicates)
+    if not transactions:
+        return ExtractionResult.failure(NO_TRANSACTIONS)
+    # Partes que falharam (e não as que só não tinham lançamentos) ficam registradas no resultado
+    failed = [r.error_message for r in results if not r.success and r.error_message not in (None, NO_TRANSACTIONS)]
+    return ExtractionResult(
+        success=True,
+        bank_name=_document_field(successful, "bank_name", ("TBD", "", None)) or "TBD",
+        document_type=_document_field(successful, "document_type", _UNDETERMINED_TYPES)
+        or successful[0].document_type,
+        transactions_count=len(transactions),
+        transactions=transactions,
+        error_message="; ".join(failed) or None,
+    )
+
+
+def prepare_chunks(text: str, settings: ChunkSettings, condense_settings: CondenseSettings | None = None) -> list[Chunk]:
+    """Divide o texto extraído em partes e condensa cada uma (o orçamento de tokens vale por parte)."""
+    chunks = split_into_chunks(text, settings.pages_per_chunk, settings.overlap_lines)
+    if condense_settings is not None:
+        for chunk in chunks:
+            chunk.text = condense_tool_output(chunk.text, condense_settings)
+    return chunks
+
+
+async def kickoff_chunk(chunk: Chunk) -> ExtractionResult:
+    """Processador padrão: roda o crew de uma parte (QuartaviaOcr.chunk_crew)."""
+    from quartavia_ocr.crew import QuartaviaOcr
+
+    output = await QuartaviaOcr().chunk_crew().kickoff_async(
+        inputs={"document_text": chunk.text, "page_range": chunk.page_range})
+    return ExtractionResult.from_raw(output.raw or "")
+
+
+async def _run_chunk(chunk: Chunk, processor: ChunkProcessor, semaphore: asyncio.Semaphore) -> ExtractionResult:
+    async with semaphore:
+        with tracing.span("crew_chunk", chunk=chunk.index, first_page=chunk.first_page,
+                          last_page=chunk.last_page) as span:
+            try:
+                result = await processor(chunk)
+            except Exception as e:
+                logger.error("Parte %d (%s) falhou: %s", chunk.index + 1, chunk.page_range, e)
+                result = ExtractionResult.failure(f"{chunk.page_range}: {type(e).__name__}: {e}")
+            span.set("success", result.success)
+            span.add("chunk_transactions", len(result.transactions))
+            return result
+
+
+async def aprocess_chunks(chunks: list[Chunk], processor: ChunkProcessor = kickoff_chunk,
+                          max_concurrency: int = 4) -> list[ExtractionResult]:
+    """Processa as partes em paralelo (no máximo max_concurrency por vez), na ordem das páginas.
+
+    A falha de uma parte vira um ExtractionResult de erro; as demais seguem.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    return list(await asyncio.gather(*(_run_chunk(chunk, processor, semaphore) for chunk in chunks)))
+
+
+async def aiter_chunks(chunks: list[Chunk], processor: ChunkProcessor = kickoff_chunk,
+                       max_concurrency: int = 4) -> AsyncIterator[tuple[Chunk, ExtractionResult]]:
+    """Como aprocess_chunks, mas entrega cada parte, na ordem das páginas, assim que ela e as anteriores terminam."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    tasks = [asyncio.ensure_future(_run_chunk(chunk, processor, semaphore)) for chunk in chunks]
+    try:
+        for chunk, task in zip(chunks, tasks):
+            yield chunk, await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def arun_chunked(file_path: str, settings: ChunkSettings | None = None,
+                       processor: ChunkProcessor = kickoff_chunk, extractor: Any = None) -> ExtractionResult:
+    """Extrai, divide, processa as partes em paralelo e junta o resultado de um documento."""
+    settings = settings or ChunkSettings.from_env()
+    if extractor is None:
+        from quartavia_ocr.tools.custom_tool import HybridPDFExtractorTool
+
+        extractor = HybridPDFExtractorTool()
+    text = await asyncio.to_thread(extractor.extract_full_text, file_path)
+    if not text or text.startswith("Erro"):
+        return ExtractionResult.failure(text or "Nenhum texto extraído do documento")
+
+    chunks = prepare_chunks(text, settings, extractor.condense_settings)
+    logger.info("Modo em partes: %d parte(s) de até %d página(s)", len(chunks), settings.pages_per_chunk)
+    results = await aprocess_chunks(chunks, processor, settings.max_concurrency)
+    return merge_results(results, [chunk.overlap_lines for chunk in chunks])
+
+
+def process_document_chunked(source: str) -> ExtractionResult:
+    """Processador de documento (mesma assinatura do batch.process_document) no modo em partes.
+
+    Como no crew completo, o caminho determinístico (fast_path.py) vem antes.
+    """
+    return run_with_fast_path(source, _run_chunked_crew)
+
+
+def _run_chunked_crew(source: str) -> ExtractionResult:
+    with tracing.span("crew_kickoff", entry="chunked"):
+        result = asyncio.run(arun_chunked(source))
+    learn_categories(result)
+    return result
+
+
+def learn_categories(result: ExtractionResult) -> None:
+    """Memoriza as categorias do resultado já juntado (o @after_kickoff do crew completo não roda no modo em partes)."""
+    if not result.success:
+        return
+    from quartavia_ocr.categorizer import get_default_categorizer
+
+    try:
+        get_default_categorizer().learn_from_result(result.model_dump(mode="json"))
+    except Exception as e:
+        logger.warning("Não foi possível atualizar o memo de categorias: %s", e)
+
+
+def main(argv: list[str] | None = None) -> ExtractionResult:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        raise SystemExit("Uso: quartavia_chunked <arquivo.pdf ou URL>")
+    tracing.load_env()
+    tracing.configure_logging()
+    result = process_document_chunked(argv[0])
+    print(result.model_dump_json(indent=2, exclude_none=True))
+    return result
+
+
+if __name__ == "__main__":
+    main()
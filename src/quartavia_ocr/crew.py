@@ -1,28 +1,38 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, agent, crew, task, after_kickoff
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
 # https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
 
-import sys
+import logging
 import os
+import threading
 
-# diretório raiz do projeto
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, project_root)
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool, PDFToOCRTool, HybridPDFExtractorTool, StructuredRowExtractorTool, LocalCategorizerTool
+from quartavia_ocr import tracing
+from quartavia_ocr.categorizer import get_default_categorizer
+from quartavia_ocr.replay import build_crew_llm
 
-from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool, PDFToOCRTool
-import agentops
-import os
-from dotenv import load_dotenv
+logger = logging.getLogger(__name__)
+
+_telemetry_initialized = False
+_telemetry_lock = threading.Lock()
+
+
+def init_telemetry() -> None:
+    """Inicializa o agentops uma vez por processo, na primeira montagem do crew (não na importação)."""
+    global _telemetry_initialized
+    with _telemetry_lock:
+        if _telemetry_initialized:
+            return
+        _telemetry_initialized = True
+        import agentops
 
-pdf_tool = NativePDFExtractorTool()
+        tracing.load_env()
+        agentops.init(api_key=os.getenv("AGENTOPS_API_KEY"))
 
-_=load_dotenv()
-AGENTOPS_API_KEY = os.getenv("AGENTOPS_API_KEY")
-agentops.init(api_key=AGENTOPS_API_KEY)
 
 @CrewBase
 class QuartaviaOcr():
@@ -40,9 +50,13 @@ class QuartaviaOcr():
 
     @agent
     def agente_processador_financeiro(self) -> Agent:
+        pdf_tool = NativePDFExtractorTool()
+        ocr_tool = PDFToOCRTool()
         return Agent(
             config=self.agents_config['agente_processador_financeiro'],
-            tools=[pdf_tool, PDFToOCRTool()],
+            tools=[pdf_tool, ocr_tool, HybridPDFExtractorTool(native_tool=pdf_tool, ocr_tool=ocr_tool),
+                   StructuredRowExtractorTool(), LocalCategorizerTool()],
+            llm=build_crew_llm(),  # None: LLM padrão do crewAI; com QUARTAVIA_REPLAY, passa pelas gravações
             verbose=True
         )
 
@@ -52,11 +66,21 @@ class QuartaviaOcr():
             config=self.tasks_config['tarefa_processamento_completo'],
         )
 
+    @after_kickoff
+    def aprender_categorias(self, result):
+        """Memoriza as categorias do resultado para as próximas execuções."""
+        try:
+            get_default_categorizer().learn_from_result(result.raw)
+        except Exception as e:
+            logger.warning("Não foi possível atualizar o memo de categorias: %s", e)
+        return result
+
     @crew
     def crew(self) -> Crew:
         """Creates the QuartaviaOcr crew"""
         # To learn how to add knowledge sources to your crew, check out the documentation:
         # https://docs.crewai.com/concepts/knowledge#what-is-knowledge
+        init_telemetry()
 
         return Crew(
             agents=self.agents, # Automatically created by the @agent decorator
@@ -65,3 +89,24 @@ class QuartaviaOcr():
             verbose=True
             # process=Process.hierarchical, # In case you wanna use that instead https://docs.crewai.com/how-to/Hierarchical/
         )
+
+    def chunk_crew(self) -> Crew:
+        """Crew de uma parte do documento (modo em partes, ver chunked.py).
+
+        O texto já chega extraído em {document_text}; o agente só tem o Categorizador
+        Local. Sem @crew/@task: não entra no crew completo nem no @after_kickoff (o
+        memo de categorias aprende uma vez, com o resultado já juntado).
+        """
+        init_telemetry()
+        categorizador = Agent(
+            config=self.agents_config['agente_processador_financeiro'],
+            tools=[LocalCategorizerTool()],
+            llm=build_crew_llm(),
+            verbose=True
+        )
+        return Crew(
+            agents=[categorizador],
+            tasks=[Task(config=self.tasks_config['tarefa_processamento_parcial'], agent=categorizador)],
+            process=Process.sequential,
+            verbose=True
+        )
@@ -0,0 +1,403 @@
+"""Caminho determinístico: monta o ExtractionResult sem o LLM quando os totais batem.
+
+Num PDF nativo limpo, o agente basicamente redigita linhas que já estão no texto
+extraído. Aqui:
+  1. as linhas de transação saem do extrator por coordenadas (table_extractor),
+     numa única leitura do PDF; a data vira YYYY-MM-DD e o parcelamento ("1/12",
+     "PARC 3/6", "PARCELA 1 DE 12", "(3/9)", como em config/tasks.yaml) é lido
+     da descrição;
+  2. a soma das linhas é conferida com os totais do próprio documento:
+       - "Total da fatura": despesas - receitas = total - saldo anterior (se houver);
+       - "Saldo anterior" e "Saldo atual/final": saldo anterior + receitas - despesas = saldo atual;
+       - saldo por linha (coluna Saldo): cada saldo = saldo da linha anterior +/- o valor.
+     Sozinho, só vale se todas as linhas tiverem saldo e a corrente começar no saldo
+     anterior: uma linha sem saldo quebra a corrente e esconderia uma transação perdida;
+  3. a categoria vem do Categorizador Local; comerciante que ele não conhece é
+     trabalho do LLM, então o documento vai para o crew.
+O crew só roda quando alguma conferência falha, quando não há totais para conferir,
+quando algum comerciante não tem categoria local ou quando as linhas não puderam
+ser interpretadas (página sem texto nativo, data sem ano). O resultado registra o caminho (extraction_path) e o motivo do desvio
+para o crew (fallback_reason); o lote resume a taxa de acerto e os motivos.
+
+Desligue com QUARTAVIA_FAST_PATH=0.
+"""
+import datetime
+import logging
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from quartavia_ocr import tracing
+from quartavia_ocr.models import ExtractionResult, Transaction
+from quartavia_ocr.tools.document_fetcher import PDFSource, download_pdf, is_url
+from quartavia_ocr.tools.document_session import DocumentRun, document_run, page_lock, session_for, use_pdfplumber
+from quartavia_ocr.tools.table_extractor import (
+    BankLayout,
+    TransactionRow,
+    detect_layout,
+    extract_page_rows,
+    page_text,
+    parse_amount,
+)
+
+logger = logging.getLogger(__name__)
+
+PATH_DETERMINISTIC = "deterministico"
+PATH_CREW = "crew"
+
+# Motivos de desvio para o crew (categorias fixas, para a contagem do lote; o detalhe vai para o log)
+REASON_DISABLED = "caminho determinístico desligado"
+REASON_UNREADABLE = "documento ilegível"
+REASON_NO_TEXT = "página sem texto nativo"
+REASON_NO_ROWS = "nenhuma linha de transação"
+REASON_BAD_DATE = "data não interpretada"
+REASON_NO_TOTALS = "sem totais para conferir"
+REASON_AMBIGUOUS_TOTALS = "totais ambíguos no documento"
+REASON_MISMATCH = "totais não conferem"
+REASON_INCOMPLETE_CHAIN = "saldo por linha incompleto"
+REASON_UNCATEGORIZED = "comerciante sem categoria local"
+
+MONTHS = {"jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+          "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12}
+_NUMERIC_DATE_RE = re.compile(r'^(\d{2})/(\d{2})(?:/(\d{2}|\d{4}))?$')
+_TEXT_DATE_RE = re.compile(r'^(\d{2})\s+(?:de\s+)?([a-zç]{3})[a-zç]*\.?(?:\s+(?:de\s+)?(\d{4}))?$', re.IGNORECASE)
+_FULL_DATE_RE = re.compile(r'\b(\d{2})/(\d{2})/(\d{4})\b')
+
+_INSTALLMENT_WORD_RE = re.compile(r'\bparc(?:ela)?\.?\s*(\d{1,2})\s*(?:/|de)\s*(\d{1,2})\b', re.IGNORECASE)
+_INSTALLMENT_FRACTION_RE = re.compile(r'(?<![\d/])\(?(\d{1,2})/(\d{1,2})\)?(?![\d/])')
+
+_TOTAL_RE = re.compile(r'total\s+(?:da|desta)\s+fatura|valor\s+total\s+(?:da\s+fatura|a\s+pagar)|total\s+a\s+pagar')
+_OPENING_RE = re.compile(r'saldo\s+anterior')
+_CLOSING_RE = re.compile(r'saldo\s+(?:atual|final)')
+_AMOUNT_IN_LINE_RE = re.compile(r'\(?-?\s*(?:R\$\s*)?-?\d{1,3}(?:\.\d{3})*,\d{2}\)?[DC]?')
+
+_CARD_KEYWORDS = ("fatura", "cartão", "cartao", "card")
+_ACCOUNT_KEYWORDS = ("extrato", "conta corrente", "poupança", "poupanca")
+
+
+@dataclass
+class FastPathSettings:
+    """Parâmetros do caminho determinístico (variáveis QUARTAVIA_FAST_PATH*).
+
+    tolerance: diferença máxima (em reais) aceita ao conferir somas com os totais do documento.
+    """
+    enabled: bool = True
+    tolerance: float = 0.01
+
+    @classmethod
+    def from_env(cls) -> "FastPathSettings":
+        return cls(
+            enabled=os.getenv("QUARTAVIA_FAST_PATH", "1") not in ("0", "false", "False"),
+            tolerance=float(os.getenv("QUARTAVIA_FAST_PATH_TOLERANCE", "0.01")),
+        )
+
+
+@dataclass
+class StatementTotals:
+    """Totais impressos no documento (cada um pode aparecer em mais de uma página)."""
+    invoice_total: set[float] = field(default_factory=set)
+    opening_balance: set[float] = field(default_factory=set)
+    closing_balance: set[float] = field(default_factory=set)
+
+
+@dataclass
+class FastPathOutcome:
+    """result preenchido quando o caminho determinístico resolveu; senão reason (e detail) dizem por quê."""
+    result: ExtractionResult | None = None
+    reason: str | None = None
+    detail: str = ""
+    checks: list[str] = field(default_factory=list)  # conferências que passaram
+    pages: list[int] = field(default_factory=list)  # página de cada transação do result
+
+
+def _near_date(day: int, month: int, date: str) -> bool:
+    """dd/mm a até 31 dias da data da transação (data da compra, vencimento do boleto)."""
+    reference = datetime.date.fromisoformat(date)
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            candidate = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        if abs((candidate - reference).days) <= 31:
+            return True
+    return False
+
+
+def parse_installments(description: str, date: str | None = None) -> tuple[int, int] | None:
+    """(parcela atual, total de parcelas) de descrições como 'LOJA PARC 3/6' ou 'CURSO 01/12'.
+
+    Com a data da transação (YYYY-MM-DD), um 'dd/mm' solto perto dela é data, não parcela.
+    """
+    for regex in (_INSTALLMENT_WORD_RE, _INSTALLMENT_FRACTION_RE):
+        for match in regex.finditer(description):
+            current, total = int(match.group(1)), int(match.group(2))
+            if not (1 <= current <= total and total >= 2):
+                continue
+            if (regex is _INSTALLMENT_FRACTION_RE and date and not match.group(0).startswith("(")
+                    and len(match.group(1)) == len(match.group(2)) == 2 and _near_date(current, total, date)):
+                continue
+            return current, total
+    return None
+
+
+def reference_date(text: str) -> tuple[int, int] | None:
+    """(ano, mês) da data completa mais recente do documento (vencimento, fechamento, lançamentos)."""
+    dates = [(int(y), int(m)) for _, m, y in _FULL_DATE_RE.findall(text) if 1 <= int(m) <= 12]
+    return max(dates) if dates else None
+
+
+def normalize_date(text: str, reference: tuple[int, int] | None) -> str | None:
+    """Data do extrato em YYYY-MM-DD. Sem ano, usa o ano da referência (o anterior se o mês for posterior a ela)."""
+    text = " ".join(text.split())
+    match = _NUMERIC_DATE_RE.match(text)
+    if match:
+        day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+    else:
+        match = _TEXT_DATE_RE.match(text)
+        if not match or match.group(2).lower() not in MONTHS:
+            return None
+        day, month, year = int(match.group(1)), MONTHS[match.group(2).lower()], match.group(3)
+    if year is not None:
+        year = int(year) + (2000 if len(year) == 2 else 0)
+    elif reference is not None:
+        year = reference[0] - (1 if month > reference[1] else 0)
+    else:
+        return None
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _line_amount(line: str) -> float | None:
+    """Último valor monetário da linha, com sinal."""
+    matches = _AMOUNT_IN_LINE_RE.findall(line)
+    if not matches:
+        return None
+    parsed = parse_amount(re.sub(r'\s+', '', matches[-1]))
+    return round(parsed[0] * parsed[1], 2) if parsed else None
+
+
+def find_totals(text: str) -> StatementTotals:
+    """Lê 'Total da fatura', 'Saldo anterior' e 'Saldo atual/final' das linhas do texto."""
+    totals = StatementTotals()
+    for line in text.split("\n"):
+        lowered = line.lower()
+        if _TOTAL_RE.search(lowered) and "anterior" not in lowered:
+            target = totals.invoice_total
+        elif _OPENING_RE.search(lowered):
+            target = totals.opening_balance
+        elif _CLOSING_RE.search(lowered):
+            target = totals.closing_balance
+        else:
+            continue
+        amount = _line_amount(line)
+        if amount is not None:
+            target.add(amount)
+    return totals
+
+
+def detect_document_type(first_page_text: str) -> str:
+    """Mesma regra da tarefa: FATURA/CARTÃO -> fatura de cartão, EXTRATO/CONTA CORRENTE -> extrato."""
+    lowered = first_page_text.lower()
+    if any(keyword in lowered for keyword in _CARD_KEYWORDS):
+        return "credit-card-statement"
+    if any(keyword in lowered for keyword in _ACCOUNT_KEYWORDS):
+        return "extrato"
+    return "other"
+
+
+def _signed(row: TransactionRow) -> float:
+    return row.valor if row.tipo == "receita" else -row.valor
+
+
+def reconcile(rows: list[TransactionRow], totals: StatementTotals,
+              tolerance: float) -> tuple[list[str], str | None, str]:
+    """Confere as linhas com os totais. Devolve (conferências que passaram, motivo, detalhe); motivo None se tudo bateu."""
+    for name, values in (("total da fatura", totals.invoice_total), ("saldo anterior", totals.opening_balance),
+                         ("saldo atual", totals.closing_balance)):
+        if len(values) > 1:
+            return [], REASON_AMBIGUOUS_TOTALS, f"{name} {sorted(values)}"
+
+    def close(a: float, b: float) -> bool:
+        return abs(a - b) <= tolerance + 1e-9
+
+    net = round(sum(_signed(row) for row in rows), 2)  # receitas - despesas
+    opening = next(iter(totals.opening_balance), None)
+    checks = []
+    if totals.invoice_total:
+        total = next(iter(totals.invoice_total))
+        expected = round(total - (opening or 0.0), 2)
+        if not close(-net, expected):
+            return checks, REASON_MISMATCH, f"despesas - receitas = {-net:.2f}, fatura indica {expected:.2f}"
+        checks.append("total da fatura")
+    if opening is not None and totals.closing_balance:
+        closing = next(iter(totals.closing_balance))
+        if not close(opening + net, closing):
+            return checks, REASON_MISMATCH, f"saldo anterior {opening:.2f} + movimento {net:.2f} != saldo atual {closing:.2f}"
+        checks.append("saldo anterior/atual")
+
+    previous = opening
+    chained = 0
+    for row in rows:
+        if row.saldo is None:
+            previous = None
+            continue
+        if previous is not None:
+            if not close(previous + _signed(row), row.saldo):
+                return checks, REASON_MISMATCH, (f"saldo da linha '{row.descricao}' (página {row.page}) "
+                                                 f"{row.saldo:.2f} != {previous + _signed(row):.2f}")
+            chained += 1
+        previous = row.saldo
+    # A corrente só prova que nenhuma linha ficou de fora se cobre todas, a partir do saldo anterior
+    if opening is not None and chained == len(rows):
+        checks.append(f"saldo por linha ({chained})")
+    if not checks:
+        if chained:
+            return checks, REASON_INCOMPLETE_CHAIN, f"{chained} de {len(rows)} linha(s) encadeada(s)"
+        return checks, REASON_NO_TOTALS, ""
+    return checks, None, ""
+
+
+def build_result(rows: list[TransactionRow], dates: list[str], categories: list[tuple[str, str]],
+                 document_type: str, bank_name: str = "") -> ExtractionResult:
+    transactions = []
+    for row, date, (category, subcategory) in zip(rows, dates, categories):
+        installments = parse_installments(row.descricao, date)
+        transactions.append(Transaction(
+            data=date, descricao=row.descricao, valor=round(row.valor, 2), categoria=category, tipo=row.tipo,
+            subcategoria=subcategory, parcelado=installments is not None,
+            numero_parcelas=installments[0] if installments else None,
+            total_parcelas=installments[1] if installments else None,
+        ))
+    return ExtractionResult(success=True, bank_name=bank_name or "TBD", document_type=document_type,
+                            transactions_count=len(transactions), transactions=transactions,
+                            extraction_path=PATH_DETERMINISTIC)
+
+
+def _read_document(source: PDFSource) -> tuple[list[TransactionRow], list[str], str | None, BankLayout | None]:
+    """Linhas estruturadas, texto de cada página, página sem texto (se houver) e layout, numa só abertura do PDF."""
+    session = session_for(source)
+    with use_pdfplumber(source) as pdf:
+        rows: list[TransactionRow] = []
+        texts: list[str] = []
+        layout, columns = None, None
+        with page_lock(pdf):
+            page_count = len(pdf.pages)
+        for i in range(page_count):
+            with page_lock(pdf):
+                page = pdf.pages[i]
+                if not page.chars:
+                    return rows, texts, f"página {i + 1}", layout
+                text = page_text(page, i, session)
+                layout = layout or detect_layout(text)
+                page_rows, columns = extract_page_rows(page, i + 1, layout, columns)
+                page.close()
+            texts.append(text)
+            rows.extend(page_rows)
+    return rows, texts, None, layout
+
+
+def try_fast_path(source: PDFSource, settings: FastPathSettings | None = None, categorizer=None) -> FastPathOutcome:
+    """Tenta montar o resultado sem o LLM (source: caminho local ou bytes do PDF)."""
+    settings = settings or FastPathSettings.from_env()
+    if not settings.enabled:
+        return FastPathOutcome(reason=REASON_DISABLED)
+    with tracing.span("fast_path") as span:
+        outcome = _try(source, settings, categorizer)
+        span.set("hit", outcome.result is not None)
+        if outcome.result is None:
+            span.set("reason", outcome.reason)
+            tracing.count("fast_path_fallbacks")
+        else:
+            span.add("fast_path_transactions", outcome.result.transactions_count)
+            tracing.count("fast_path_hits")
+    return outcome
+
+
+def _try(source: PDFSource, settings: FastPathSettings, categorizer) -> FastPathOutcome:
+    try:
+        rows, texts, image_page, layout = _read_document(source)
+    except Exception as e:
+        return FastPathOutcome(reason=REASON_UNREADABLE, detail=f"{type(e).__name__}: {e}")
+    if image_page:
+        return FastPathOutcome(reason=REASON_NO_TEXT, detail=image_page)
+    if not rows:
+        return FastPathOutcome(reason=REASON_NO_ROWS)
+
+    full_text = "\n".join(texts)
+    reference = reference_date(full_text)
+    dates = [normalize_date(row.data, reference) for row in rows]
+    if None in dates:
+        row = rows[dates.index(None)]
+        return FastPathOutcome(reason=REASON_BAD_DATE, detail=f"'{row.data}' na página {row.page}")
+
+    checks, reason, detail = reconcile(rows, find_totals(full_text), settings.tolerance)
+    if reason:
+        return FastPathOutcome(reason=reason, detail=detail, checks=checks)
+
+    if categorizer is None:
+        from quartavia_ocr.categorizer import get_default_categorizer
+
+        categorizer = get_default_categorizer()
+    categories = [categorizer.categorize(row.descricao) for row in rows]
+    if None in categories:
+        row = rows[categories.index(None)]
+        return FastPathOutcome(reason=REASON_UNCATEGORIZED, detail=f"'{row.descricao}' na página {row.page}",
+                               checks=checks)
+    result = build_result(rows, dates, categories, detect_document_type(texts[0]), layout.bank_name)
+    return FastPathOutcome(result=result, checks=checks, pages=[row.page for row in rows])
+
+
+def attempt_fast_path(run: DocumentRun, file_path: str, settings: FastPathSettings) -> FastPathOutcome:
+    """try_fast_path sobre o documento da sessão de run (que o crew, se rodar, reaproveita)."""
+    if not settings.enabled:
+        return FastPathOutcome(reason=REASON_DISABLED)
+    session = run.session(file_path)
+    if session is None:
+        detail = "falha no download" if is_url(file_path) else "arquivo não encontrado"
+        return FastPathOutcome(reason=REASON_UNREADABLE, detail=detail)
+    return try_fast_path(session.content, settings)
+
+
+def run_with_fast_path(file_path: str, crew_processor: Callable[[str], ExtractionResult],
+                       settings: FastPathSettings | None = None,
+                       download: Callable[[str], bytes | None] = download_pdf) -> ExtractionResult:
+    """Resultado determinístico quando os totais batem; senão roda crew_processor(file_path).
+
+    O resultado registra extraction_path e, quando o crew rodou, fallback_reason. Tudo roda numa
+    execução de document_session: o crew reaproveita os bytes, o PDF aberto e o texto das páginas.
+    """
+    settings = settings or FastPathSettings.from_env()
+    with document_run(download=download) as run:
+        outcome = attempt_fast_path(run, file_path, settings)
+        if outcome.result is not None:
+            logger.info("Caminho determinístico: %d transação(ões), conferidas por %s",
+                        outcome.result.transactions_count, ", ".join(outcome.checks))
+            return outcome.result
+        if outcome.reason != REASON_DISABLED:
+            logger.info("Caminho determinístico desviado para o crew (%s%s)", outcome.reason,
+                        f": {outcome.detail}" if outcome.detail else "")
+        result = crew_processor(file_path)
+    result.extraction_path = PATH_CREW
+    result.fallback_reason = outcome.reason
+    return result
+
+
+def summarize_paths(records: Iterable[dict]) -> dict:
+    """Taxa de acerto do caminho determinístico e contagem dos motivos de desvio (registros do lote)."""
+    paths = Counter()
+    reasons = Counter()
+    for record in records:
+        path = record.get("extraction_path")
+        if path:
+            paths[path] += 1
+        if path == PATH_CREW and record.get("fallback_reason") not in (None, REASON_DISABLED):
+            reasons[record["fallback_reason"]] += 1
+    attempted = paths[PATH_DETERMINISTIC] + sum(reasons.values())
+    if not attempted:
+        return {}
+    return {"fast_path_hits": paths[PATH_DETERMINISTIC],
+            "fast_path_hit_rate": round(paths[PATH_DETERMINISTIC] / attempted, 3),
+            "fallback_reasons": dict(reasons.most_common())}
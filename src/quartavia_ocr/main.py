@@ -4,27 +4,36 @@ import warnings
 
 from datetime import datetime
 
-from quartavia_ocr.crew import QuartaviaOcr
-
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 # This main file is intended to be a way for you to run your
 # crew locally, so refrain from adding unnecessary logic into this file.
 # Replace with inputs you want to test with, it will automatically
 # interpolate any tasks and agents information
+#
+# O crew (e com ele o crewAI) só é importado dentro das funções: importar este
+# módulo não inicia nenhuma extração nem telemetria.
 
 file_path = "https://uugjjiacxcqcpayzpthl.supabase.co/storage/v1/object/public/quartavia/uploads/1761229240_Btg.pdf"
 
 def run():
     """
-    Run the crew.
+    Run the crew. Accepts an optional file path/URL as the first argument.
     """
+    from quartavia_ocr import tracing
+    from quartavia_ocr.crew import QuartaviaOcr
+    from quartavia_ocr.tools.document_session import document_run
+
+    tracing.load_env()
+    tracing.configure_logging()
     inputs = {
-        'file_path': file_path
+        'file_path': sys.argv[1] if len(sys.argv) > 1 else file_path
     }
 
     try:
-        QuartaviaOcr().crew().kickoff(inputs=inputs)
+        # As ferramentas do crew compartilham o documento (bytes, PDF aberto, páginas) durante a execução
+        with tracing.span("crew_kickoff", entry="cli"), document_run():
+            QuartaviaOcr().crew().kickoff(inputs=inputs)
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
 
@@ -33,6 +42,11 @@ def train():
     """
     Train the crew for a given number of iterations.
     """
+    from quartavia_ocr import tracing
+    from quartavia_ocr.crew import QuartaviaOcr
+
+    tracing.load_env()
+
     inputs = {
         "topic": "AI LLMs",
         'current_year': str(datetime.now().year)
@@ -47,6 +61,11 @@ def replay():
     """
     Replay the crew execution from a specific task.
     """
+    from quartavia_ocr import tracing
+    from quartavia_ocr.crew import QuartaviaOcr
+
+    tracing.load_env()
+
     try:
         QuartaviaOcr().crew().replay(task_id=sys.argv[1])
 
@@ -57,6 +76,11 @@ def test():
     """
     Test the crew execution and returns the results.
     """
+    from quartavia_ocr import tracing
+    from quartavia_ocr.crew import QuartaviaOcr
+
+    tracing.load_env()
+
     inputs = {
         "topic": "AI LLMs",
         "current_year": str(datetime.now().year)
@@ -74,6 +98,11 @@ def run_with_trigger():
     """
     import json
 
+    from quartavia_ocr import tracing
+    from quartavia_ocr.crew import QuartaviaOcr
+
+    tracing.load_env()
+
     if len(sys.argv) < 2:
         raise Exception("No trigger payload provided. Please provide JSON payload as argument.")
 
@@ -94,4 +123,6 @@ def run_with_trigger():
     except Exception as e:
         raise Exception(f"An error occurred while running the crew with trigger: {e}")
 
-run()
\ No newline at end of file
+
+if __name__ == "__main__":
+    run()
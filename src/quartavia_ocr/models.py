@@ -0,0 +1,51 @@
+"""Modelos da saída do crew (estrutura ExtractionResult descrita em config/tasks.yaml)."""
+import json
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+
+class Transaction(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    uuid: str = "1"
+    data: str
+    descricao: str
+    valor: float
+    categoria: str | None = None
+    tipo: str | None = None
+    subcategoria: str | None = None
+    parcelado: bool = False
+    numero_parcelas: int | None = None
+    total_parcelas: int | None = None
+
+
+class ExtractionResult(BaseModel):
+    """Resultado de um documento. 'source' e 'elapsed_seconds' são preenchidos pelo processamento em lote;
+    'extraction_path' e 'fallback_reason', pelo caminho determinístico (fast_path.py)."""
+    model_config = ConfigDict(extra="allow")
+
+    success: bool
+    bank_name: str = "TBD"
+    document_type: str = "unknown"
+    transactions_count: int = 0
+    transactions: list[Transaction] = Field(default_factory=list)
+    error_message: str | None = None
+    source: str | None = None
+    elapsed_seconds: float | None = None
+    extraction_path: str | None = None  # 'deterministico' ou 'crew'
+    fallback_reason: str | None = None  # por que o caminho determinístico passou o documento ao crew
+
+    @classmethod
+    def failure(cls, message: str, **kwargs) -> "ExtractionResult":
+        return cls(success=False, error_message=message, **kwargs)
+
+    @classmethod
+    def from_raw(cls, raw: str) -> "ExtractionResult":
+        """Interpreta a saída textual do agente (pode vir cercada de ```json ... ```)."""
+        start, end = raw.find("{"), raw.rfind("}")
+        if start == -1:
+            return cls.failure("Saída do crew não contém um objeto JSON")
+        try:
+            return cls.model_validate(json.loads(raw[start:end + 1]))
+        except (ValueError, ValidationError) as e:
+            return cls.failure(f"Saída do crew não segue o ExtractionResult: {e}")
@@ -0,0 +1,247 @@
+"""Gravação e reprodução das chamadas aos modelos (OCR da API e LLM do crew).
+
+Cada chamada é endereçada pelo SHA-256 de: tipo ('ocr' ou 'llm') + modelo +
+mensagens + parâmetros, com as imagens em base64 trocadas pelo hash do
+conteúdo. Assim o mesmo PDF, renderizado com as mesmas configurações, cai na
+mesma gravação.
+    QUARTAVIA_REPLAY=record  chama o modelo e grava a resposta em disco
+                             (um JSON por chamada em QUARTAVIA_REPLAY_DIR);
+    QUARTAVIA_REPLAY=replay  responde da gravação, sem rede nem chave de API;
+                             chamada sem gravação levanta ReplayMissError.
+Desligado por padrão (QUARTAVIA_REPLAY=off).
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from crewai.llms.base_llm import BaseLLM
+
+from quartavia_ocr import tracing
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_OFF, MODE_RECORD, MODE_REPLAY)
+
+KIND_OCR = "ocr"
+KIND_LLM = "llm"
+
+DEFAULT_REPLAY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "quartavia_ocr", "replay")
+
+
+class ReplayMissError(RuntimeError):
+    """Chamada sem gravação no modo replay: a execução não pode seguir sem rede."""
+
+    def __init__(self, kind: str, model: str | None, key: str):
+        super().__init__(f"Sem gravação para a chamada {kind} ao modelo {model} (chave {key[:16]}). "
+                         f"Grave antes com QUARTAVIA_REPLAY=record.")
+        self.kind = kind
+        self.model = model
+        self.key = key
+
+
+def _hash_images(value: Any) -> Any:
+    """Troca as imagens em data URL (base64) pelo SHA-256 do conteúdo, para a chave ficar curta."""
+    if isinstance(value, dict):
+        return {k: _hash_images(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_hash_images(v) for v in value]
+    if isinstance(value, str) and value.startswith("data:") and ";base64," in value:
+        mime_type, data = value[5:].split(";base64,", 1)
+        return f"{mime_type}:sha256:{hashlib.sha256(data.encode('ascii')).hexdigest()}"
+    return value
+
+
+def request_key(kind: str, model: str | None, request: dict) -> str:
+    """Chave da chamada: tipo + modelo + mensagens e parâmetros (JSON canônico)."""
+    canonical = json.dumps({"kind": kind, "model": model, "request": _hash_images(request)},
+                           sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """Gravações em disco (um JSON por chamada), lidas uma vez e servidas da memória."""
+
+    def __init__(self, directory: str, mode: str = MODE_REPLAY):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Modo de gravação inválido: {mode!r} (use {MODE_RECORD!r} ou {MODE_REPLAY!r})")
+        self.directory = directory
+        self.mode = mode
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory: dict[str, Any] = {}
+        self._stats = {"hits": 0, "misses": 0, "records": 0}
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self, key: str) -> Any:
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                response = json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+        with self._lock:
+            self._memory[key] = response
+        return response
+
+    def _save(self, key: str, kind: str, model: str | None, response: Any) -> None:
+        # Escrita atômica, como no cache de extração: outro processo nunca lê um JSON pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"kind": kind, "model": model, "response": response}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            try: os.unlink(tmp_path)
+            except OSError: pass
+            raise
+        with self._lock:
+            self._memory[key] = response
+
+    def through(self, kind: str, model: str | None, request: dict, call: Callable[[], Any]) -> Any:
+        """Resposta gravada da chamada; no modo record, faz a chamada e grava a resposta (JSON)."""
+        key = request_key(kind, model, request)
+        if self.replaying:
+            response = self._load(key)
+            with self._lock:
+                self._stats["hits" if response is not None else "misses"] += 1
+            if response is None:
+                tracing.count("replay_misses", kind=kind)
+                logger.error("Replay sem gravação: %s %s (chave %s)", kind, model, key[:16])
+                raise ReplayMissError(kind, model, key)
+            tracing.count("replay_hits", kind=kind)
+            return response
+        response = call()
+        self._save(key, kind, model, response)
+        with self._lock:
+            self._stats["records"] += 1
+        tracing.count("replay_records", kind=kind)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "directory": self.directory, **self._stats}
+
+
+_default_store: ReplayStore | None = None
+_default_store_lock = threading.Lock()
+
+
+def get_replay_store() -> ReplayStore | None:
+    """Gravações do processo (QUARTAVIA_REPLAY e QUARTAVIA_REPLAY_DIR), ou None se desligado."""
+    global _default_store
+    mode = os.getenv("QUARTAVIA_REPLAY", MODE_OFF).lower()
+    if mode not in MODES:
+        logger.warning("QUARTAVIA_REPLAY=%r desconhecido; gravação desligada", mode)
+        return None
+    if mode == MODE_OFF:
+        return None
+    directory = os.getenv("QUARTAVIA_REPLAY_DIR", DEFAULT_REPLAY_DIR)
+    with _default_store_lock:
+        if _default_store is None or (_default_store.directory, _default_store.mode) != (directory, mode):
+            _default_store = ReplayStore(directory, mode)
+        return _default_store
+
+
+# --- OCR: client.chat.completions.create ---
+
+class ReplayOpenAIClient:
+    """Imita client.chat.completions.create, passando pelas gravações.
+
+    No modo replay, client pode ser None (máquina sem rede nem chave). Só o texto e
+    o uso de tokens da resposta são gravados, que é o que a ferramenta de OCR lê.
+    """
+
+    def __init__(self, store: ReplayStore, client: Any = None):
+        self.store = store
+        self.client = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @property
+    def needs_network(self) -> bool:
+        """False no modo replay: as chamadas não passam pelo agendador nem contam nos limites da API."""
+        return not self.store.replaying
+
+    def create(self, **kwargs: Any) -> Any:
+        model = kwargs.get("model")
+        request = {k: v for k, v in kwargs.items() if k != "model"}
+
+        def call() -> dict:
+            if self.client is None:
+                raise RuntimeError("Gravação de OCR sem cliente OpenAI (falta OPENAI_API_KEY)")
+            response = self.client.chat.completions.create(**kwargs)
+            usage = getattr(response, "usage", None)
+            return {"content": response.choices[0].message.content,
+                    "total_tokens": getattr(usage, "total_tokens", None)}
+
+        recorded = self.store.through(KIND_OCR, model, request, call)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=recorded["content"]))],
+            usage=SimpleNamespace(total_tokens=recorded.get("total_tokens")),
+        )
+
+
+# --- Crew: LLM do agente ---
+
+class ReplayLLM(BaseLLM):
+    """LLM do crew que passa pelas gravações; as chamadas reais vão para o LLM interno (litellm)."""
+
+    def __init__(self, inner: BaseLLM, store: ReplayStore):
+        super().__init__(model=inner.model, temperature=inner.temperature, stop=list(inner.stop or []))
+        self.inner = inner
+        self.store = store
+
+    def call(self, messages: str | list[dict], tools: list[dict] | None = None, callbacks: list[Any] | None = None,
+             available_functions: dict[str, Any] | None = None, from_task: Any = None,
+             from_agent: Any = None) -> str | Any:
+        # O executor do agente ajusta as palavras de parada neste objeto; o LLM interno precisa delas
+        self.inner.stop = self.stop
+        request = {
+            "messages": messages,
+            "tools": tools,
+            "temperature": self.temperature,
+            "stop": sorted(self.stop),
+            "max_tokens": getattr(self.inner, "max_tokens", None),
+        }
+        return self.store.through(KIND_LLM, self.model, request, lambda: self.inner.call(
+            messages, tools, callbacks, available_functions, from_task, from_agent))
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+
+def build_crew_llm(store: ReplayStore | None = None, inner: BaseLLM | None = None) -> BaseLLM | None:
+    """LLM dos agentes com gravação/reprodução, ou None (LLM padrão do crewAI) se desligado.
+
+    O LLM interno é o que o crewAI criaria sozinho (MODEL/OPENAI_MODEL_NAME, BASE_URL...);
+    no modo replay ele nunca é chamado.
+    """
+    store = store or get_replay_store()
+    if store is None:
+        return None
+    if inner is None:
+        from crewai.utilities.llm_utils import create_llm
+
+        inner = create_llm(None)
+    return ReplayLLM(inner, store)
@@ -0,0 +1,377 @@
+"""Serviço HTTP de extração (Starlette) com fila limitada e workers aquecidos.
+
+Cada worker cria o seu QuartaviaOcr uma vez, na subida do serviço (importação
+do crewAI, agentops, cliente OpenAI das ferramentas), e reaproveita-o para
+todos os jobs; uma requisição só paga a extração em si. Os jobs entram numa
+fila limitada: com ela cheia o serviço responde 429 (com Retry-After) em vez de
+acumular trabalho. O progresso de cada job é transmitido por SSE.
+
+Endpoints:
+    POST /extract              upload multipart ('file') ou JSON/form com 'file_path' (URL) -> 202
+    GET  /jobs/{job_id}        estado e, ao terminar, o ExtractionResult
+    GET  /jobs/{job_id}/events progresso do job (SSE)
+    GET  /health               profundidade da fila e contadores (inclusive documentos resolvidos
+                               pelo caminho determinístico, fast_path.py, e pelo crew) e a fila
+                               de chamadas de OCR do processo (ocr_scheduler)
+
+O serviço não lê caminhos locais: o documento chega por upload (até
+QUARTAVIA_SERVICE_MAX_UPLOAD_MB, senão 413) ou por uma URL cujo esquema e host
+estejam nas listas QUARTAVIA_SERVICE_URL_SCHEMES / QUARTAVIA_SERVICE_URL_HOSTS
+(vazia: nenhuma URL é aceita), para que um cliente não faça o worker ler
+arquivos do servidor nem acessar endereços da rede interna.
+
+Uso:
+    quartavia_serve --host 0.0.0.0 --port 8000 --workers 2 --queue-size 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable
+from urllib.parse import urlparse
+
+from sse_starlette.sse import EventSourceResponse
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from quartavia_ocr import tracing
+from quartavia_ocr.fast_path import PATH_CREW, PATH_DETERMINISTIC, run_with_fast_path
+from quartavia_ocr.models import ExtractionResult
+from quartavia_ocr.tools.ocr_scheduler import PRIORITY_INTERACTIVE, get_scheduler, ocr_job
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ServiceSettings:
+    """Parâmetros do serviço (variáveis QUARTAVIA_SERVICE_*).
+
+    job_retention_seconds: por quanto tempo um job terminado fica consultável.
+    url_hosts: hosts de onde o serviço aceita baixar documentos; vazio recusa toda URL.
+    max_upload_bytes: tamanho máximo do corpo da requisição (upload incluído).
+    """
+    workers: int = 2
+    queue_size: int = 16
+    job_retention_seconds: float = 3600
+    url_schemes: tuple[str, ...] = ("https",)
+    url_hosts: tuple[str, ...] = ()
+    max_upload_bytes: int = 50 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> "ServiceSettings":
+        def names(value: str) -> tuple[str, ...]:
+            return tuple(name.strip().lower() for name in value.split(",") if name.strip())
+
+        return cls(
+            workers=int(os.getenv("QUARTAVIA_SERVICE_WORKERS", "2")),
+            queue_size=int(os.getenv("QUARTAVIA_SERVICE_QUEUE_SIZE", "16")),
+            job_retention_seconds=float(os.getenv("QUARTAVIA_SERVICE_JOB_RETENTION", "3600")),
+            url_schemes=names(os.getenv("QUARTAVIA_SERVICE_URL_SCHEMES", "https")),
+            url_hosts=names(os.getenv("QUARTAVIA_SERVICE_URL_HOSTS", "")),
+            max_upload_bytes=int(float(os.getenv("QUARTAVIA_SERVICE_MAX_UPLOAD_MB", "50")) * 1024 * 1024),
+        )
+
+    def allows_url(self, source: str) -> bool:
+        parsed = urlparse(source)
+        return (parsed.scheme.lower() in self.url_schemes and parsed.hostname is not None
+                and parsed.hostname.lower() in self.url_hosts)
+
+
+class SourceRejected(Exception):
+    """Requisição de extração recusada antes de entrar na fila (status HTTP e mensagem)."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# (source, progress) -> ExtractionResult; progress(evento, dados) pode ser chamado de qualquer thread
+Processor = Callable[[str, Callable[[str, dict], None]], ExtractionResult]
+
+
+def crew_processor_factory() -> Processor:
+    """Cria um QuartaviaOcr aquecido (agente e ferramentas já construídos) para um worker."""
+    from quartavia_ocr.crew import QuartaviaOcr
+
+    project = QuartaviaOcr()
+    # Constrói agora as ferramentas e o cliente OpenAI (que, fora do serviço, só nasce no primeiro OCR)
+    for tool in project.agente_processador_financeiro().tools:
+        if hasattr(tool, "_get_client"):
+            tool._get_client()
+
+    def process(source: str, progress: Callable[[str, dict], None]) -> ExtractionResult:
+        def kickoff(file_path: str) -> ExtractionResult:
+            progress("crew", {})
+            crew = project.crew()
+            crew.step_callback = lambda step: progress("step", {"type": type(step).__name__})
+            with tracing.span("crew_kickoff", entry="service"):
+                result = crew.kickoff(inputs={"file_path": file_path})
+            return ExtractionResult.from_raw(result.raw or "")
+
+        # Caminho determinístico primeiro (fast_path.py); o crew só roda se os totais não baterem.
+        # O OCR de um job do serviço passa na frente do OCR de lotes no agendador do processo.
+        with ocr_job(priority=PRIORITY_INTERACTIVE):
+            return run_with_fast_path(source, kickoff)
+
+    return process
+
+
+class Job:
+    def __init__(self, source: str, cleanup_path: str | None = None):
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.cleanup_path = cleanup_path  # upload salvo em arquivo temporário
+        self.status = "queued"
+        self.result: dict | None = None
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.events: list[tuple[str, dict]] = []
+        self._changed = asyncio.Event()
+
+    def emit(self, event: str, data: dict | None = None) -> None:
+        self.events.append((event, {"job_id": self.id, "status": self.status, **(data or {})}))
+        self._changed.set()
+
+    async def stream(self):
+        """Eventos do job desde o início; termina no evento final."""
+        sent = 0
+        while True:
+            while sent < len(self.events):
+                event, data = self.events[sent]
+                sent += 1
+                yield {"event": event, "data": json.dumps(data, ensure_ascii=False)}
+                if event in ("done", "failed"):
+                    return
+            self._changed.clear()
+            if sent == len(self.events):
+                await self._changed.wait()
+
+    def to_dict(self) -> dict:
+        data = {"job_id": self.id, "status": self.status, "source": self.source}
+        if self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class ExtractionService:
+    """Fila limitada de jobs consumida por workers aquecidos."""
+
+    def __init__(self, workers: int | None = None, queue_size: int | None = None,
+                 processor_factory: Callable[[], Processor] = crew_processor_factory,
+                 settings: ServiceSettings | None = None):
+        settings = settings or ServiceSettings.from_env()
+        self.workers = max(1, settings.workers if workers is None else workers)
+        self.queue_size = max(1, settings.queue_size if queue_size is None else queue_size)
+        self.job_retention_seconds = settings.job_retention_seconds
+        self.processor_factory = processor_factory
+        self.jobs: dict[str, Job] = {}
+        self.stats = {"accepted": 0, "rejected": 0, "done": 0, "failed": 0, "fast_path": 0, "crew": 0}
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        # Aquece os workers antes de aceitar tráfego (em threads: a criação é bloqueante)
+        processors = await asyncio.gather(*(asyncio.to_thread(self.processor_factory) for _ in range(self.workers)))
+        self._tasks = [asyncio.create_task(self._worker(p)) for p in processors]
+        logger.info("Serviço com %d workers aquecidos e fila de %d.", self.workers, self.queue_size)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, source: str, cleanup_path: str | None = None) -> Job | None:
+        """Enfileira um job; None quando a fila está cheia (backpressure)."""
+        job = Job(source, cleanup_path)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            return None
+        self._purge_finished()
+        self.jobs[job.id] = job
+        self.stats["accepted"] += 1
+        job.emit("queued", {"position": self._queue.qsize()})
+        return job
+
+    def _purge_finished(self) -> None:
+        limit = time.time() - self.job_retention_seconds
+        for job_id in [j.id for j in self.jobs.values() if j.finished_at and j.finished_at < limit]:
+            del self.jobs[job_id]
+
+    async def _worker(self, processor: Processor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job, processor, loop)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: Job, processor: Processor, loop: asyncio.AbstractEventLoop) -> None:
+        job.status = "running"
+        job.emit("started")
+        start = time.perf_counter()
+
+        def progress(event: str, data: dict) -> None:
+            loop.call_soon_threadsafe(job.emit, event, data)
+
+        try:
+            result = await asyncio.to_thread(processor, job.source, progress)
+        except Exception as e:
+            result = ExtractionResult.failure(f"{type(e).__name__}: {e}")
+        finally:
+            if job.cleanup_path:
+                try: os.unlink(job.cleanup_path)
+                except OSError: pass
+        result.elapsed_seconds = round(time.perf_counter() - start, 3)
+        job.result = result.model_dump(mode="json", exclude_none=True)
+        job.status = "done" if result.success else "failed"
+        job.finished_at = time.time()
+        self.stats[job.status] += 1
+        if result.extraction_path in (PATH_DETERMINISTIC, PATH_CREW):
+            self.stats["fast_path" if result.extraction_path == PATH_DETERMINISTIC else "crew"] += 1
+        job.emit(job.status, {"elapsed_seconds": result.elapsed_seconds})
+
+    def health(self) -> dict:
+        return {"workers": self.workers, "queue_size": self.queue_size,
+                "queued": self._queue.qsize() if self._queue else 0, **self.stats,
+                "ocr_scheduler": get_scheduler().stats()}
+
+
+def _limit_body(request: Request, max_bytes: int) -> Request:
+    """A mesma requisição, mas recusando (413) o corpo assim que ele passa de max_bytes."""
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise SourceRejected(413, f"Documento maior que o limite de {max_bytes} bytes.")
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise SourceRejected(413, f"Documento maior que o limite de {max_bytes} bytes.")
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def _read_source(request: Request, settings: ServiceSettings) -> tuple[str, str | None]:
+    """(source, arquivo temporário a apagar) a partir de upload multipart, form ou JSON.
+
+    Levanta SourceRejected para corpo grande demais, origem ausente ou URL fora da lista.
+    """
+    request = _limit_body(request, settings.max_upload_bytes)
+    content_type = request.headers.get("content-type", "")
+    source: Any = None
+    if content_type.startswith("multipart/form-data") or content_type.startswith("application/x-www-form-urlencoded"):
+        async with request.form() as form:
+            upload = form.get("file")
+            if upload is not None and hasattr(upload, "read"):
+                fd, path = tempfile.mkstemp(suffix=".pdf", prefix="quartavia_upload_")
+                with os.fdopen(fd, "wb") as f:
+                    while chunk := await upload.read(1024 * 1024):
+                        f.write(chunk)
+                return path, path
+            source = form.get("file_path")
+    else:
+        try:
+            body: Any = await request.json()
+        except ValueError:
+            body = None
+        source = body.get("file_path") if isinstance(body, dict) else None
+    if not source or not isinstance(source, str):
+        raise SourceRejected(400, "Envie um arquivo ('file') ou a URL do documento ('file_path').")
+    if not settings.allows_url(source):
+        raise SourceRejected(400, "URL não permitida: o serviço só baixa documentos dos hosts configurados "
+                                  "(QUARTAVIA_SERVICE_URL_HOSTS); arquivos locais precisam vir por upload.")
+    return source, None
+
+
+def create_app(service: ExtractionService | None = None, settings: ServiceSettings | None = None) -> Starlette:
+    service = service or ExtractionService()
+    settings = settings or ServiceSettings.from_env()
+
+    async def extract(request: Request) -> JSONResponse:
+        try:
+            source, cleanup_path = await _read_source(request, settings)
+        except SourceRejected as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status_code)
+        job = service.submit(source, cleanup_path)
+        if job is None:
+            if cleanup_path:
+                os.unlink(cleanup_path)
+            return JSONResponse({"error": "Fila cheia, tente novamente em instantes."}, status_code=429,
+                                headers={"Retry-After": "5"})
+        return JSONResponse({**job.to_dict(), "status_url": f"/jobs/{job.id}",
+                             "events_url": f"/jobs/{job.id}/events"}, status_code=202)
+
+    def _get_job(request: Request) -> Job | None:
+        return service.jobs.get(request.path_params["job_id"])
+
+    async def job_status(request: Request) -> JSONResponse:
+        job = _get_job(request)
+        if job is None:
+            return JSONResponse({"error": "Job não encontrado."}, status_code=404)
+        return JSONResponse(job.to_dict())
+
+    async def job_events(request: Request):
+        job = _get_job(request)
+        if job is None:
+            return JSONResponse({"error": "Job não encontrado."}, status_code=404)
+        return EventSourceResponse(job.stream())
+
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse(service.health())
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        await service.start()
+        try:
+            yield
+        finally:
+            await service.stop()
+
+    app = Starlette(routes=[
+        Route("/extract", extract, methods=["POST"]),
+        Route("/jobs/{job_id}", job_status),
+        Route("/jobs/{job_id}/events", job_events),
+        Route("/health", health),
+    ], lifespan=lifespan)
+    app.state.service = service
+    return app
+
+
+def serve(argv: list[str] | None = None) -> None:
+    import sys
+
+    import uvicorn
+
+    tracing.load_env()
+    settings = ServiceSettings.from_env()
+    parser = argparse.ArgumentParser(prog="quartavia_serve", description="Serviço HTTP de extração.")
+    parser.add_argument("--host", default=os.getenv("QUARTAVIA_SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("QUARTAVIA_SERVICE_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--queue-size", type=int, default=settings.queue_size)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    tracing.configure_logging()
+    service = ExtractionService(args.workers, args.queue_size, settings=settings)
+    uvicorn.run(create_app(service, settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    serve()
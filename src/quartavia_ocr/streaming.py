@@ -0,0 +1,160 @@
+"""Saída em streaming (NDJSON): as transações saem conforme cada página ou parte fica pronta.
+
+O crew completo (QuartaviaOcr().crew().kickoff) só devolve algo quando o JSON do
+documento inteiro está pronto; num extrato grande, mais de um minuto sem nada.
+Aqui cada transação vira um evento assim que a sua página ou parte termina, um
+JSON por linha:
+    {"event": "transaction", "seq": 1, "first_page": 1, "last_page": 1, "transaction": {...}}
+    ...
+    {"event": "summary", "success": true, "transactions_count": 42, "document_type": "extrato", ...}
+O resumo vem sempre por último, também quando a extração falha; transactions_count é
+o número de eventos 'transaction' emitidos. Quem consome pode gravar cada transação
+no banco ao recebê-la.
+
+Os caminhos são os do lote em partes (quartavia_batch --chunked):
+  1. caminho determinístico (fast_path.py): com os totais conferidos, as transações
+     saem agrupadas por página;
+  2. senão, modo em partes (chunked.py): cada parte sai quando ela e as anteriores
+     terminam, na ordem das páginas e sem as transações repetidas na fronteira.
+     (O crew completo é uma conversa única sobre o documento e não tem resultados
+     parciais para transmitir.)
+
+Uso:
+    quartavia_stream extrato.pdf > transacoes.ndjson
+"""
+import asyncio
+import json
+import logging
+import sys
+from typing import Any, AsyncIterator, Callable, TextIO
+
+from quartavia_ocr import tracing
+from quartavia_ocr.chunked import (
+    ChunkProcessor,
+    ChunkSettings,
+    aiter_chunks,
+    drop_overlap,
+    kickoff_chunk,
+    learn_categories,
+    merge_results,
+    prepare_chunks,
+)
+from quartavia_ocr.fast_path import PATH_CREW, FastPathSettings, attempt_fast_path
+from quartavia_ocr.models import ExtractionResult, Transaction
+from quartavia_ocr.tools.document_session import DocumentRun, use_run
+from quartavia_ocr.tools.ocr_scheduler import PRIORITY_INTERACTIVE, ocr_job
+
+logger = logging.getLogger(__name__)
+
+EVENT_TRANSACTION = "transaction"
+EVENT_SUMMARY = "summary"
+
+
+def transaction_event(seq: int, transaction: Transaction, first_page: int | None, last_page: int | None) -> dict:
+    return {"event": EVENT_TRANSACTION, "seq": seq, "first_page": first_page, "last_page": last_page,
+            "transaction": transaction.model_dump(mode="json", exclude_none=True)}
+
+
+def summary_event(result: ExtractionResult, transactions_count: int) -> dict:
+    data = {"event": EVENT_SUMMARY, "success": result.success, "transactions_count": transactions_count,
+            "document_type": result.document_type, "bank_name": result.bank_name,
+            "extraction_path": result.extraction_path, "fallback_reason": result.fallback_reason,
+            "error_message": result.error_message}
+    return {key: value for key, value in data.items() if value is not None}
+
+
+def to_ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def _in_run(run: DocumentRun, file_path: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """Executa fn na thread de trabalho com a sessão do documento e a prioridade interativa no OCR."""
+    with use_run(run), ocr_job(file_path, PRIORITY_INTERACTIVE):
+        return fn(*args)
+
+
+async def astream_document(file_path: str, processor: ChunkProcessor = kickoff_chunk,
+                           chunk_settings: ChunkSettings | None = None,
+                           fast_path_settings: FastPathSettings | None = None,
+                           extractor: Any = None) -> AsyncIterator[dict]:
+    """Eventos 'transaction' do documento, conforme ficam prontos, e o 'summary' no fim."""
+    chunk_settings = chunk_settings or ChunkSettings.from_env()
+    fast_path_settings = fast_path_settings or FastPathSettings.from_env()
+    # A sessão do documento (bytes, PDF aberto, páginas) vale para o fast path e a extração do modo em partes
+    run = DocumentRun()
+    seq = 0
+    reason = None
+    try:
+        try:
+            outcome = await asyncio.to_thread(_in_run, run, file_path, attempt_fast_path, run, file_path,
+                                              fast_path_settings)
+            reason = outcome.reason
+            if outcome.result is not None:
+                for page, transaction in zip(outcome.pages, outcome.result.transactions):
+                    seq += 1
+                    yield transaction_event(seq, transaction, page, page)
+                yield summary_event(outcome.result, seq)
+                return
+
+            if extractor is None:
+                from quartavia_ocr.tools.custom_tool import HybridPDFExtractorTool
+
+                extractor = HybridPDFExtractorTool()
+            text = await asyncio.to_thread(_in_run, run, file_path, extractor.extract_full_text, file_path)
+        except Exception as e:
+            logger.exception("Streaming de %s falhou na extração: %s", file_path, e)
+            text = f"Erro: {type(e).__name__}: {e}"
+    finally:
+        run.close()
+
+    if not text or text.startswith("Erro"):
+        yield summary_event(ExtractionResult.failure(text or "Nenhum texto extraído do documento",
+                                                     extraction_path=PATH_CREW, fallback_reason=reason), seq)
+        return
+
+    try:
+        chunks = prepare_chunks(text, chunk_settings, extractor.condense_settings)
+        logger.info("Streaming em partes: %d parte(s) de até %d página(s)", len(chunks),
+                    chunk_settings.pages_per_chunk)
+        results: list[ExtractionResult] = []
+        previous: list[Transaction] = []
+        async for chunk, result in aiter_chunks(chunks, processor, chunk_settings.max_concurrency):
+            results.append(result)
+            rows, _ = drop_overlap(previous, list(result.transactions) if result.success else [],
+                                   chunk.overlap_lines)
+            previous = rows
+            for transaction in rows:
+                seq += 1
+                yield transaction_event(seq, transaction, chunk.first_page, chunk.last_page)
+
+        merged = merge_results(results, [chunk.overlap_lines for chunk in chunks])
+        learn_categories(merged)
+    except Exception as e:
+        logger.exception("Streaming de %s falhou no modo em partes: %s", file_path, e)
+        merged = ExtractionResult.failure(f"{type(e).__name__}: {e}")
+    merged.extraction_path, merged.fallback_reason = PATH_CREW, reason
+    yield summary_event(merged, seq)
+
+
+async def awrite_ndjson(file_path: str, out: TextIO, **kwargs: Any) -> dict:
+    """Escreve os eventos de astream_document em out, um por linha (com flush), e devolve o resumo."""
+    summary: dict = {}
+    async for event in astream_document(file_path, **kwargs):
+        out.write(to_ndjson(event))
+        out.flush()
+        if event["event"] == EVENT_SUMMARY:
+            summary = event
+    return summary
+
+
+def main(argv: list[str] | None = None) -> dict:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        raise SystemExit("Uso: quartavia_stream <arquivo.pdf ou URL>")
+    tracing.load_env()
+    tracing.configure_logging()
+    return asyncio.run(awrite_ndjson(argv[0], sys.stdout))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,219 +1,185 @@
 import pdfplumber
 import asyncio
+import importlib.util
+import logging
 import os
-import tempfile
-import requests
-import re  # Para expressões regulares na filtragem
-from urllib.parse import urlparse
-from typing import Type, Any, ClassVar
+from typing import Type, Any, ClassVar, Iterator
 from crewai.tools import BaseTool
-from dotenv import load_dotenv
-import traceback # Para logs de erro mais detalhados
-
-# --- IMPORTS PARA A FERRAMENTA DE OCR ---
-try:
-    from openai import OpenAI
-    import base64
-    import fitz  # PyMuPDF para converter PDF em imagens
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
-    print("AVISO: Falta 'openai' ou 'PyMuPDF'. Execute: pip install openai PyMuPDF")
+from pydantic import Field, PrivateAttr
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import replace
+from quartavia_ocr.tools.text_filters import (
+    IGNORE_KEYWORDS_GLOBAL,
+    KEEP_KEYWORDS_GLOBAL,
+    clean_and_filter_lines,
+)
+from quartavia_ocr.tools.native_extraction import (
+    default_native_workers,
+    extract_page_lines,
+    iter_pages_parallel,
+    native_engine,
+    parallel_min_pages,
+    process_page_lines,
+)
+from quartavia_ocr.tools.document_fetcher import PDFSource, is_url
+from quartavia_ocr.tools.document_session import (
+    ARTIFACT_NATIVE,
+    ARTIFACT_OCR,
+    ARTIFACT_RENDER,
+    MISSING,
+    DocumentSession,
+    page_lock,
+    session_for,
+    use_fitz,
+    use_pdfplumber,
+)
+from quartavia_ocr.tools.ocr_backends import ProcessPoolOCRBackend, get_backend
+from quartavia_ocr.tools.ocr_scheduler import (
+    CircuitOpenError,
+    OCRJob,
+    current_job,
+    estimate_request_tokens,
+    get_openai_client,
+    get_scheduler,
+)
+from quartavia_ocr.tools.page_rendering import (
+    RenderSettings,
+    RenderedPage,
+    format_render_report,
+    release_render_memory,
+    render_page,
+    render_pages,
+)
+from quartavia_ocr.tools.page_stream import METHOD_NATIVE, METHOD_OCR, PageResult, default_stream_window
+from quartavia_ocr.tools.page_triage import (
+    TriageResult,
+    TriageSettings,
+    format_triage_report,
+    text_layer_trusted,
+    triage_pages,
+)
+from quartavia_ocr.tools.extraction_cache import get_default_cache, run_with_cache
+from quartavia_ocr.tools.table_extractor import extract_rows, format_rows, rows_version
+from quartavia_ocr.tools.text_condenser import CondenseSettings, condense_tool_output
+from quartavia_ocr.categorizer import get_default_categorizer
+from quartavia_ocr.replay import ReplayMissError, ReplayOpenAIClient, get_replay_store
+from quartavia_ocr import tracing
+
+logger = logging.getLogger(__name__)
+
+# --- DEPENDÊNCIAS DA FERRAMENTA DE OCR ---
+# openai e PyMuPDF só são importados quando o OCR é usado de fato; aqui apenas
+# verificamos se estão instalados, sem pagar o custo da importação.
+OCR_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("openai", "fitz"))
+if not OCR_AVAILABLE:
+    logger.warning("Falta 'openai' ou 'PyMuPDF'. Execute: pip install openai PyMuPDF")
 # -------------------------------------
 
-load_dotenv()
-
-# Constantes e função de filtro (inalteradas)
-IGNORE_KEYWORDS_GLOBAL = [
-    'total', 'data', 'movimentação', 'beneficiário', 'valor', 'limite de crédito', 
-    'pagamento mínimo', 'encargos', 'fale com a gente', 'ouvidoria', 'sac', 
-    'vencimento', 'saldo por transação', 'agência / cedente', 'n° documento', 
-    'resumo da fatura', 'despesas do mês', 'pontos loop', 'fatura anterior', 
-    'créditos e estornos', 'total da fatura', 'juros', 'iof', 'taxas', 
-    'lançamentos nacionais', 'compras à vista', 'outros valores', 'histórico',
-    'moeda de origem', 'cotação us$', 'aplicativo bradesco', 'situação do extrato',
-    # Novos filtros para remover informações irrelevantes
-    'pagamento via', 'qr code', 'boleto', 'escaneie', 'autenticação mecânica',
-    'ficha de compensação', 'força para pagar', 'parcelamento', 'parcela',
-    'próximo agendamento', 'simulação', 'super app', 'fatura atual',
-    'descritivo detalhado', 'pontos em', 'pontos a receber', 'débito automático',
-    'termos e condições', 'loop', 'elegíveis para pontuação', 'creditados',
-    'clientes inter', 'pagamento integral', 'dias úteis', 'olá', 'sua fatura chegou',
-    'caso o pagamento', 'prazo para reconhecimento', 'liberação do limite',
-    'faça o pagamento', 'limite será liberado', 'precisa de uma força',
-    'confira as opções', 'disponíveis pra você', 'caso opte pelo',
-    'importante saber', 'você pode acessar', 'essa é a soma', 'suas despesas',
-    'durante esse mês', 'mês passado', 'consulte os termos', 'após realizar',
-    'rotativo'
-]
-KEEP_KEYWORDS_GLOBAL = [
-    'saldo do dia', 'pix enviado', 'pix recebido', 'deposito', 'saque', 'ted',
-    'doc', 'transferencia', 'resgate', 'aplicacao', 'investimento', 'cartao',
-    'compra', 'posto', 'drogaria', 'supermercado', 'loja', 'pagamento on line',
-    'debito automatico', 'tarifa', 'anuidade', 'iof', 'saldo anterior',
-    'saldo atual', 'extrato', 'conta corrente', 'poupanca'
-]
-def clean_and_filter_lines(text_lines: list[str]) -> str:
-    """Filtra linhas para manter apenas transações e informações financeiras relevantes"""
-    filtered_data = []
-    
-    for line in text_lines:
-        line_strip = line.strip()
-        if not line_strip or len(line_strip) < 3:
-            continue
-            
-        line_lower = line_strip.lower()
-        
-        # Verifica se é uma linha de transação ou informação relevante
-        is_transaction = (
-            # Linhas com datas e valores (padrão de transação)
-            bool(re.search(r'\d{2}.*de.*\d{4}.*r\$', line_lower)) or
-            # Linhas com valores monetários significativos
-            bool(re.search(r'r\$\s*\d+[.,]\d{2}', line_lower)) or
-            # Linhas com operações financeiras específicas
-            any(op in line_lower for op in ['pix enviado', 'pix recebido', 'deposito', 'saque', 'ted', 'doc', 'transferencia', 'resgate', 'aplicacao']) or
-            # Linhas com estabelecimentos comerciais
-            bool(re.search(r'(posto|drogaria|supermercado|loja|shopping|mercado)', line_lower)) or
-            # Linhas com saldo
-            'saldo' in line_lower
-        )
-        
-        # Verifica se deve ser ignorada (palavras-chave irrelevantes)
-        should_ignore = any(keyword in line_lower for keyword in IGNORE_KEYWORDS_GLOBAL)
-        
-        # Força manter se for palavra-chave importante
-        force_keep = any(keyword in line_lower for keyword in KEEP_KEYWORDS_GLOBAL)
-        
-        # Ignora linhas com apenas códigos de barras ou hashes
-        if re.match(r'^[\d\s\.\*]+$', line_strip) and len(line_strip) > 20:
-            continue
-            
-        # Ignora linhas com apenas asteriscos e números (número de cartão mascarado sozinho)
-        if re.match(r'^\d{4}\*+\d{4}$', line_strip):
-            continue
-            
-        # Adiciona à lista se for transação relevante e não deve ser ignorada
-        if (is_transaction or force_keep) and not should_ignore:
-            filtered_data.append(line_strip)
-        elif force_keep:  # Força manter mesmo se houver palavras para ignorar
-            filtered_data.append(line_strip)
-            
-    return "\n".join(filtered_data)
+OCR_MAX_TOKENS = 4000  # max_tokens de cada chamada de OCR (também entra na estimativa do limite de tokens/min)
 
 # ##################################################################
 # FERRAMENTA 1: EXTRATOR DE TEXTO NATIVO (RÁPIDO)
 # ##################################################################
 class NativePDFExtractorTool(BaseTool): 
-    # (Esta classe permanece INALTERADA)
     name: str = "Extrator de Texto Nativo PDF"; description: str = "RÁPIDO. Extrai texto de um PDF (NATIVO)..."
     IGNORE_KEYWORDS: ClassVar[list[str]] = IGNORE_KEYWORDS_GLOBAL; KEEP_KEYWORDS: ClassVar[list[str]] = KEEP_KEYWORDS_GLOBAL
+    max_workers: int = Field(default_factory=default_native_workers)  # >1 ativa a extração paralela por faixas de páginas
+    cache: Any = Field(default_factory=get_default_cache)  # ExtractionCache ou None
+    # Espaços de layout, cabeçalhos/rodapés repetidos e orçamento de tokens (ver text_condenser)
+    condense_settings: CondenseSettings = Field(default_factory=CondenseSettings.from_env)
+    CACHE_NAMESPACE: ClassVar[str] = "native:3"
+    def cache_namespace(self) -> str:
+        """Namespace do cache: cada motor (QUARTAVIA_NATIVE_ENGINE) dá um texto diferente."""
+        return f"{self.CACHE_NAMESPACE}:{native_engine()}"
     def _clean_and_filter(self, text_lines: list[str]) -> str: return clean_and_filter_lines(text_lines)
-    def _extract_text(self, pdf_page: pdfplumber.page.Page) -> list[str] | None:
+    def _extract_text(self, pdf_page: pdfplumber.page.Page) -> list[str] | None: return extract_page_lines(pdf_page)
+    def _process_page(self, pdf_page: pdfplumber.page.Page) -> tuple[str, str] | None:
+        """Extrai e filtra uma página, retornando (texto bruto, texto filtrado) ou None."""
         try:
-            # Primeira tentativa: extração com layout preservado
-            text = pdf_page.extract_text(layout=True, use_text_flow=True, x_tolerance=1, y_tolerance=3)
-            print(f"DEBUG: Primeira tentativa (layout=True): {text[:100] if text else 'None'}...")
-            
-            # Segunda tentativa: extração simples
-            if not text or text.strip() == "":
-                text = pdf_page.extract_text()
-                print(f"DEBUG: Segunda tentativa (simples): {text[:100] if text else 'None'}...")
-            
-            # Terceira tentativa: extração com diferentes tolerâncias
-            if not text or text.strip() == "":
-                text = pdf_page.extract_text(x_tolerance=3, y_tolerance=3)
-                print(f"DEBUG: Terceira tentativa (tolerância maior): {text[:100] if text else 'None'}...")
-            
-            # Quarta tentativa: extração de caracteres individuais
-            if not text or text.strip() == "":
-                chars = pdf_page.chars
-                if chars:
-                    text = " ".join([c.get('text', '') for c in chars if c.get('text', '').strip()])
-                    print(f"DEBUG: Quarta tentativa (chars): {text[:100] if text else 'None'}...")
-            
-            if not text or text.strip() == "":
-                print(f"DEBUG: TODAS as tentativas de extração falharam.")
-                return None
-                
-            print(f"DEBUG: Texto extraído com sucesso: {len(text)} caracteres")
-            return text.split('\n')
-            
-        except Exception as e: 
-            print(f"DEBUG: pdfplumber falhou ao extrair texto: {e}")
-            return None
-    def _download_from_url(self, url: str) -> str | None:
-        try:
-            response = requests.get(url, stream=True); response.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk: tmp_file.write(chunk)
-                return tmp_file.name
-        except Exception: return None
-    def _extract_from_path(self, file_path: str) -> str:
-        print(f"DEBUG: _extract_from_path iniciado com: {file_path}")
-        if not isinstance(file_path, str): 
-            print("DEBUG: file_path não é string")
-            return "Erro: 'file_path' deve ser uma string válida."
-        
-        parsed_url = urlparse(file_path)
-        is_url = parsed_url.scheme in ['http', 'https']
-        temp_path_to_clean = None
-        
-        if is_url:
-            print(f"DEBUG: NativeTool baixando URL: {file_path}")
-            local_pdf_path = self._download_from_url(file_path)
-            if not local_pdf_path: 
-                print("DEBUG: Falha no download")
-                return f"Erro: Falha ao baixar PDF da URL."
-            temp_path_to_clean = local_pdf_path
-            print(f"DEBUG: PDF baixado para: {local_pdf_path}")
-        elif os.path.exists(file_path): 
-            print(f"DEBUG: NativeTool usando path local: {file_path}")
-            local_pdf_path = file_path
-        else: 
-            print(f"DEBUG: Arquivo não encontrado: {file_path}")
-            return f"Erro: arquivo não encontrado: {file_path}"
+            return process_page_lines(self._extract_text(pdf_page), self._clean_and_filter)
+        finally:
+            pdf_page.close()  # libera o layout e os caracteres da página antes da próxima
+    def iter_pages(self, source: PDFSource) -> Iterator[PageResult]:
+        """Extrai e filtra página a página (em paralelo se configurado), na ordem do PDF.
+
+        Numa sessão de documento, as páginas já extraídas na execução vêm da sessão.
+        """
+        session = session_for(source)
+        with use_pdfplumber(source) as pdf:
+            with page_lock(pdf):
+                page_count = len(pdf.pages)
+            logger.debug("PDF aberto com pdfplumber: %d páginas", page_count)
+            cached = [session.get_artifact(ARTIFACT_NATIVE, i) for i in range(page_count)] if session else []
+            if cached and MISSING not in cached:
+                for i, page_result in enumerate(cached):
+                    yield self._page_result(i + 1, page_result)
+                return
+            if not (self.max_workers > 1 and page_count >= parallel_min_pages()):
+                for i in range(page_count):
+                    # O handle pode ser o da sessão: exclusivo só durante a leitura da página, não no yield
+                    with page_lock(pdf):
+                        page_result = self._process_page(pdf.pages[i])
+                    if session is not None:
+                        session.set_artifact(ARTIFACT_NATIVE, i, page_result)
+                    yield self._page_result(i + 1, page_result)
+                return
+        logger.debug("Extração paralela de %d páginas com %d workers", page_count, self.max_workers)
+        # Cada faixa vai para um processo: um arquivo local vai pelo caminho, não com o PDF inteiro em bytes
+        if session is not None and not is_url(session.file_path) and os.path.isfile(session.file_path):
+            source = session.file_path
+        for i, page_result in enumerate(iter_pages_parallel(source, page_count, self.max_workers)):
+            if session is not None:
+                session.set_artifact(ARTIFACT_NATIVE, i, page_result)
+            yield self._page_result(i + 1, page_result)
+    @staticmethod
+    def _page_result(page_number: int, page_result: tuple[str, str] | None) -> PageResult:
+        if page_result is None:
+            return PageResult(page_number, METHOD_NATIVE, None)
+        return PageResult(page_number, METHOD_NATIVE, *page_result)
+    def _extract_pages(self, source: PDFSource) -> list[tuple[str, str] | None]:
+        """Extrai e filtra todas as páginas, retornando (texto bruto, texto filtrado) ou None por página."""
+        return [None if page.raw_text is None else (page.raw_text, page.filtered_text) for page in self.iter_pages(source)]
+    def _extract_from_source(self, source: PDFSource) -> str:
+        """Extrai e filtra o texto nativo de um PDF já resolvido (caminho local ou bytes)."""
         all_filtered_data = []
         has_relevant_content = False
         pdf_seems_empty_or_image = True 
         total_text_chars = 0
-        all_raw_text = []  # Para armazenar texto bruto caso o filtro seja muito restritivo
-        
-        print(f"DEBUG: Iniciando processamento do PDF: {local_pdf_path}")
+        # Texto bruto para o caso de o filtro ser muito restritivo; descartado (não acumula
+        # mais) assim que aparece a primeira página com dados filtrados
+        all_raw_text = []
         
         try:
-            print(f"DEBUG: Tentando abrir PDF com pdfplumber...")
-            with pdfplumber.open(local_pdf_path) as pdf:
-                print(f"DEBUG: PDF aberto com sucesso! Número de páginas: {len(pdf.pages)}")
-                print(f"DEBUG: Tentando extrair texto nativo com pdfplumber de {len(pdf.pages)} páginas...")
+            pages_without_text = []
+            for page in self.iter_pages(source):
+                if page.raw_text is None: 
+                    pages_without_text.append(page.page_number)
+                    continue 
                 
-                for i, page in enumerate(pdf.pages):
-                    extracted_lines = self._extract_text(page) 
-                    
-                    if extracted_lines is None: 
-                        continue 
-                    
-                    # Se conseguiu extrair algo, marca que o PDF não é uma imagem
-                    pdf_seems_empty_or_image = False 
-                    
-                    raw_page_text = "\n".join(extracted_lines).strip()
-                    total_text_chars += len(raw_page_text)
+                # Se conseguiu extrair algo, marca que o PDF não é uma imagem
+                pdf_seems_empty_or_image = False 
+                total_text_chars += len(page.raw_text)
+                
+                if page.raw_text:
+                    if not has_relevant_content:
+                        all_raw_text.append(f"\n--- PÁGINA {page.page_number} (BRUTO) ---\n{page.raw_text}")
                     
-                    if raw_page_text:
-                        all_raw_text.append(f"\n--- PÁGINA {i+1} (BRUTO) ---\n{raw_page_text}")
-                        
-                        filtered_text = self._clean_and_filter(extracted_lines)
-                        
-                        if filtered_text:
-                            all_filtered_data.append(f"\n--- DADOS (PÁGINA {i+1}) ---\n")
-                            all_filtered_data.append("Método: Texto Nativo\n")
-                            all_filtered_data.append(filtered_text)
-                            has_relevant_content = True
+                    if page.filtered_text:
+                        all_filtered_data.append(f"\n--- DADOS (PÁGINA {page.page_number}) ---\n")
+                        all_filtered_data.append(f"Método: {METHOD_NATIVE}\n")
+                        all_filtered_data.append(page.filtered_text)
+                        has_relevant_content = True
+                        all_raw_text = []
                         
             # Análise dos resultados
             if not pdf_seems_empty_or_image:
                 if has_relevant_content: 
                     final_result = "\n".join(all_filtered_data)
+                    if pages_without_text:
+                        # PDF misto: avisa o agente que há páginas escaneadas
+                        final_result += (f"\n\n(Páginas sem texto nativo: {', '.join(map(str, pages_without_text))}. "
+                                         "Use o Extrator Híbrido de PDF para incluí-las via OCR.)")
                     return final_result
                 else: 
                     # Retorna pelo menos o texto bruto se o filtro removeu tudo
@@ -225,16 +191,13 @@ class NativePDFExtractorTool(BaseTool):
                 return "Erro: O PDF parece ser uma imagem ou está vazio/ilegível. Tente a ferramenta de OCR."
                 
         except Exception as e: 
-            print(f"ERRO: pdfplumber falhou ao processar PDF: {e}")
+            logger.error("pdfplumber falhou ao processar PDF: %s", e)
             return "Erro: O PDF parece ser uma imagem ou está corrompido. Tente a ferramenta de OCR."
-        finally:
-            if temp_path_to_clean and os.path.exists(temp_path_to_clean):
-                try: os.unlink(temp_path_to_clean)
-                except: pass
     def _run(self, file_path: str) -> str:
         if not file_path or not isinstance(file_path, str): 
             return "Erro: 'file_path' deve ser uma string válida."
-        return self._extract_from_path(file_path)
+        result = run_with_cache(self.cache, self.cache_namespace(), file_path, self._extract_from_source)
+        return condense_tool_output(result, self.condense_settings)
     async def _arun(self, file_path: str) -> str: return await asyncio.to_thread(self._run, file_path=file_path)
 
 
@@ -247,202 +210,609 @@ class PDFToOCRTool(BaseTool):
     description: str = "LENTO. Usa a API OpenAI GPT-4.1-nano para OCR de PDFs através de análise de imagem."
     
     client: Any = None 
+    _client_pending: bool = PrivateAttr(default=False)
     api_key: str = None
     model_name: str = None
 
+    # Concorrência e retentativas das chamadas de OCR por página
+    max_concurrency: int = Field(default_factory=lambda: int(os.getenv("OCR_MAX_CONCURRENCY", "4")))
+    max_retries: int = Field(default_factory=lambda: int(os.getenv("OCR_MAX_RETRIES", "3")))
+    retry_backoff: float = Field(default_factory=lambda: float(os.getenv("OCR_RETRY_BACKOFF", "1.0")))
+    # Limites de requisições/tokens, fila justa entre documentos e disjuntor do processo (ver ocr_scheduler)
+    scheduler: Any = Field(default_factory=get_scheduler)  # OCRScheduler ou None
+    cache: Any = Field(default_factory=get_default_cache)  # ExtractionCache ou None
+    # Gravação/reprodução das chamadas de OCR (QUARTAVIA_REPLAY, ver replay)
+    replay_store: Any = Field(default_factory=get_replay_store)  # ReplayStore ou None
+    # DPI adaptativo, tons de cinza, JPEG/WebP, corte de margens e faixas (ver page_rendering)
+    render_settings: RenderSettings = Field(default_factory=RenderSettings.from_env)
+    condense_settings: CondenseSettings = Field(default_factory=CondenseSettings.from_env)
+    last_render_report: str = ""  # métricas (DPI, bytes, tempo) da última renderização
+    # 'openai' (API de visão) ou um backend local registrado em ocr_backends ('tesseract', 'easyocr')
+    ocr_backend: str = Field(default_factory=lambda: os.getenv("OCR_BACKEND", "openai").lower())
+    # Com backend local, páginas abaixo desta confiança (0..1) são refeitas pela API, se disponível
+    escalation_confidence: float = Field(default_factory=lambda: float(os.getenv("OCR_ESCALATION_CONFIDENCE", "0.8")))
+    last_ocr_report: str = ""  # método (e confiança) usado em cada página no último OCR
+    # Máximo de páginas renderizadas em memória: o OCR anda em janelas deste tamanho (ver page_stream)
+    max_pages_in_memory: int = Field(default_factory=default_stream_window)
+    # Pula antes do OCR as páginas que são só texto padrão (ver page_triage)
+    triage_settings: TriageSettings = Field(default_factory=TriageSettings.from_env)
+    last_triage_report: str = ""  # nota e decisão de cada página na última triagem
+
     IGNORE_KEYWORDS: ClassVar[list[str]] = IGNORE_KEYWORDS_GLOBAL
     KEEP_KEYWORDS: ClassVar[list[str]] = KEEP_KEYWORDS_GLOBAL
 
-    def __init__(self):
-        super().__init__()
-        print("DEBUG: Iniciando __init__ da PDFToOCRTool (OpenAI)...")
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         if not OCR_AVAILABLE: 
-            print("ERRO FATAL: PDFToOCRTool __init__ falhou: Falta 'openai' ou 'PyMuPDF'."); self.client = None; return
+            logger.error("PDFToOCRTool sem OCR: falta 'openai' ou 'PyMuPDF'."); self.client = None; return
             
-        # --- DEBUG APRIMORADO ---
         try:
+            # O modelo entra na chave das gravações: definido mesmo sem chave de API (modo replay)
+            self.model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4.1-nano")
             self.api_key = os.getenv("OPENAI_API_KEY")
             if not self.api_key:
-                print("ERRO CRÍTICO no __init__: OPENAI_API_KEY não encontrada nas variáveis de ambiente.")
+                # Sem chave ainda dá para usar um backend local (OCR_BACKEND) ou as gravações
+                # (QUARTAVIA_REPLAY=replay); só a API fica indisponível
+                replaying = self.replay_store is not None and self.replay_store.replaying
+                log = logger.info if self.ocr_backend != "openai" or replaying else logger.error
+                log("OPENAI_API_KEY não encontrada nas variáveis de ambiente.")
                 self.client = None
                 return
 
-            self.model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4.1-nano")
-            print(f"DEBUG no __init__: Usando modelo: {self.model_name}")
-
             # Loga a chave parcialmente mascarada
             masked_key = self.api_key[:5] + "****" + self.api_key[-4:] if len(self.api_key) > 9 else "****"
-            print(f"DEBUG no __init__: OPENAI_API_KEY encontrada: '{masked_key}'")
+            logger.debug("OCR com o modelo %s, OPENAI_API_KEY '%s'", self.model_name, masked_key)
 
-            # Tenta inicializar o cliente e loga sucesso ou falha específica
-            print("DEBUG no __init__: Tentando inicializar cliente OpenAI...")
-            self.client = OpenAI(api_key=self.api_key)
-            print("DEBUG no __init__: Cliente OpenAI inicializado com SUCESSO.")
+            # O cliente em si é criado no primeiro uso (_get_client), não na construção da ferramenta
+            self._client_pending = True
 
         except Exception as e:
-            # Loga o erro EXATO que ocorreu durante a inicialização
-            print(f"ERRO CRÍTICO no __init__: Falha ao inicializar o cliente OpenAI. Verifique a API Key ou conectividade. Erro: {type(e).__name__} - {e}")
-            print(f"DEBUG Traceback __init__:\n{traceback.format_exc()}")
+            logger.exception("Falha ao configurar o cliente OpenAI: %s - %s", type(e).__name__, e)
             self.client = None
-        # --- FIM DO DEBUG APRIMORADO ---
+
+    def _get_client(self) -> Any:
+        """Cliente OpenAI do processo (ver ocr_scheduler.get_openai_client), obtido na primeira chamada de OCR.
+
+        Com gravação ligada, o cliente passa pelas gravações; no modo replay não precisa de chave.
+        """
+        if self.client is None and self._client_pending:
+            self._client_pending = False
+            try:
+                self.client = get_openai_client(self.api_key)
+                logger.debug("Cliente OpenAI inicializado.")
+            except Exception as e:
+                logger.exception("Falha ao inicializar o cliente OpenAI. Verifique a API Key ou conectividade. "
+                                 "Erro: %s - %s", type(e).__name__, e)
+        if self.replay_store is not None and not isinstance(self.client, ReplayOpenAIClient):
+            if self.client is not None or self.replay_store.replaying:
+                self.client = ReplayOpenAIClient(self.replay_store, self.client)
+        return self.client
             
     def _clean_and_filter(self, text_lines: list[str]) -> str:
         return clean_and_filter_lines(text_lines)
     
-    def _encode_image(self, image_bytes: bytes) -> str:
-        """Codifica bytes de imagem em base64"""
-        return base64.b64encode(image_bytes).decode('utf-8')
-    
-    def _pdf_to_images_base64(self, pdf_path: str) -> list[str]:
-        """Converte PDF para lista de imagens em base64"""
+    def _render_pages(self, source: PDFSource, page_numbers: list[int] | None = None) -> list[RenderedPage]:
+        """Renderiza o PDF (ou apenas as páginas indicadas, base 0) para o OCR, com o relatório de bytes/tempo"""
         try:
-            pdf_document = fitz.open(pdf_path)
-            images_b64 = []
-            
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                # Renderiza a página como imagem (PNG)
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom para melhor qualidade
-                img_data = pix.tobytes("png")
-                b64_string = self._encode_image(img_data)
-                images_b64.append(b64_string)
-                
-            pdf_document.close()
-            return images_b64
-            
+            pages = render_pages(source, page_numbers, self.render_settings)
         except Exception as e:
-            print(f"ERRO ao converter PDF para imagens: {e}")
-            print(f"DEBUG Traceback PDF->Imagem:\n{traceback.format_exc()}")
+            logger.exception("Erro ao converter PDF para imagens: %s", e)
             return []
-        
+        self.last_render_report = format_render_report(pages)
+        logger.debug("Renderização para OCR:\n%s", self.last_render_report)
+        return pages
+
+    def _build_messages(self, img_b64: str, mime_type: str = "image/png") -> list[dict]:
+        """Monta a mensagem de visão enviada para uma página."""
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text", 
+                        "text": "Analise esta imagem de um documento financeiro (extrato bancário, fatura de cartão, etc.) e extraia TODOS os dados textuais visíveis. Retorne apenas o texto extraído, sem comentários ou formatação adicional. Mantenha a estrutura original o máximo possível."
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{mime_type};base64,{img_b64}"
+                        }
+                    }
+                ]
+            }
+        ]
+
+    def _ocr_page(self, img_b64: str, mime_type: str = "image/png", job: OCRJob | None = None,
+                  tokens: int = 0) -> str:
+        """Faz uma única chamada (bloqueante) de OCR para uma imagem (página ou faixa de página).
+
+        A chamada espera a vez do job no agendador do processo; tokens é a estimativa para o limite de tokens/min.
+        Respostas reproduzidas de gravações (replay) não passam pelo agendador.
+        """
+        client = self._get_client()
+        queued = self.scheduler is not None and getattr(client, "needs_network", True)
+        slot = self.scheduler.slot(job or current_job(), tokens) if queued else nullcontext({})
+        with slot as usage:
+            response = client.chat.completions.create(
+                model=self.model_name,
+                messages=self._build_messages(img_b64, mime_type),
+                max_tokens=OCR_MAX_TOKENS,
+                temperature=0.1
+            )
+            usage["tokens"] = getattr(getattr(response, "usage", None), "total_tokens", None)
+        return (response.choices[0].message.content or "").strip()
+
+    async def _ocr_page_with_retry(self, page_number: int, img_b64: str, semaphore: asyncio.Semaphore,
+                                   mime_type: str = "image/png", job: OCRJob | None = None,
+                                   tokens: int = 0) -> tuple[str | None, str | None]:
+        """OCR de uma página com retentativas e backoff exponencial. Retorna (texto, erro)."""
+        last_error = None
+        with tracing.span("ocr_page", page=page_number, model=self.model_name) as span:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    span.add("ocr_retries")
+                async with semaphore:
+                    try:
+                        span.add("ocr_calls")
+                        text = await asyncio.to_thread(self._ocr_page, img_b64, mime_type, job, tokens)
+                        span.set("attempts", attempt + 1)
+                        span.add("ocr_chars", len(text))
+                        return text, None
+                    except Exception as page_error:
+                        last_error = page_error
+                        logger.warning("Erro no OCR da página %d (tentativa %d): %s", page_number, attempt + 1, page_error)
+                # Erros de requisição (4xx, exceto 429) não melhoram com retentativa; com o disjuntor
+                # aberto, a API está fora e a página falha na hora
+                status_code = getattr(last_error, "status_code", None)
+                if status_code is not None and 400 <= status_code < 500 and status_code != 429:
+                    break
+                if isinstance(last_error, CircuitOpenError):
+                    break
+                if isinstance(last_error, ReplayMissError):
+                    # Sem gravação não há o que tentar de novo: a reprodução falha por inteiro
+                    raise last_error
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+            span.set("attempts", attempt + 1)
+            span.set("error", type(last_error).__name__)
+            span.add("ocr_pages_failed")
+        return None, f"{type(last_error).__name__} - {last_error}"
+
+    async def _aocr_pages(self, pages: list[RenderedPage], job: OCRJob | None = None) -> list[tuple[str | None, str | None]]:
+        """OCR concorrente das páginas (e faixas), limitado a max_concurrency chamadas em andamento."""
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        job = job or current_job()
+        tasks = [self._ocr_page_with_retry(page.page_index + 1, img, semaphore, page.mime_type, job,
+                                           estimate_request_tokens(page.width, height, OCR_MAX_TOKENS))
+                 for page in pages
+                 for img, height in zip(page.images_b64, page.tile_heights or [page.height] * len(page.images_b64))]
+        # gather preserva a ordem das páginas e das faixas
+        tile_results = iter(await asyncio.gather(*tasks))
+        results = []
+        for page in pages:
+            tiles = [next(tile_results) for _ in page.images_b64]
+            errors = [error for _, error in tiles if error is not None]
+            if errors:
+                results.append((None, errors[0]))
+            else:
+                results.append(("\n".join(text for text, _ in tiles if text), None))
+        return results
+
+    def _get_local_backend(self) -> ProcessPoolOCRBackend | None:
+        return None if self.ocr_backend == "openai" else get_backend(self.ocr_backend)
+
+    def _get_triage_backend(self) -> ProcessPoolOCRBackend | None:
+        """Backend local do OCR rápido da triagem, se configurado e registrado."""
+        if not self.triage_settings.backend:
+            return None
+        try:
+            return get_backend(self.triage_settings.backend)
+        except ValueError as e:
+            logger.warning("Triagem sem OCR rápido: %s", e)
+            return None
+
+    def _triage_enabled(self) -> bool:
+        return self.triage_settings.enabled and self.triage_settings.threshold > 0
+
+    def _text_layer_trusted(self, document) -> bool:
+        """Se a camada de texto do documento serve de evidência para a triagem (ver page_triage)."""
+        if not self._triage_enabled():
+            return False
+        try:
+            return text_layer_trusted(document, self.triage_settings)
+        except Exception as e:
+            logger.warning("Triagem sem a camada de texto: %s", e)
+            return False
+
+    def _triage_window(self, document, page_indices: list[int], trusted: bool) -> dict[int, TriageResult]:
+        """Triagem de uma janela de páginas; se falhar, nenhuma página é pulada."""
+        if not self._triage_enabled():
+            return {}
+        try:
+            return triage_pages(document, page_indices, self.triage_settings, self._get_triage_backend(), trusted)
+        except Exception as e:
+            logger.warning("Triagem falhou; todas as páginas da janela vão para o OCR: %s", e)
+            return {}
+
+    def _ocr_label(self) -> str:
+        if self.ocr_backend == "openai":
+            return "OpenAI GPT-4.1-nano"
+        return f"{self.ocr_backend} local" + (" + OpenAI" if "-> api" in self.last_ocr_report else "")
+
+    def _ocr_available(self) -> bool:
+        """Há como fazer OCR: backend local configurado ou cliente da API."""
+        return self.ocr_backend != "openai" or bool(self._get_client())
+
+    def _ocr_pages(self, pages: list[RenderedPage], job: OCRJob | None = None) -> list[tuple[str | None, str | None]]:
+        """OCR das páginas pelo backend configurado. Retorna (texto, erro) por página, na ordem.
+
+        Com backend local, páginas com erro, sem texto ou com confiança abaixo de
+        escalation_confidence são refeitas pela API (quando há cliente); se a API
+        também falhar, fica o texto local.
+        """
+        backend = self._get_local_backend()
+        if backend is None:
+            self.last_ocr_report = "\n".join(f"página {p.page_index + 1}: api" for p in pages)
+            return self._ocr_pages_api(pages, job)
+
+        with tracing.span("ocr_local", backend=backend.name, pages=len(pages)) as span:
+            local_results = backend.recognize(pages)
+            span.add("ocr_chars", sum(len(r.text or "") for r in local_results))
+        results = [(r.text, None) if r.text else (None, r.error or "Nenhum texto reconhecido") for r in local_results]
+        report = [f"página {p.page_index + 1}: {backend.name}"
+                  + (f" {r.confidence:.2f}" if r.confidence is not None else "") for p, r in zip(pages, local_results)]
+        to_escalate = [i for i, r in enumerate(local_results)
+                       if r.error or not r.text or (r.confidence is not None and r.confidence < self.escalation_confidence)]
+        if to_escalate and self._get_client():
+            logger.debug("Escalando %d de %d páginas do OCR local para a API", len(to_escalate), len(pages))
+            tracing.count("ocr_escalated_pages", len(to_escalate))
+            api_results = self._ocr_pages_api([pages[i] for i in to_escalate], job)
+            for i, (text, error) in zip(to_escalate, api_results):
+                if error is None:
+                    results[i] = (text, None)
+                    report[i] += " -> api"
+                else:
+                    report[i] += f" -> api falhou ({error})"
+        self.last_ocr_report = "\n".join(report)
+        logger.debug("OCR por página:\n%s", self.last_ocr_report)
+        return results
+
+    def _ocr_pages_api(self, pages: list[RenderedPage], job: OCRJob | None = None) -> list[tuple[str | None, str | None]]:
+        """Versão síncrona de _aocr_pages, segura mesmo se já houver um event loop rodando."""
+        job = job or current_job()  # lido aqui: o contexto não acompanha a thread abaixo
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._aocr_pages(pages, job))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self._aocr_pages(pages, job)).result()
+
+    def _format_skipped_pages(self, skipped_pages: list[int]) -> str:
+        """Aviso das páginas que a triagem pulou (o agente fica sabendo que não foram perdidas)."""
+        if not skipped_pages:
+            return ""
+        return (f"\n\n(Páginas puladas pela triagem por não terem lançamentos: "
+                f"{', '.join(map(str, skipped_pages))})")
+
+    def _format_failed_pages(self, failed_pages: list[tuple[int, str]]) -> str:
+        """Relatório das páginas que falharam no OCR após todas as retentativas."""
+        if not failed_pages:
+            return ""
+        report = f"\n\n--- PÁGINAS COM FALHA NO OCR: {', '.join(str(n) for n, _ in failed_pages)} ---"
+        for page_number, error in failed_pages:
+            report += f"\nPágina {page_number}: {error}"
+        return report
+
     def _run(self, file_path: str) -> str:
         """Executa a extração OCR via API OpenAI GPT-4.1-nano, aceitando URLs e arquivos locais."""
-        print("DEBUG: Iniciando _run da PDFToOCRTool (OpenAI)...")
         if not OCR_AVAILABLE: 
             return "Erro: Falta 'openai' ou 'PyMuPDF'." 
         
-        # Checa se o cliente foi inicializado com sucesso no __init__
-        if not self.client: 
-            print("ERRO no _run: Cliente OpenAI não está inicializado. Verifique logs do __init__.")
+        # Cria o cliente no primeiro uso (ou checa se a configuração do __init__ falhou);
+        # com backend local a API é opcional (só para escalar páginas de baixa confiança)
+        if not self._ocr_available(): 
+            logger.error("Cliente OpenAI não está inicializado e não há backend local de OCR.")
             return "Erro: Cliente OpenAI não inicializado. Verifique a configuração da API Key ou logs de inicialização."
             
         if not file_path or not isinstance(file_path, str): 
             return "Erro: 'file_path' deve ser uma string válida."
 
-        parsed_url = urlparse(file_path)
-        is_url = parsed_url.scheme in ['http', 'https']
-        temp_path_to_clean = None
-        
-        # Determina o caminho local do PDF
-        if is_url:
-            print(f"DEBUG: OCR Tool baixando URL: {file_path}")
-            local_pdf_path = self._download_from_url(file_path)
-            if not local_pdf_path: 
-                return "Erro: Falha ao baixar PDF da URL."
-            temp_path_to_clean = local_pdf_path
-        elif os.path.exists(file_path):
-            print(f"DEBUG: OCR Tool usando path local: {file_path}")
-            local_pdf_path = file_path
-        else:
-            return f"Erro: arquivo não encontrado: {file_path}"
+        result = run_with_cache(self.cache, self.cache_namespace("ocr"), file_path, self._extract_from_source,
+                                self._is_cacheable_output)
+        return condense_tool_output(result, self.condense_settings)
+
+    def cache_namespace(self, prefix: str) -> str:
+        """Namespace do cache: o texto do OCR depende do backend, do modelo e da renderização."""
+        namespace = f"{prefix}:{self.model_name}:{self.render_settings.signature()}:{self.triage_settings.signature()}"
+        backend = self._get_local_backend()
+        if backend is not None:
+            namespace += f":{backend.signature()}@{self.escalation_confidence:g}"
+        return namespace
+
+    def _is_cacheable_output(self, result: str) -> bool:
+        """Só guarda no cache resultados completos (sem erro e sem páginas com falha)."""
+        return bool(result) and not result.startswith("Erro") and "PÁGINAS COM FALHA NO OCR" not in result
 
+    def iter_pages(self, source: PDFSource, page_indices: list[int] | None = None) -> Iterator[PageResult]:
+        """Renderiza, faz o OCR e filtra as páginas (base 0; todas se None), entregando uma a uma.
+
+        As páginas andam em janelas de max_pages_in_memory: as imagens de uma janela
+        são descartadas antes de a próxima ser renderizada. Antes de renderizar, a
+        triagem pula as páginas sem lançamentos (PageResult.skipped). Ao final,
+        last_render_report, last_ocr_report e last_triage_report cobrem todas as páginas.
+        Numa sessão de documento, páginas já lidas pelo OCR na execução não são refeitas.
+        """
+        window = max(1, self.max_pages_in_memory)
+        job = current_job()  # todas as janelas do documento contam como um job na fila do agendador
+        session = session_for(source)
+        namespace = self.cache_namespace("ocr") if session is not None else ""
+        render_stats: list[RenderedPage] = []
+        ocr_reports: list[str] = []
+        triage_results: list[TriageResult] = []
         try:
-            print(f"DEBUG: Convertendo PDF para imagens base64...")
-            images_b64 = self._pdf_to_images_base64(local_pdf_path)
+            with use_fitz(source) as document:
+                with page_lock(document):
+                    page_count = len(document)
+                indices = list(range(page_count)) if page_indices is None else list(page_indices)
+                trusted = self._text_layer_trusted(document)
+                for start in range(0, len(indices), window):
+                    window_indices = indices[start:start + window]
+                    triage = self._triage_window(document, window_indices, trusted)
+                    triage_results.extend(triage[i] for i in window_indices if i in triage)
+                    batch = []
+                    for i in window_indices:
+                        if i in triage and triage[i].skip:
+                            batch.append((i, triage[i]))
+                            continue
+                        done = session.get_artifact(ARTIFACT_OCR, i, namespace) if session is not None else MISSING
+                        if done is not MISSING:
+                            batch.append((i, PageResult(i + 1, METHOD_OCR, *done)))
+                            continue
+                        try:
+                            batch.append((i, self._render_page(document, i, session)))
+                        except Exception as e:
+                            logger.exception("Erro ao converter a página %d em imagem: %s", i + 1, e)
+                            batch.append((i, None))
+                    rendered = [page for _, page in batch if isinstance(page, RenderedPage)]
+                    results = iter(self._ocr_pages(rendered, job) if rendered else [])
+                    ocr_reports.append(self.last_ocr_report if rendered else "")
+                    # Só as métricas ficam para o relatório; as imagens saem com a janela
+                    render_stats.extend(replace(page, images_b64=[""] * len(page.images_b64)) for page in rendered)
+                    for i, page in batch:
+                        if isinstance(page, TriageResult):
+                            yield PageResult(i + 1, METHOD_OCR, None, skipped=page.reason)
+                            continue
+                        if isinstance(page, PageResult):
+                            yield page
+                            continue
+                        if page is None:
+                            yield PageResult(i + 1, METHOD_OCR, None, error="Falha ao converter página em imagem")
+                            continue
+                        text, error = next(results)
+                        filtered_text = self._clean_and_filter(text.split('\n')) if text else ""
+                        if session is not None and error is None:
+                            session.set_artifact(ARTIFACT_OCR, i, (text, filtered_text), namespace)
+                        yield PageResult(i + 1, METHOD_OCR, text, filtered_text, error)
+                    del batch, rendered
+                    release_render_memory()
+        finally:
+            self.last_render_report = format_render_report(render_stats)
+            self.last_ocr_report = "\n".join(report for report in ocr_reports if report)
+            self.last_triage_report = format_triage_report(triage_results)
+            if any(result.skip for result in triage_results):
+                logger.info("Triagem antes do OCR:\n%s", self.last_triage_report)
+            logger.debug("Renderização para OCR:\n%s", self.last_render_report)
+
+    def _render_page(self, document, page_index: int, session: DocumentSession | None) -> RenderedPage:
+        """Renderiza a página (base 0), reaproveitando a imagem da sessão do documento se houver."""
+        key = self.render_settings.signature()
+        if session is not None:
+            cached = session.get_artifact(ARTIFACT_RENDER, page_index, key)
+            if cached is not MISSING:
+                return cached
+        with page_lock(document):
+            page = render_page(document.load_page(page_index), page_index, self.render_settings)
+        if session is not None:
+            session.set_artifact(ARTIFACT_RENDER, page_index, page, key,
+                                 nbytes=sum(len(image) for image in page.images_b64))
+        return page
+
+    def _extract_from_source(self, source: PDFSource) -> str:
+        """Renderiza e faz o OCR de todas as páginas do PDF (caminho local ou bytes)."""
+        page_count = 0
+        try:
+            filtered_pages = []
+            pages_with_text = 0
+            failed_pages = []
+            skipped_pages = []
+            for page in self.iter_pages(source):
+                page_count += 1
+                if page.skipped is not None:
+                    skipped_pages.append(page.page_number)
+                elif page.error is not None:
+                    failed_pages.append((page.page_number, page.error))
+                elif page.raw_text:
+                    pages_with_text += 1
+                    if page.filtered_text:
+                        filtered_pages.append(page.filtered_text)
+                else:
+                    logger.debug("Página %d retornou texto vazio.", page.page_number)
+            failure_report = self._format_skipped_pages(skipped_pages) + self._format_failed_pages(failed_pages)
             
-            if not images_b64:
+            if not page_count:
                 return "Erro: Falha ao converter PDF em imagens."
+            if not pages_with_text and not skipped_pages:
+                return "Erro: Nenhum texto foi extraído de nenhuma página." + failure_report
             
-            print(f"DEBUG: {len(images_b64)} páginas convertidas. Processando com OpenAI...")
-            
-            all_extracted_text = []
-            
-            for i, img_b64 in enumerate(images_b64):
-                try:
-                    print(f"DEBUG: Processando página {i+1}/{len(images_b64)} com GPT-4.1-nano...")
-                    
-                    response = self.client.chat.completions.create(
-                        model=self.model_name,
-                        messages=[
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "text", 
-                                        "text": "Analise esta imagem de um documento financeiro (extrato bancário, fatura de cartão, etc.) e extraia TODOS os dados textuais visíveis. Retorne apenas o texto extraído, sem comentários ou formatação adicional. Mantenha a estrutura original o máximo possível."
-                                    },
-                                    {
-                                        "type": "image_url",
-                                        "image_url": {
-                                            "url": f"data:image/png;base64,{img_b64}"
-                                        }
-                                    }
-                                ]
-                            }
-                        ],
-                        max_tokens=4000,
-                        temperature=0.1
-                    )
-                    
-                    page_text = response.choices[0].message.content.strip()
-                    if page_text:
-                        all_extracted_text.append(f"\n--- PÁGINA {i+1} ---\n{page_text}")
-                        print(f"DEBUG: Página {i+1} processada com sucesso.")
-                    else:
-                        print(f"DEBUG: Página {i+1} retornou texto vazio.")
-                        
-                except Exception as page_error:
-                    print(f"ERRO ao processar página {i+1}: {page_error}")
-                    continue
-            
-            if not all_extracted_text:
-                return "Erro: Nenhum texto foi extraído de nenhuma página."
-            
-            # Junta todo o texto extraído
-            raw_text = "\n".join(all_extracted_text)
-            print(f"DEBUG: Texto bruto extraído: '{raw_text[:200]}...'")
-            
-            # Aplica filtro
-            filtered_text = self._clean_and_filter(raw_text.split('\n'))
-            print("DEBUG: Processamento OCR OpenAI concluído.")
-            
-            output = f"\n--- DADOS OCR (OpenAI GPT-4.1-nano) ---\n"
-            if filtered_text: 
-                output += filtered_text
+            output = f"\n--- DADOS OCR ({self._ocr_label()}) ---\n"
+            if filtered_pages: 
+                output += "\n".join(filtered_pages)
             else: 
                 output += "(Nenhum dado relevante encontrado após o filtro)"
-                print("DEBUG: Texto filtrado/vazio.")
-            
-            return output
             
+            return output + failure_report
+
+        except ReplayMissError:
+            raise  # reprodução sem gravação: falha a execução, não vira texto para o agente
         except Exception as api_error: 
+            if not page_count:
+                logger.exception("Erro ao converter PDF para imagens: %s", api_error)
+                return "Erro: Falha ao converter PDF em imagens."
             error_message = f"Erro API OpenAI: {type(api_error).__name__} - {api_error}. Verifique API Key/Permissões/Conectividade."
-            print(error_message)
-            print(f"ERRO DETALHADO OCR:\n{traceback.format_exc()}") 
+            logger.exception(error_message)
             return error_message
-            
-        finally:
-            # Limpa arquivo temporário se foi baixado
-            if temp_path_to_clean and os.path.exists(temp_path_to_clean):
-                try: 
-                    os.unlink(temp_path_to_clean)
-                except: 
-                    pass
-    
-    def _download_from_url(self, url: str) -> str | None:
-        """Baixa PDF de uma URL e retorna o caminho do arquivo temporário"""
+
+    async def _arun(self, file_path: str) -> str:
+        """Versão assíncrona para OpenAI OCR."""
+        return await asyncio.to_thread(self._run, file_path=file_path)
+
+
+# ##################################################################
+# FERRAMENTA 3: EXTRATOR HÍBRIDO (NATIVO POR PÁGINA + OCR SÓ NAS IMAGENS)
+# ##################################################################
+
+class HybridPDFExtractorTool(BaseTool):
+    name: str = "Extrator Híbrido de PDF"
+    description: str = ("Para PDFs mistos. Usa o texto nativo das páginas que têm camada de texto e "
+                        "faz OCR (OpenAI) apenas das páginas escaneadas, juntando tudo na ordem das páginas.")
+
+    # Páginas com menos caracteres nativos que isto são tratadas como imagem
+    min_page_chars: int = Field(default_factory=lambda: int(os.getenv("HYBRID_MIN_PAGE_CHARS", "20")))
+    native_tool: Any = Field(default_factory=NativePDFExtractorTool)
+    ocr_tool: Any = None  # PDFToOCRTool; criado sob demanda se não for informado
+    cache: Any = Field(default_factory=get_default_cache)  # ExtractionCache ou None
+    condense_settings: CondenseSettings = Field(default_factory=CondenseSettings.from_env)
+
+    def _get_ocr_tool(self) -> "PDFToOCRTool":
+        if self.ocr_tool is None:
+            self.ocr_tool = PDFToOCRTool()
+        return self.ocr_tool
+
+    def _ocr_page_subset(self, source: PDFSource, page_indices: list[int]) -> dict[int, PageResult]:
+        """OCR apenas das páginas indicadas (base 0). Retorna {índice: PageResult}."""
+        ocr_tool = self._get_ocr_tool()
+        if not OCR_AVAILABLE or not ocr_tool._ocr_available():
+            error = "OCR indisponível (sem backend local e cliente OpenAI não inicializado)"
+            return {i: PageResult(i + 1, METHOD_OCR, None, error=error) for i in page_indices}
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk: 
-                        tmp_file.write(chunk)
-                return tmp_file.name
+            return {page.page_number - 1: page for page in ocr_tool.iter_pages(source, page_indices)}
         except Exception as e:
-            print(f"ERRO ao baixar URL: {e}")
-            return None
-        
+            logger.exception("Erro ao converter PDF para imagens: %s", e)
+            return {i: PageResult(i + 1, METHOD_OCR, None, error="Falha ao converter página em imagem")
+                    for i in page_indices}
+
+    def iter_pages(self, source: PDFSource) -> Iterator[PageResult]:
+        """Texto nativo página a página; as páginas sem texto nativo passam pelo OCR em blocos
+        de até max_pages_in_memory páginas (do OCR), sem mudar a ordem."""
+        window = max(1, self._get_ocr_tool().max_pages_in_memory)
+        block: list[PageResult] = []
+        for page in self.native_tool.iter_pages(source):
+            block.append(page)
+            if len(block) >= window:
+                yield from self._resolve_block(source, block)
+                block = []
+        yield from self._resolve_block(source, block)
+
+    def _resolve_block(self, source: PDFSource, block: list[PageResult]) -> Iterator[PageResult]:
+        image_pages = [page.page_number - 1 for page in block
+                       if page.raw_text is None or len(page.raw_text) < self.min_page_chars]
+        logger.debug("Híbrido: %d páginas nativas, %d para OCR", len(block) - len(image_pages), len(image_pages))
+        ocr_results = self._ocr_page_subset(source, image_pages) if image_pages else {}
+        for page in block:
+            yield ocr_results.get(page.page_number - 1, page)
+
+    def _extract_from_source(self, source: PDFSource) -> str:
+        output = []
+        failed_pages = []
+        skipped_pages = []
+        try:
+            for page in self.iter_pages(source):
+                if page.error is not None:
+                    failed_pages.append((page.page_number, page.error))
+                elif page.skipped is not None:
+                    skipped_pages.append(page.page_number)
+                elif page.filtered_text:
+                    output.append(f"\n--- DADOS (PÁGINA {page.page_number}) ---\n")
+                    output.append(f"Método: {page.method}\n")
+                    output.append(page.filtered_text)
+        except Exception as e:
+            logger.error("pdfplumber falhou ao processar PDF: %s", e)
+            return "Erro: O PDF está corrompido ou ilegível."
+
+        ocr_tool = self._get_ocr_tool()
+        failure_report = ocr_tool._format_skipped_pages(skipped_pages) + ocr_tool._format_failed_pages(failed_pages)
+        if not output:
+            return "Erro: Nenhum dado relevante encontrado em nenhuma página." + failure_report
+        return "\n".join(output) + failure_report
+
+    def _is_cacheable_output(self, result: str) -> bool:
+        return bool(result) and not result.startswith("Erro") and "PÁGINAS COM FALHA NO OCR" not in result
+
+    def extract_full_text(self, file_path: str) -> str:
+        """Texto de todas as páginas, sem a condensação (o modo em partes condensa cada parte)."""
+        namespace = f"{self._get_ocr_tool().cache_namespace('hybrid')}:{self.native_tool.cache_namespace()}"
+        return run_with_cache(self.cache, namespace, file_path, self._extract_from_source, self._is_cacheable_output)
+
+    def _run(self, file_path: str) -> str:
+        if not file_path or not isinstance(file_path, str): 
+            return "Erro: 'file_path' deve ser uma string válida."
+        return condense_tool_output(self.extract_full_text(file_path), self.condense_settings)
+
     async def _arun(self, file_path: str) -> str:
-        """Versão assíncrona para OpenAI OCR."""
-        return await asyncio.to_thread(self._run, file_path=file_path)
\ No newline at end of file
+        return await asyncio.to_thread(self._run, file_path=file_path)
+
+
+# ##################################################################
+# FERRAMENTA 4: LINHAS ESTRUTURADAS (COORDENADAS DAS PALAVRAS)
+# ##################################################################
+
+class StructuredRowExtractorTool(BaseTool):
+    name: str = "Extrator de Linhas Estruturadas"
+    description: str = ("RÁPIDO, só PDFs nativos. Detecta as colunas da tabela pelas coordenadas das palavras e "
+                        "retorna as transações já estruturadas, uma por linha: pagina|data|descricao|valor|tipo.")
+
+    layout_name: str | None = None  # força um template (btg, bradesco, inter...); None = detectar
+    cache: Any = Field(default_factory=get_default_cache)  # ExtractionCache ou None
+
+    def _extract_from_source(self, source: PDFSource) -> str:
+        try:
+            rows, layout = extract_rows(source, self.layout_name)
+        except Exception as e:
+            logger.error("Extração estruturada falhou: %s", e)
+            return "Erro: Não foi possível extrair linhas estruturadas. Use o Extrator de Texto Nativo."
+        if not rows:
+            return "Erro: Nenhuma linha de transação estruturada encontrada. Use o Extrator de Texto Nativo."
+        return format_rows(rows, layout)
+
+    def _run(self, file_path: str) -> str:
+        if not file_path or not isinstance(file_path, str): 
+            return "Erro: 'file_path' deve ser uma string válida."
+        namespace = f"rows:{self.layout_name or 'auto'}:{rows_version()}"
+        return run_with_cache(self.cache, namespace, file_path, self._extract_from_source)
+
+    async def _arun(self, file_path: str) -> str:
+        return await asyncio.to_thread(self._run, file_path=file_path)
+
+
+# ##################################################################
+# FERRAMENTA 5: CATEGORIZADOR LOCAL (TAXONOMIA + MEMO APRENDIDO)
+# ##################################################################
+
+class LocalCategorizerTool(BaseTool):
+    name: str = "Categorizador Local"
+    description: str = ("INSTANTÂNEO. Recebe descrições de transações, uma por linha, e devolve "
+                        "'descricao => CATEGORIA > Subcategoria' para comerciantes conhecidos ou "
+                        "'descricao => ?' quando a categoria precisa ser decidida por você.")
+
+    def _run(self, descricoes: str) -> str:
+        if not descricoes or not isinstance(descricoes, str):
+            return "Erro: 'descricoes' deve ser um texto com uma descrição por linha."
+        categorizer = get_default_categorizer()
+        output = []
+        for description in descricoes.splitlines():
+            description = description.strip()
+            if not description:
+                continue
+            hit = categorizer.categorize(description)
+            output.append(f"{description} => {hit[0]} > {hit[1]}" if hit else f"{description} => ?")
+        return "\n".join(output)
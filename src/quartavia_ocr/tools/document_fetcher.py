@@ -0,0 +1,226 @@
+"""Camada compartilhada de download dos documentos.
+
+Substitui os _download_from_url duplicados (requests.get sem sessão, sem
+timeout e gravando em arquivo temporário): usa uma sessão HTTP com pool de
+conexões, timeouts, limite de tamanho e requisições condicionais
+(ETag / If-Modified-Since), e mantém os bytes em memória para que pdfplumber e
+fitz abram o PDF sem passar pelo disco. Downloads recentes da mesma URL são
+reaproveitados, então as ferramentas nativa e de OCR baixam o arquivo uma vez só.
+"""
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from quartavia_ocr import tracing
+
+logger = logging.getLogger(__name__)
+
+# Um documento é um caminho local (str) ou o conteúdo do PDF em memória (bytes)
+PDFSource = str | bytes
+
+URL_LOCK_STRIPES = 64
+
+
+class FetchError(Exception):
+    """Falha ao obter o documento (rede, status HTTP ou tamanho)."""
+
+
+def is_url(file_path: str) -> bool:
+    return urlparse(file_path).scheme in ['http', 'https']
+
+
+class DocumentFetcher:
+    """Baixa documentos por HTTP com sessão compartilhada e cache em memória."""
+
+    def __init__(
+        self,
+        timeout: tuple[float, float] = (5.0, 60.0),
+        max_bytes: int = 50 * 1024 * 1024,
+        max_age_seconds: float = 300.0,
+        max_cached_documents: int = 16,
+        pool_size: int = 16,
+    ):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.max_cached_documents = max_cached_documents
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # url -> {"content", "etag", "last_modified", "fetched_at"}
+        self._cache: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        # Locks fixos por faixa de hash: downloads da mesma URL se serializam sem
+        # guardar um lock por URL já vista.
+        self._url_locks = [threading.Lock() for _ in range(URL_LOCK_STRIPES)]
+        self.stats = {"downloads": 0, "memory_hits": 0, "not_modified": 0}
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        return self._url_locks[hash(url) % len(self._url_locks)]
+
+    def fetch(self, url: str) -> bytes:
+        """Conteúdo da URL. Reaproveita o download recente ou revalida com o servidor."""
+        with tracing.span("download", host=urlparse(url).hostname) as span:
+            content, outcome = self._fetch(url)
+            span.set("outcome", outcome)
+            if outcome == "download":
+                span.add("download_bytes", len(content))
+            return content
+
+    def _fetch(self, url: str) -> tuple[bytes, str]:
+        # Um lock por URL: chamadas simultâneas para o mesmo documento esperam o mesmo download
+        with self._url_lock(url):
+            with self._lock:
+                cached = self._cache.get(url)
+                if cached:
+                    self._cache.move_to_end(url)
+            if cached and time.monotonic() - cached["fetched_at"] < self.max_age_seconds:
+                with self._lock:
+                    self.stats["memory_hits"] += 1
+                return cached["content"], "memory_hit"
+
+            headers = {}
+            if cached and cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached and cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+            try:
+                response = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+            except requests.RequestException as e:
+                raise FetchError(f"Falha de rede ao baixar o documento: {e}") from e
+            with response:
+                if response.status_code == 304 and cached:
+                    with self._lock:
+                        self.stats["not_modified"] += 1
+                        cached["fetched_at"] = time.monotonic()
+                    return cached["content"], "not_modified"
+                if response.status_code >= 400:
+                    raise FetchError(f"HTTP {response.status_code} ao baixar o documento")
+                content = self._read_limited(response)
+
+            with self._lock:
+                self.stats["downloads"] += 1
+                self._cache[url] = {
+                    "content": content,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.monotonic(),
+                }
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.max_cached_documents:
+                    self._cache.popitem(last=False)
+            return content, "download"
+
+    def validators(self, url: str) -> dict:
+        """ETag e Last-Modified do último download da URL (vazio se ela não está em memória)."""
+        with self._lock:
+            cached = self._cache.get(url)
+        if not cached:
+            return {}
+        return {key: cached[key] for key in ("etag", "last_modified") if cached[key]}
+
+    def unchanged(self, url: str, etag: str | None = None, last_modified: str | None = None) -> bool:
+        """HEAD condicional: True só se o servidor confirma que o documento não mudou."""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        if not headers:
+            return False
+        try:
+            response = self.session.head(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            logger.debug("Revalidação de %s falhou: %s", url, e)
+            return False
+        if response.status_code == 304:
+            return True
+        # Servidores que ignoram o condicional no HEAD ainda devolvem os validadores atuais
+        if response.status_code < 400:
+            return ((etag is not None and response.headers.get("ETag") == etag)
+                    or (etag is None and response.headers.get("Last-Modified") == last_modified))
+        return False
+
+    def _read_limited(self, response: requests.Response) -> bytes:
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise FetchError(f"Documento maior que o limite de {self.max_bytes} bytes")
+        buffer = io.BytesIO()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            buffer.write(chunk)
+            if buffer.tell() > self.max_bytes:
+                raise FetchError(f"Documento maior que o limite de {self.max_bytes} bytes")
+        return buffer.getvalue()
+
+
+_default_fetcher: DocumentFetcher | None = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_default_fetcher() -> DocumentFetcher:
+    """Fetcher compartilhado do processo (limites via QUARTAVIA_FETCH_*)."""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = DocumentFetcher(
+                timeout=(float(os.getenv("QUARTAVIA_FETCH_CONNECT_TIMEOUT", "5")),
+                         float(os.getenv("QUARTAVIA_FETCH_READ_TIMEOUT", "60"))),
+                max_bytes=int(float(os.getenv("QUARTAVIA_FETCH_MAX_MB", "50")) * 1024 * 1024),
+                max_age_seconds=float(os.getenv("QUARTAVIA_FETCH_MAX_AGE", "300")),
+            )
+        return _default_fetcher
+
+
+def download_pdf(url: str) -> bytes | None:
+    """Baixa a URL pelo fetcher compartilhado; None em caso de falha (já logada)."""
+    try:
+        return get_default_fetcher().fetch(url)
+    except FetchError as e:
+        logger.error("Erro ao baixar URL: %s", e)
+        return None
+
+
+def url_validators(url: str) -> dict:
+    """ETag/Last-Modified do último download da URL pelo fetcher compartilhado."""
+    return get_default_fetcher().validators(url)
+
+
+def url_unchanged(url: str, validators: dict) -> bool:
+    """Revalida no servidor, pelo fetcher compartilhado, um documento baixado antes com esses validadores."""
+    return get_default_fetcher().unchanged(url, validators.get("etag"), validators.get("last_modified"))
+
+
+def with_pdf_source(file_path: str, fn: Callable[[PDFSource], str], download: Callable[[str], bytes | None] = download_pdf) -> str:
+    """Chama fn com o documento: bytes em memória para URLs, o próprio caminho para arquivos locais."""
+    if is_url(file_path):
+        content = download(file_path)
+        if not content:
+            return "Erro: Falha ao baixar PDF da URL."
+        return fn(content)
+    if not os.path.exists(file_path):
+        return f"Erro: arquivo não encontrado: {file_path}"
+    return fn(file_path)
+
+
+def open_pdfplumber(source: PDFSource):
+    """Abre o PDF com pdfplumber a partir de um caminho ou dos bytes em memória."""
+    import pdfplumber
+    with tracing.span("open", library="pdfplumber", in_memory=isinstance(source, bytes)):
+        return pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def open_fitz(source: PDFSource):
+    """Abre o PDF com PyMuPDF a partir de um caminho ou dos bytes em memória."""
+    import fitz
+    with tracing.span("open", library="fitz", in_memory=isinstance(source, bytes)):
+        return fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
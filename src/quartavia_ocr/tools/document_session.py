@@ -0,0 +1,260 @@
+"""Sessão do documento dentro de uma execução (fast path + crew de um arquivo).
+
+Sem sessão, cada ferramenta resolve o file_path sozinha: a nativa abre o PDF
+com pdfplumber, a de OCR baixa de novo, abre com fitz e renderiza tudo, sem
+aproveitar nada da anterior. Dentro de `with document_run(...)`, as ferramentas
+compartilham, por file_path:
+  - os bytes do PDF (baixados ou lidos do disco uma vez) e o SHA-256 deles;
+  - os handles do pdfplumber e do fitz, abertos na primeira vez que alguém
+    pede (use_pdfplumber/use_fitz) e fechados só no fim da execução; como
+    nenhum dos dois é seguro entre threads, quem lê ou renderiza uma página
+    segura o page_lock do handle só durante essa leitura (um lock por handle);
+  - artefatos por página: texto da camada de texto, linhas filtradas do texto
+    nativo, imagens renderizadas (até QUARTAVIA_SESSION_RENDER_MB) e texto do OCR.
+Ao sair do bloco, todas as sessões da execução são fechadas (handles, bytes e
+artefatos), mesmo com erro. Fora de uma execução nada muda.
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any, Callable, Iterator
+
+from quartavia_ocr import tracing
+from quartavia_ocr.tools.document_fetcher import PDFSource, download_pdf, is_url, open_fitz, open_pdfplumber
+
+logger = logging.getLogger(__name__)
+
+# Tipos de artefato por página
+ARTIFACT_TEXT = "texto"      # page.extract_text() do pdfplumber
+ARTIFACT_NATIVE = "nativo"   # (texto bruto, texto filtrado) do extrator nativo, ou None
+ARTIFACT_RENDER = "imagem"   # RenderedPage, por assinatura das configurações de renderização
+ARTIFACT_OCR = "ocr"         # (texto, texto filtrado) do OCR, por namespace (modelo, renderização...)
+
+MISSING = object()
+
+
+def default_render_budget() -> int:
+    """Bytes de imagens renderizadas que uma sessão guarda (QUARTAVIA_SESSION_RENDER_MB)."""
+    return int(float(os.getenv("QUARTAVIA_SESSION_RENDER_MB", "32")) * 1024 * 1024)
+
+
+class DocumentSession:
+    """Um documento numa execução: bytes, handles abertos sob demanda e artefatos por página."""
+
+    def __init__(self, file_path: str, content: bytes, render_budget: int | None = None):
+        self.file_path = file_path
+        self.content = content
+        self.render_budget = default_render_budget() if render_budget is None else render_budget
+        self._lock = threading.RLock()
+        # Um lock por handle: ler uma página com o pdfplumber não espera uma renderização do fitz
+        self._pdfplumber_lock = threading.RLock()
+        self._fitz_lock = threading.RLock()
+        self._sha256: str | None = None
+        self._pdfplumber = None
+        self._fitz = None
+        self._artifacts: dict[tuple, Any] = {}
+        self._render_bytes = 0
+        self.closed = False
+        self.stats = {"opens": 0, "artifact_hits": 0, "artifact_misses": 0}
+
+    @property
+    def sha256(self) -> str:
+        with self._lock:
+            if self._sha256 is None:
+                self._sha256 = hashlib.sha256(self.content).hexdigest()
+            return self._sha256
+
+    def pdfplumber(self):
+        """Handle do pdfplumber da sessão (aberto na primeira chamada)."""
+        with self._lock:
+            if self._pdfplumber is None:
+                self._pdfplumber = open_pdfplumber(self.content)
+                self.stats["opens"] += 1
+            return self._pdfplumber
+
+    def fitz(self):
+        """Handle do fitz da sessão (aberto na primeira chamada)."""
+        with self._lock:
+            if self._fitz is None:
+                self._fitz = open_fitz(self.content)
+                self.stats["opens"] += 1
+            return self._fitz
+
+    def handle_lock(self, handle: Any) -> AbstractContextManager | None:
+        """Lock do handle, se ele é o pdfplumber ou o fitz desta sessão."""
+        with self._lock:
+            if handle is not None and handle is self._pdfplumber:
+                return self._pdfplumber_lock
+            if handle is not None and handle is self._fitz:
+                return self._fitz_lock
+        return None
+
+    def get_artifact(self, kind: str, page_index: int, key: str = "") -> Any:
+        """Artefato da página (base 0), ou MISSING."""
+        with self._lock:
+            value = self._artifacts.get((kind, page_index, key), MISSING)
+            self.stats["artifact_hits" if value is not MISSING else "artifact_misses"] += 1
+        return value
+
+    def set_artifact(self, kind: str, page_index: int, value: Any, key: str = "", nbytes: int = 0) -> bool:
+        """Guarda o artefato; com nbytes (imagens), só enquanto couber no orçamento da sessão."""
+        with self._lock:
+            if self.closed:
+                return False
+            if nbytes:
+                if self._render_bytes + nbytes > self.render_budget:
+                    return False
+                self._render_bytes += nbytes
+            self._artifacts[(kind, page_index, key)] = value
+            return True
+
+    def page_artifact(self, kind: str, page_index: int, compute: Callable[[], Any], key: str = "") -> Any:
+        """Artefato da página, calculado por compute() na primeira vez."""
+        value = self.get_artifact(kind, page_index, key)
+        if value is MISSING:
+            value = compute()
+            self.set_artifact(kind, page_index, value, key)
+        return value
+
+    def close(self) -> None:
+        # Espera a leitura/renderização de página em curso antes de fechar os handles
+        with self._pdfplumber_lock, self._fitz_lock, self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            for handle in (self._pdfplumber, self._fitz):
+                if handle is not None:
+                    try:
+                        handle.close()
+                    except Exception as e:
+                        logger.debug("Falha ao fechar o PDF da sessão: %s", e)
+            self._pdfplumber = self._fitz = None
+            self._artifacts.clear()
+            self._render_bytes = 0
+            self.content = b""
+
+
+class DocumentRun:
+    """Sessões de uma execução, por file_path."""
+
+    def __init__(self, run_id: str | None = None, download: Callable[[str], bytes | None] = download_pdf):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.download = download
+        self._sessions: dict[str, DocumentSession] = {}
+        self._lock = threading.Lock()
+
+    def session(self, file_path: str) -> DocumentSession | None:
+        """Sessão do documento, lendo os bytes na primeira vez (URLs pelo download da execução);
+        None se não der para obtê-los."""
+        with self._lock:
+            session = self._sessions.get(file_path)
+        if session is not None:
+            return session
+        # Fora do lock: um download lento não trava as sessões dos outros documentos da execução
+        if is_url(file_path):
+            content = self.download(file_path)
+        elif os.path.exists(file_path):
+            with open(file_path, "rb") as f:
+                content = f.read()
+        else:
+            content = None
+        if not content:
+            return None
+        with self._lock:
+            # Outra thread pode ter criado a sessão enquanto lia: fica a dela, para todos usarem os mesmos handles
+            return self._sessions.setdefault(file_path, DocumentSession(file_path, content))
+
+    def find(self, source: PDFSource) -> DocumentSession | None:
+        """Sessão cujo conteúdo é source (os mesmos bytes) ou cujo file_path é source."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            if source is session.content or (isinstance(source, str) and source == session.file_path):
+                return session
+        return None
+
+    def find_handle(self, handle: Any) -> DocumentSession | None:
+        """Sessão dona do handle (pdfplumber ou fitz), se houver."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return next((session for session in sessions if session.handle_lock(handle) is not None), None)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            logger.debug("Sessão %s (%s) encerrada: %s", self.run_id, session.file_path, session.stats)
+            tracing.count("session_artifact_hits", session.stats["artifact_hits"])
+            session.close()
+
+
+_current_run: contextvars.ContextVar[DocumentRun | None] = contextvars.ContextVar("quartavia_document_run",
+                                                                                  default=None)
+
+
+@contextmanager
+def document_run(run_id: str | None = None,
+                 download: Callable[[str], bytes | None] = download_pdf) -> Iterator[DocumentRun]:
+    """Execução com sessões compartilhadas; fecha todas ao sair. Dentro de outra execução, usa a de fora."""
+    outer = _current_run.get()
+    if outer is not None:
+        yield outer
+        return
+    run = DocumentRun(run_id, download)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+        run.close()
+
+
+@contextmanager
+def use_run(run: DocumentRun) -> Iterator[DocumentRun]:
+    """Torna run a execução atual (p.ex. numa thread de trabalho) sem fechá-la ao sair; quem a criou fecha."""
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+def current_run() -> DocumentRun | None:
+    return _current_run.get()
+
+
+def session_for(source: PDFSource) -> DocumentSession | None:
+    """Sessão da execução atual para o documento, se houver."""
+    run = _current_run.get()
+    return run.find(source) if run is not None else None
+
+
+def use_pdfplumber(source: PDFSource):
+    """Para `with use_pdfplumber(source) as pdf`: o handle da sessão (que o with não fecha) ou um novo.
+    Leia cada página dentro de `with page_lock(pdf)`."""
+    session = session_for(source)
+    return nullcontext(session.pdfplumber()) if session is not None else open_pdfplumber(source)
+
+
+def use_fitz(source: PDFSource):
+    """Para `with use_fitz(source) as document`: o handle da sessão (que o with não fecha) ou um novo.
+    Leia/renderize cada página dentro de `with page_lock(document)`."""
+    session = session_for(source)
+    return nullcontext(session.fitz()) if session is not None else open_fitz(source)
+
+
+def page_lock(handle: Any) -> AbstractContextManager:
+    """Uso exclusivo de um handle compartilhado pela sessão enquanto uma página é lida ou renderizada.
+
+    Deve envolver só o acesso ao PDF (carregar, extrair, renderizar), nunca o OCR da
+    página nem um yield; para handles próprios (fora de uma sessão) não trava nada.
+    """
+    run = _current_run.get()
+    session = run.find_handle(handle) if run is not None else None
+    lock = session.handle_lock(handle) if session is not None else None
+    return lock if lock is not None else nullcontext()
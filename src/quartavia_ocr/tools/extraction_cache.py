@@ -0,0 +1,285 @@
+"""Cache persistente (em disco) das saídas das ferramentas de extração.
+
+As entradas são endereçadas pelo SHA-256 dos bytes do PDF + nome/versão da
+ferramenta + versão do filtro de linhas, com despejo LRU limitado por tamanho,
+TTL e contadores de acertos/erros. URLs já vistas ganham um alias URL -> SHA-256,
+de modo que um acerto não precisa nem baixar o arquivo de novo. A mesma URL pode
+voltar com outro conteúdo (reenvio), então o alias só vale depois de revalidado:
+com ETag/Last-Modified do download, por um HEAD condicional; sem eles, só por
+alguns minutos (QUARTAVIA_CACHE_ALIAS_TTL_MINUTES).
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable
+
+from quartavia_ocr import tracing
+from quartavia_ocr.tools.document_fetcher import (
+    PDFSource,
+    download_pdf,
+    is_url,
+    url_unchanged,
+    url_validators,
+    with_pdf_source,
+)
+from quartavia_ocr.tools.document_session import current_run
+from quartavia_ocr.tools.text_filters import FILTER_VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "quartavia_ocr")
+
+
+def sha256_file(path: str) -> str:
+    """SHA-256 do conteúdo de um arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Cache em disco (um JSON por entrada) com LRU por mtime, TTL e estatísticas."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600,
+                 alias_ttl_seconds: float = 600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.alias_ttl_seconds = alias_ttl_seconds
+        self._entries_dir = os.path.join(cache_dir, "entries")
+        self._aliases_dir = os.path.join(cache_dir, "aliases")
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._aliases_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "stale_aliases": 0}
+
+    def make_key(self, pdf_sha256: str, tool_name: str) -> str:
+        """Chave da entrada: conteúdo do PDF + ferramenta (com versão) + versão do filtro."""
+        return hashlib.sha256(f"{pdf_sha256}:{tool_name}:{FILTER_VERSION}".encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self._entries_dir, f"{key}.json")
+
+    def _alias_path(self, source: str) -> str:
+        return os.path.join(self._aliases_dir, hashlib.sha256(source.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_json(self, path: str) -> dict | None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - data.get("created_at", 0) > self.ttl_seconds:
+            with self._lock:
+                self._stats["expired"] += 1
+            try: os.unlink(path)
+            except OSError: pass
+            return None
+        return data
+
+    def _write_json(self, path: str, data: dict) -> None:
+        # Escrita atômica: outro processo nunca lê um JSON pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            try: os.unlink(tmp_path)
+            except OSError: pass
+            raise
+
+    def get(self, key: str) -> str | None:
+        """Valor da entrada (atualizando sua posição no LRU) ou None."""
+        path = self._entry_path(key)
+        data = self._read_json(path)
+        with self._lock:
+            self._stats["hits" if data is not None else "misses"] += 1
+        if data is None:
+            return None
+        try: os.utime(path)
+        except OSError: pass
+        return data["value"]
+
+    def set(self, key: str, value: str, tool_name: str = "") -> None:
+        self._write_json(self._entry_path(key), {"created_at": time.time(), "tool": tool_name, "value": value})
+        with self._lock:
+            self._stats["stores"] += 1
+        self._evict()
+
+    def get_alias(self, source: str, revalidate: Callable[[str, dict], bool] = url_unchanged) -> str | None:
+        """SHA-256 do PDF já baixado de uma URL, se conhecido e ainda válido.
+
+        Com ETag/Last-Modified gravados, revalidate(url, validadores) confirma com o servidor
+        que o conteúdo não mudou; sem eles, o alias vale só por alias_ttl_seconds.
+        """
+        data = self._read_json(self._alias_path(source))
+        if not data:
+            return None
+        validators = data.get("validators") or {}
+        if validators:
+            valid = revalidate(source, validators)
+        else:
+            valid = time.time() - data.get("created_at", 0) <= self.alias_ttl_seconds
+        if not valid:
+            with self._lock:
+                self._stats["stale_aliases"] += 1
+            return None
+        return data["sha256"]
+
+    def set_alias(self, source: str, pdf_sha256: str, validators: dict | None = None) -> None:
+        self._write_json(self._alias_path(source), {"created_at": time.time(), "sha256": pdf_sha256,
+                                                    "validators": validators or {}})
+
+    def _evict(self) -> None:
+        """Remove as entradas usadas há mais tempo até caber em max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self._entries_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self._entries_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+_default_cache: ExtractionCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ExtractionCache | None:
+    """Cache compartilhado do processo, configurado por variáveis de ambiente.
+
+    QUARTAVIA_CACHE_ENABLED=0 desliga o cache; QUARTAVIA_CACHE_DIR, QUARTAVIA_CACHE_MAX_MB,
+    QUARTAVIA_CACHE_TTL_HOURS e QUARTAVIA_CACHE_ALIAS_TTL_MINUTES ajustam local e limites.
+    """
+    global _default_cache
+    if os.getenv("QUARTAVIA_CACHE_ENABLED", "1") in ("0", "false", "False"):
+        return None
+    cache_dir = os.getenv("QUARTAVIA_CACHE_DIR", DEFAULT_CACHE_DIR)
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache.cache_dir != cache_dir:
+            try:
+                _default_cache = ExtractionCache(
+                    cache_dir,
+                    max_bytes=int(float(os.getenv("QUARTAVIA_CACHE_MAX_MB", "256")) * 1024 * 1024),
+                    ttl_seconds=float(os.getenv("QUARTAVIA_CACHE_TTL_HOURS", "168")) * 3600,
+                    alias_ttl_seconds=float(os.getenv("QUARTAVIA_CACHE_ALIAS_TTL_MINUTES", "10")) * 60,
+                )
+            except OSError as e:
+                logger.warning("Cache de extração desativado (%s)", e)
+                return None
+        return _default_cache
+
+
+def _is_cacheable(result: str) -> bool:
+    return bool(result) and not result.startswith("Erro")
+
+
+def run_with_cache(
+    cache: ExtractionCache | None,
+    tool_name: str,
+    file_path: str,
+    extract: Callable[[PDFSource], str],
+    is_cacheable: Callable[[str], bool] = _is_cacheable,
+    download: Callable[[str], bytes | None] = download_pdf,
+    revalidate: Callable[[str, dict], bool] = url_unchanged,
+    validators: Callable[[str], dict] = url_validators,
+) -> str:
+    """Executa 'extract' (que recebe caminho local ou bytes do PDF) passando pelo cache.
+
+    Para URLs, um alias ainda válido (revalidado no servidor pelo ETag/Last-Modified do
+    download, ou recente) permite responder sem baixar o PDF; numa falta, o PDF é baixado
+    uma única vez e os mesmos bytes são usados no hash e na extração. Dentro de uma
+    execução (document_session), os bytes e o hash vêm da sessão do documento.
+    """
+    with tracing.span("extract", tool=tool_name.split(":", 1)[0], cache=cache is not None,
+                      remote=is_url(file_path)) as span:
+        result = _run_with_cache(cache, tool_name, file_path, extract, is_cacheable, download, revalidate,
+                                 validators)
+        span.set("failed", result.startswith("Erro"))
+        span.add("output_chars", len(result))
+        return result
+
+
+def _run_with_cache(cache, tool_name, file_path, extract, is_cacheable, download, revalidate, validators) -> str:
+    run = current_run()
+    if cache is None and run is None:
+        return with_pdf_source(file_path, extract, download)
+
+    if cache is not None and is_url(file_path):
+        known_sha = cache.get_alias(file_path, revalidate)
+        if known_sha:
+            cached = cache.get(cache.make_key(known_sha, tool_name))
+            if cached is not None:
+                logger.debug("Cache HIT (%s) para URL já processada.", tool_name)
+                tracing.count("cache_hits")
+                return cached
+
+    if run is not None:
+        session = run.session(file_path)
+        if session is None:
+            return _unreadable(file_path)
+        if cache is None:
+            return extract(session.content)
+        if is_url(file_path):
+            cache.set_alias(file_path, session.sha256, validators(file_path))
+        return _extract_cached(cache, tool_name, session.sha256, session.content, extract, is_cacheable)
+
+    if is_url(file_path):
+        content = download(file_path)
+        if not content:
+            return _unreadable(file_path)
+        pdf_sha = hashlib.sha256(content).hexdigest()
+        cache.set_alias(file_path, pdf_sha, validators(file_path))
+        return _extract_cached(cache, tool_name, pdf_sha, content, extract, is_cacheable)
+
+    if not os.path.exists(file_path):
+        return _unreadable(file_path)
+    return _extract_cached(cache, tool_name, sha256_file(file_path), file_path, extract, is_cacheable)
+
+
+def _unreadable(file_path: str) -> str:
+    if is_url(file_path):
+        return "Erro: Falha ao baixar PDF da URL."
+    return f"Erro: arquivo não encontrado: {file_path}"
+
+
+def _extract_cached(cache, tool_name, pdf_sha, source, extract, is_cacheable) -> str:
+    key = cache.make_key(pdf_sha, tool_name)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug("Cache HIT (%s) para PDF %s.", tool_name, pdf_sha[:12])
+        tracing.count("cache_hits")
+        return cached
+    result = extract(source)
+    if is_cacheable(result):
+        cache.set(key, result, tool_name)
+    return result
@@ -0,0 +1,243 @@
+"""Extração nativa (pdfplumber) por página, usada pelo NativePDFExtractorTool.
+
+As funções deste módulo ficam fora da classe da ferramenta para que possam
+ser enviadas a um pool de processos (o worker não precisa importar crewai).
+"""
+import logging
+import os
+from operator import itemgetter
+from typing import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import pdfplumber
+from pdfminer.layout import LTChar, LTContainer
+from pdfplumber.utils import cluster_objects
+from pdfplumber.utils.text import WordExtractor
+
+from quartavia_ocr import tracing
+from quartavia_ocr.tools.document_fetcher import PDFSource, open_pdfplumber
+from quartavia_ocr.tools.text_filters import clean_and_filter_lines
+
+logger = logging.getLogger(__name__)
+
+
+def default_native_workers() -> int:
+    """Workers padrão da extração paralela (QUARTAVIA_NATIVE_WORKERS; 1 = sequencial)."""
+    return int(os.getenv("QUARTAVIA_NATIVE_WORKERS", "1"))
+
+
+def parallel_min_pages() -> int:
+    """Abaixo deste número de páginas (QUARTAVIA_NATIVE_PARALLEL_MIN_PAGES) o custo de subir o pool não compensa."""
+    return int(os.getenv("QUARTAVIA_NATIVE_PARALLEL_MIN_PAGES", "8"))
+
+
+# Motores da extração por página: 'singlepass' (padrão) ou 'chain' (cadeia antiga de tentativas)
+NATIVE_ENGINES = ("singlepass", "chain")
+
+# Parâmetros do texto com layout preservado (os mesmos da primeira tentativa da cadeia)
+_LAYOUT_X_TOLERANCE = 1
+_LAYOUT_Y_TOLERANCE = 3
+
+
+def read_page_chars(pdf_page: pdfplumber.page.Page) -> list[dict]:
+    """Caracteres da página numa única leitura do layout do pdfminer.
+
+    pdf_page.chars monta, para cada objeto da página, um dicionário com todos os
+    atributos (cores, matriz, fonte...); aqui só os LTChar são lidos e só com os
+    campos que o agrupamento em palavras usa. As coordenadas seguem as do
+    pdfplumber (top/bottom a partir do topo, ajuste do MediaBox). Com laparams ou
+    normalização unicode no PDF, usa pdf_page.chars.
+    """
+    pdf = pdf_page.pdf
+    if pdf.laparams is not None or pdf.unicode_norm is not None or not pdf_page.is_original:
+        return pdf_page.chars
+    height = pdf_page.height
+    mb_x0, mb_top = pdf_page.mediabox[:2]
+    doctop = pdf_page.initial_doctop
+    chars = []
+
+    def walk(objects) -> None:
+        for obj in objects:
+            if isinstance(obj, LTChar):
+                top = height - obj.y1 + mb_top
+                chars.append({
+                    "text": obj.get_text(), "x0": obj.x0 + mb_x0, "x1": obj.x1 + mb_x0,
+                    "top": top, "bottom": height - obj.y0 + mb_top, "doctop": doctop + top,
+                    "upright": bool(obj.upright), "size": obj.size, "fontname": obj.fontname,
+                })
+            elif isinstance(obj, LTContainer):
+                walk(obj._objs)
+
+    walk(pdf_page.layout._objs)
+    return chars
+
+
+def _words_to_lines(words: list[dict]) -> str:
+    """Texto simples (sem layout) a partir das palavras já agrupadas: uma linha por 'top'."""
+    lines = cluster_objects(words, itemgetter("top"), _LAYOUT_Y_TOLERANCE)
+    return "\n".join(" ".join(word["text"] for word in line) for line in lines)
+
+
+def native_engine() -> str:
+    """Motor configurado em QUARTAVIA_NATIVE_ENGINE (lido a cada uso; os motores dão textos
+    diferentes, então o nome entra no namespace do cache da ferramenta nativa)."""
+    engine = os.getenv("QUARTAVIA_NATIVE_ENGINE", "singlepass")
+    if engine not in NATIVE_ENGINES:
+        logger.warning("QUARTAVIA_NATIVE_ENGINE=%r desconhecido; usando 'singlepass'.", engine)
+        return "singlepass"
+    return engine
+
+
+def extract_page_lines(pdf_page: pdfplumber.page.Page, engine: str | None = None) -> list[str] | None:
+    """Extrai as linhas de texto de uma página (com o motor indicado ou o de QUARTAVIA_NATIVE_ENGINE)."""
+    if (engine or native_engine()) == "chain":
+        return extract_page_lines_chain(pdf_page)
+    return extract_page_lines_single_pass(pdf_page)
+
+
+def extract_page_lines_single_pass(pdf_page: pdfplumber.page.Page) -> list[str] | None:
+    """Lê os caracteres e agrupa as palavras uma única vez; o texto com layout e o de
+    fallback (palavras por linha, caracteres soltos) saem dessa mesma leitura.
+
+    Página sem nenhum caractere visível (imagem) retorna None sem montar texto algum.
+    """
+    with tracing.span("extract_page", page=pdf_page.page_number, engine="singlepass") as span:
+        try:
+            chars = read_page_chars(pdf_page)
+            if not any(c["text"].strip() for c in chars):
+                logger.debug("Página %d: nenhum caractere de texto.", pdf_page.page_number)
+                span.set("strategy", "nenhuma")
+                return None
+
+            extractor = WordExtractor(x_tolerance=_LAYOUT_X_TOLERANCE, y_tolerance=_LAYOUT_Y_TOLERANCE,
+                                      use_text_flow=True)
+            wordmap = extractor.extract_wordmap(chars)
+            strategy = "layout"
+            text = wordmap.to_textmap(
+                layout=True, layout_bbox=pdf_page.bbox, layout_width=pdf_page.width,
+                layout_height=pdf_page.height, y_tolerance=_LAYOUT_Y_TOLERANCE, use_text_flow=True,
+                presorted=True,
+            ).as_string
+            if not text.strip():
+                strategy = "palavras"
+                text = _words_to_lines([word for word, _ in wordmap.tuples])
+            if not text.strip():
+                strategy = "chars"
+                text = " ".join(c["text"] for c in chars if c["text"].strip())
+
+            span.set("strategy", strategy)
+            span.add("pages_extracted")
+            span.add("chars_extracted", len(text))
+            return text.split('\n')
+
+        except Exception as e:
+            logger.warning("pdfplumber falhou ao extrair texto da página %d: %s", pdf_page.page_number, e)
+            span.set("error", type(e).__name__)
+            return None
+
+
+def extract_page_lines_chain(pdf_page: pdfplumber.page.Page) -> list[str] | None:
+    """Extrai as linhas de texto de uma página, com cadeia de tentativas de fallback."""
+    with tracing.span("extract_page", page=pdf_page.page_number, engine="chain") as span:
+        try:
+            # Primeira tentativa: extração com layout preservado
+            strategy = "layout"
+            text = pdf_page.extract_text(layout=True, use_text_flow=True, x_tolerance=1, y_tolerance=3)
+
+            # Segunda tentativa: extração simples
+            if not text or text.strip() == "":
+                strategy = "simples"
+                text = pdf_page.extract_text()
+
+            # Terceira tentativa: extração com diferentes tolerâncias
+            if not text or text.strip() == "":
+                strategy = "tolerancia"
+                text = pdf_page.extract_text(x_tolerance=3, y_tolerance=3)
+
+            # Quarta tentativa: extração de caracteres individuais
+            if not text or text.strip() == "":
+                chars = pdf_page.chars
+                if chars:
+                    strategy = "chars"
+                    text = " ".join([c.get('text', '') for c in chars if c.get('text', '').strip()])
+
+            if not text or text.strip() == "":
+                logger.debug("Página %d: todas as tentativas de extração falharam.", pdf_page.page_number)
+                span.set("strategy", "nenhuma")
+                return None
+
+            span.set("strategy", strategy)
+            span.add("pages_extracted")
+            span.add("chars_extracted", len(text))
+            return text.split('\n')
+
+        except Exception as e:
+            logger.warning("pdfplumber falhou ao extrair texto da página %d: %s", pdf_page.page_number, e)
+            span.set("error", type(e).__name__)
+            return None
+
+
+def process_page_lines(
+    extracted_lines: list[str] | None,
+    filter_fn: Callable[[list[str]], str] = clean_and_filter_lines,
+) -> tuple[str, str] | None:
+    """Converte as linhas de uma página em (texto bruto, texto filtrado).
+
+    Retorna None quando nada foi extraído da página (provável imagem).
+    """
+    if extracted_lines is None:
+        return None
+    raw_page_text = "\n".join(extracted_lines).strip()
+    filtered_text = filter_fn(extracted_lines) if raw_page_text else ""
+    return raw_page_text, filtered_text
+
+
+def extract_page_range(source: PDFSource, start: int, end: int,
+                       engine: str | None = None) -> list[tuple[int, tuple[str, str] | None]]:
+    """Worker do pool: extrai e filtra as páginas [start, end) de um PDF (caminho ou bytes)."""
+    results = []
+    with open_pdfplumber(source) as pdf:
+        for i in range(start, end):
+            page = pdf.pages[i]
+            try:
+                results.append((i, process_page_lines(extract_page_lines(page, engine))))
+            finally:
+                page.close()  # libera o layout e os caracteres da página antes da próxima
+    return results
+
+
+def split_page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    """Divide as páginas em faixas contíguas (duas por worker, para balancear a carga)."""
+    if page_count <= 0:
+        return []
+    chunks = max(1, min(page_count, workers * 2))
+    size, extra = divmod(page_count, chunks)
+    ranges = []
+    start = 0
+    for c in range(chunks):
+        end = start + size + (1 if c < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def iter_pages_parallel(source: PDFSource, page_count: int, workers: int,
+                        engine: str | None = None) -> Iterator[tuple[str, str] | None]:
+    """Extrai as páginas num pool de processos, entregando os resultados na ordem do PDF
+    assim que cada faixa termina (sem esperar o documento inteiro)."""
+    ranges = split_page_ranges(page_count, workers)
+    engine = engine or native_engine()  # o mesmo motor do namespace do cache, em todos os workers
+    # 'spawn' evita herdar threads (agentops/crewai) do processo pai via fork
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=ctx) as pool:
+        futures = [pool.submit(extract_page_range, source, start, end, engine) for start, end in ranges]
+        for future in futures:
+            for _, page_result in future.result():
+                yield page_result
+
+
+def extract_pages_parallel(source: PDFSource, page_count: int, workers: int,
+                           engine: str | None = None) -> list[tuple[str, str] | None]:
+    """Extrai todas as páginas em um pool de processos, devolvendo os resultados em ordem."""
+    return list(iter_pages_parallel(source, page_count, workers, engine))
@@ -0,0 +1,245 @@
+"""Backends de OCR locais (offline) para o PDFToOCRTool.
+
+Um backend recebe as páginas já renderizadas (page_rendering.RenderedPage) e
+devolve, por página, o texto e uma confiança entre 0 e 1. Os backends locais
+rodam as páginas num pool de processos (OCR é CPU-bound), criado no primeiro
+uso e reaproveitado entre documentos. O texto segue pelo mesmo
+clean_and_filter_lines do OCR via API; páginas com confiança baixa podem ser
+escaladas para a API (ver PDFToOCRTool._ocr_pages).
+
+Backends registrados: 'tesseract' (pytesseract + binário tesseract com o
+idioma 'por') e 'easyocr'. Outros podem ser adicionados com register_backend.
+"""
+import base64
+import io
+import multiprocessing
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable
+
+from quartavia_ocr.tools.page_rendering import RenderedPage
+
+
+def default_local_ocr_workers() -> int:
+    """Processos dos backends locais (OCR_LOCAL_WORKERS; padrão: um a menos que o número de CPUs)."""
+    return int(os.getenv("OCR_LOCAL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+
+@dataclass
+class OCRPageResult:
+    text: str | None
+    confidence: float | None = None  # 0..1; None quando o backend não informa
+    error: str | None = None
+
+
+def _decode_image(img_b64: str):
+    from PIL import Image
+    return Image.open(io.BytesIO(base64.b64decode(img_b64)))
+
+
+def _join_tiles(tile_results: list[tuple[str, float | None, int]]) -> tuple[str, float | None]:
+    """Junta as faixas de uma página: texto em ordem e confiança média ponderada pelo nº de palavras."""
+    text = "\n".join(t for t, _, _ in tile_results if t)
+    weighted = [(conf, words) for _, conf, words in tile_results if conf is not None and words]
+    total_words = sum(words for _, words in weighted)
+    confidence = sum(conf * words for conf, words in weighted) / total_words if total_words else None
+    return text, confidence
+
+
+# --- Tesseract ----------------------------------------------------------------
+
+def lines_from_tesseract_data(data: dict) -> tuple[str, float | None, int]:
+    """Reconstrói as linhas a partir do image_to_data e calcula a confiança média das palavras."""
+    lines: dict[tuple[int, int, int], list[str]] = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if not word.strip() or conf < 0:
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        confidences.append(conf / 100)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return text, (statistics.fmean(confidences) if confidences else None), len(confidences)
+
+
+def tesseract_page(images_b64: list[str], lang: str, config: str) -> tuple[str, float | None, str | None]:
+    """Worker do pool: OCR de uma página (todas as faixas) com Tesseract."""
+    import pytesseract
+
+    try:
+        tiles = []
+        for img_b64 in images_b64:
+            data = pytesseract.image_to_data(_decode_image(img_b64), lang=lang, config=config,
+                                             output_type=pytesseract.Output.DICT)
+            tiles.append(lines_from_tesseract_data(data))
+        text, confidence = _join_tiles(tiles)
+        return text, confidence, None
+    except Exception as e:
+        return "", None, f"{type(e).__name__} - {e}"
+
+
+# --- EasyOCR ------------------------------------------------------------------
+
+_easyocr_reader = None
+
+
+def _init_easyocr(langs: list[str], gpu: bool) -> None:
+    """Inicializador do worker: carrega o modelo do EasyOCR uma vez por processo."""
+    global _easyocr_reader
+    import easyocr
+    _easyocr_reader = easyocr.Reader(langs, gpu=gpu, verbose=False)
+
+
+def lines_from_easyocr(results: list, y_tolerance: float = 0.5) -> tuple[str, float | None, int]:
+    """Agrupa as caixas do readtext em linhas (centro vertical próximo) e ordena da esquerda para a direita."""
+    boxes = []
+    for bbox, text, conf in results:
+        ys = [point[1] for point in bbox]
+        boxes.append(((min(ys) + max(ys)) / 2, max(ys) - min(ys), min(point[0] for point in bbox), text, conf))
+    lines: list[list[tuple]] = []
+    for box in sorted(boxes):
+        if lines and abs(box[0] - lines[-1][0][0]) <= y_tolerance * max(box[1], lines[-1][0][1]):
+            lines[-1].append(box)
+        else:
+            lines.append([box])
+    text = "\n".join(" ".join(b[3] for b in sorted(line, key=lambda b: b[2])) for line in lines)
+    confidences = [float(b[4]) for b in boxes]
+    return text, (statistics.fmean(confidences) if confidences else None), len(confidences)
+
+
+def easyocr_page(images_b64: list[str]) -> tuple[str, float | None, str | None]:
+    """Worker do pool: OCR de uma página (todas as faixas) com o EasyOCR carregado no processo."""
+    import numpy as np
+
+    try:
+        tiles = [lines_from_easyocr(_easyocr_reader.readtext(np.array(_decode_image(img_b64).convert("L"))))
+                 for img_b64 in images_b64]
+        text, confidence = _join_tiles(tiles)
+        return text, confidence, None
+    except Exception as e:
+        return "", None, f"{type(e).__name__} - {e}"
+
+
+# --- Backends -----------------------------------------------------------------
+
+class ProcessPoolOCRBackend:
+    """Base dos backends locais: cada página vira uma tarefa num pool de processos (spawn)."""
+    name = "local"
+
+    def __init__(self, workers: int | None = None):
+        self.workers = max(1, default_local_ocr_workers() if workers is None else workers)
+        self._pool: ProcessPoolExecutor | None = None
+
+    # Subclasses definem a função (de módulo, picklable) que processa uma página e seus argumentos extras
+    def page_function(self) -> Callable[..., tuple[str, float | None, str | None]]:
+        raise NotImplementedError
+
+    def page_args(self) -> tuple:
+        return ()
+
+    def initializer(self) -> tuple[Callable | None, tuple]:
+        return None, ()
+
+    def signature(self) -> str:
+        """Identifica backend + configuração (entra na chave do cache de OCR)."""
+        return self.name
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            initializer, initargs = self.initializer()
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=initializer, initargs=initargs)
+        return self._pool
+
+    def recognize(self, pages: list[RenderedPage]) -> list[OCRPageResult]:
+        """OCR das páginas, na ordem recebida."""
+        if not pages:
+            return []
+        pool = self._get_pool()
+        futures = [pool.submit(self.page_function(), page.images_b64, *self.page_args()) for page in pages]
+        results = []
+        for future in futures:
+            try:
+                text, confidence, error = future.result()
+            except BrokenProcessPool as e:  # um processo do pool morreu: recria o pool na próxima chamada
+                self._pool = None
+                text, confidence, error = None, None, f"{type(e).__name__} - {e}"
+            results.append(OCRPageResult(text=text, confidence=confidence, error=error))
+        return results
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+class TesseractBackend(ProcessPoolOCRBackend):
+    name = "tesseract"
+
+    def __init__(self, workers: int | None = None, lang: str | None = None, config: str | None = None):
+        super().__init__(workers)
+        self.lang = lang or os.getenv("OCR_TESSERACT_LANG", "por")
+        # psm 6: bloco uniforme de texto, o que melhor preserva as linhas de um extrato
+        self.config = config if config is not None else os.getenv("OCR_TESSERACT_CONFIG", "--psm 6")
+
+    def page_function(self):
+        return tesseract_page
+
+    def page_args(self) -> tuple:
+        return self.lang, self.config
+
+    def signature(self) -> str:
+        return f"tesseract-{self.lang}-{self.config.replace(' ', '')}"
+
+
+class EasyOCRBackend(ProcessPoolOCRBackend):
+    name = "easyocr"
+
+    def __init__(self, workers: int | None = None, langs: list[str] | None = None, gpu: bool = False):
+        super().__init__(workers)
+        self.langs = langs or os.getenv("OCR_EASYOCR_LANGS", "pt").split(",")
+        self.gpu = gpu
+
+    def page_function(self):
+        return easyocr_page
+
+    def initializer(self) -> tuple[Callable | None, tuple]:
+        return _init_easyocr, (self.langs, self.gpu)
+
+    def signature(self) -> str:
+        return f"easyocr-{'+'.join(self.langs)}"
+
+
+OCR_BACKENDS: dict[str, type[ProcessPoolOCRBackend]] = {}
+_backend_instances: dict[str, ProcessPoolOCRBackend] = {}
+
+
+def register_backend(backend_class: type[ProcessPoolOCRBackend]) -> type[ProcessPoolOCRBackend]:
+    """Registra (ou substitui) um backend local pelo seu nome."""
+    unregister_backend(backend_class.name)
+    OCR_BACKENDS[backend_class.name] = backend_class
+    return backend_class
+
+
+def unregister_backend(name: str) -> None:
+    """Remove um backend do registro, encerrando o pool da instância compartilhada."""
+    OCR_BACKENDS.pop(name, None)
+    instance = _backend_instances.pop(name, None)
+    if instance is not None:
+        instance.close()
+
+
+register_backend(TesseractBackend)
+register_backend(EasyOCRBackend)
+
+
+def get_backend(name: str) -> ProcessPoolOCRBackend:
+    """Instância compartilhada do backend (o pool de processos vive o processo inteiro)."""
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Backend de OCR desconhecido: {name} (disponíveis: {', '.join(OCR_BACKENDS)})")
+    if name not in _backend_instances:
+        _backend_instances[name] = OCR_BACKENDS[name]()
+    return _backend_instances[name]
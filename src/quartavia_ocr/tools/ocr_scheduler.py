@@ -0,0 +1,383 @@
+"""Agendador das chamadas de OCR à API, compartilhado por todo o processo.
+
+Cada PDFToOCRTool limita só as próprias chamadas (max_concurrency). Com vários
+documentos ao mesmo tempo (lote com threads, serviço com vários workers, modo em
+partes), todos disparam contra os mesmos limites da conta e tomam 429. Aqui toda
+chamada de OCR pede uma vaga ao OCRScheduler do processo (get_scheduler) antes de
+ir para a API:
+  - dois baldes de fichas, requisições/min (OCR_RPM) e tokens/min (OCR_TPM); o
+    custo em tokens é estimado pela imagem mais max_tokens (como a API conta para
+    o limite) e corrigido pelo 'usage' da resposta. 0 = sem limite (padrão, pois os
+    limites dependem da conta); o balde acumula no máximo OCR_BURST_SECONDS de taxa;
+  - no máximo OCR_GLOBAL_CONCURRENCY chamadas em andamento no processo;
+  - fila justa: as vagas alternam entre os jobs (documentos) que estão esperando,
+    um documento de 200 páginas não segura os de 2; jobs interativos (serviço HTTP)
+    passam na frente dos de lote (OCR_PRIORITY define o padrão do processo);
+  - um 429 pausa todas as chamadas pelo Retry-After da resposta;
+  - disjuntor: OCR_BREAKER_FAILURES falhas seguidas da API (429, 5xx, conexão)
+    abrem o circuito por OCR_BREAKER_COOLDOWN segundos; nesse tempo as chamadas
+    falham na hora (CircuitOpenError) em vez de esperar timeouts. Passado o tempo,
+    uma chamada de teste decide se o circuito fecha.
+stats() traz a profundidade da fila, as chamadas em andamento e o tempo de espera
+(p50/p95/máx.); o serviço HTTP publica isso em /health.
+"""
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from quartavia_ocr import tracing
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+_PRIORITY_ORDER = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 1}
+
+BREAKER_CLOSED = "fechado"
+BREAKER_OPEN = "aberto"
+BREAKER_HALF_OPEN = "teste"
+
+_WAIT_SAMPLES = 1000
+
+
+class CircuitOpenError(RuntimeError):
+    """A API falhou seguidamente e o disjuntor está aberto: a chamada nem foi feita."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"API de OCR indisponível (disjuntor aberto, nova tentativa em {retry_in:.0f}s)")
+        self.retry_in = retry_in
+
+
+@dataclass
+class SchedulerSettings:
+    """Limites do agendador (variáveis OCR_RPM, OCR_TPM, OCR_GLOBAL_CONCURRENCY, OCR_BURST_SECONDS, OCR_BREAKER_*)."""
+    requests_per_minute: float = 0
+    tokens_per_minute: float = 0
+    max_in_flight: int = 16
+    burst_seconds: float = 10.0
+    breaker_failures: int = 5
+    breaker_cooldown: float = 30.0
+    default_retry_after: float = 2.0  # pausa após um 429 sem Retry-After
+
+    @classmethod
+    def from_env(cls) -> "SchedulerSettings":
+        return cls(
+            requests_per_minute=float(os.getenv("OCR_RPM", "0")),
+            tokens_per_minute=float(os.getenv("OCR_TPM", "0")),
+            max_in_flight=int(os.getenv("OCR_GLOBAL_CONCURRENCY", "16")),
+            burst_seconds=float(os.getenv("OCR_BURST_SECONDS", "10")),
+            breaker_failures=int(os.getenv("OCR_BREAKER_FAILURES", "5")),
+            breaker_cooldown=float(os.getenv("OCR_BREAKER_COOLDOWN", "30")),
+        )
+
+
+class TokenBucket:
+    """Balde de fichas: enche a per_minute/60 por segundo, até burst_seconds de taxa. per_minute 0 = sem limite."""
+
+    def __init__(self, per_minute: float, burst_seconds: float, now: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds) if per_minute > 0 else math.inf
+        self.level = self.capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Segundos até haver amount fichas (um pedido maior que o balde espera o balde cheio)."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        if self.rate:
+            self._refill(now)
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Devolve (positivo) ou cobra (negativo) a diferença entre o estimado e o consumido."""
+        if self.rate:
+            self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, now: float) -> None:
+        if self.rate:
+            self._refill(now)
+            self.level = min(self.level, 0.0)
+
+
+@dataclass
+class OCRJob:
+    """Documento (ou requisição) em nome do qual as chamadas são feitas: a unidade da fila justa."""
+    job_id: str
+    priority: str = PRIORITY_BATCH
+
+
+@dataclass(eq=False)  # cada pedido é único: a fila compara por identidade
+class Ticket:
+    job: OCRJob
+    tokens: float
+    enqueued_at: float
+    granted_at: float | None = None
+    probe: bool = False  # chamada de teste com o disjuntor meio aberto
+
+    @property
+    def wait(self) -> float:
+        return (self.granted_at or self.enqueued_at) - self.enqueued_at
+
+
+_current_job: contextvars.ContextVar[OCRJob | None] = contextvars.ContextVar("quartavia_ocr_job", default=None)
+
+
+@contextmanager
+def ocr_job(job_id: str | None = None, priority: str = PRIORITY_BATCH):
+    """Marca as chamadas de OCR feitas dentro do bloco como de um job (fila justa e prioridade)."""
+    if priority not in _PRIORITY_ORDER:
+        raise ValueError(f"Prioridade desconhecida: {priority} (disponíveis: {', '.join(_PRIORITY_ORDER)})")
+    token = _current_job.set(OCRJob(job_id or uuid.uuid4().hex, priority))
+    try:
+        yield _current_job.get()
+    finally:
+        _current_job.reset(token)
+
+
+def current_job() -> OCRJob:
+    """Job do contexto atual; fora de um ocr_job, um job novo com a prioridade padrão do processo."""
+    job = _current_job.get()
+    if job is not None:
+        return job
+    priority = os.getenv("OCR_PRIORITY", PRIORITY_BATCH).lower()
+    return OCRJob(uuid.uuid4().hex, priority if priority in _PRIORITY_ORDER else PRIORITY_BATCH)
+
+
+def estimate_request_tokens(width: int, height: int, max_tokens: int, prompt_tokens: int = 100) -> int:
+    """Tokens que a API reserva para uma chamada de visão: imagem (blocos de 512px) + prompt + max_tokens."""
+    tiles = max(1, math.ceil(width / 512)) * max(1, math.ceil(height / 512))
+    return 85 + 170 * tiles + prompt_tokens + max_tokens
+
+
+def _status_code(error: BaseException) -> int | None:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_after(error: BaseException) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def is_service_failure(error: BaseException) -> bool:
+    """Falha da API (e não do pedido): 429, 5xx, conexão ou timeout. Só estas contam para o disjuntor."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in (
+        "APIConnectionError", "APITimeoutError")
+
+
+class OCRScheduler:
+    """Fila justa com prioridade, baldes de requisições e tokens, limite global e disjuntor (thread-safe)."""
+
+    def __init__(self, settings: SchedulerSettings | None = None, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings or SchedulerSettings.from_env()
+        self.clock = clock
+        now = clock()
+        self._requests = TokenBucket(self.settings.requests_per_minute, self.settings.burst_seconds, now)
+        self._tokens = TokenBucket(self.settings.tokens_per_minute, self.settings.burst_seconds, now)
+        self._cond = threading.Condition()
+        # prioridade -> {job_id: tickets em ordem}; a ordem dos jobs é a vez de cada um (rodízio)
+        self._queues: dict[str, OrderedDict[str, deque[Ticket]]] = {p: OrderedDict() for p in _PRIORITY_ORDER}
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._breaker = BREAKER_CLOSED
+        self._open_until = 0.0
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.counters = {"granted": 0, "rate_limited": 0, "rejected": 0, "failures": 0, "breaker_trips": 0}
+
+    # ---- fila ----------------------------------------------------------------
+
+    def _enqueue(self, ticket: Ticket) -> None:
+        self._queues[ticket.job.priority].setdefault(ticket.job.job_id, deque()).append(ticket)
+
+    def _remove(self, ticket: Ticket) -> None:
+        queue = self._queues[ticket.job.priority]
+        tickets = queue.get(ticket.job.job_id)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del queue[ticket.job.job_id]
+
+    def _head(self) -> Ticket | None:
+        """Próximo a ser atendido: maior prioridade; dentro dela, o job da vez."""
+        for priority in sorted(self._queues, key=_PRIORITY_ORDER.__getitem__):
+            queue = self._queues[priority]
+            if queue:
+                return next(iter(queue.values()))[0]
+        return None
+
+    def _queued(self) -> int:
+        return sum(len(tickets) for queue in self._queues.values() for tickets in queue.values())
+
+    # ---- disjuntor -----------------------------------------------------------
+
+    def _check_breaker(self, now: float) -> None:
+        if self._breaker == BREAKER_OPEN:
+            if now < self._open_until:
+                raise CircuitOpenError(self._open_until - now)
+            self._breaker = BREAKER_HALF_OPEN
+            logger.info("Disjuntor do OCR meio aberto: a próxima chamada testa a API")
+
+    def _trip(self, now: float) -> None:
+        self._breaker = BREAKER_OPEN
+        self._open_until = now + self.settings.breaker_cooldown
+        self.counters["breaker_trips"] += 1
+        logger.warning("Disjuntor do OCR aberto por %.0fs após %d falha(s) seguida(s) da API",
+                       self.settings.breaker_cooldown, self._consecutive_failures)
+
+    # ---- vagas ---------------------------------------------------------------
+
+    def _delay(self, ticket: Ticket, now: float) -> float | None:
+        """0 se o ticket pode sair agora; segundos até poder; None se depende de uma chamada terminar."""
+        if self._in_flight >= max(1, self.settings.max_in_flight):
+            return None
+        if self._breaker == BREAKER_HALF_OPEN and self._probe_in_flight:
+            return None
+        return max(self._paused_until - now, self._requests.delay(1, now), self._tokens.delay(ticket.tokens, now), 0.0)
+
+    def acquire(self, job: OCRJob, tokens: float = 0) -> Ticket:
+        """Espera a vez do job e as fichas; devolve o ticket a entregar em release(). Pode levantar CircuitOpenError."""
+        ticket = Ticket(job, tokens, self.clock())
+        with self._cond:
+            try:
+                self._check_breaker(ticket.enqueued_at)
+                self._enqueue(ticket)
+                while True:
+                    now = self.clock()
+                    self._check_breaker(now)
+                    delay = self._delay(ticket, now) if self._head() is ticket else None
+                    if delay == 0:
+                        break
+                    self._cond.wait(timeout=delay)
+            except CircuitOpenError:
+                self._remove(ticket)
+                self.counters["rejected"] += 1
+                self._cond.notify_all()
+                raise
+
+            now = self.clock()
+            self._remove(ticket)
+            queue = self._queues[job.priority]
+            if job.job_id in queue:
+                queue.move_to_end(job.job_id)  # o job volta para o fim da fila de vez
+            self._requests.take(1, now)
+            self._tokens.take(tokens, now)
+            self._in_flight += 1
+            ticket.granted_at = now
+            if self._breaker == BREAKER_HALF_OPEN:
+                ticket.probe = self._probe_in_flight = True
+            self._waits.append(ticket.wait)
+            self.counters["granted"] += 1
+            self._cond.notify_all()
+        tracing.count("ocr_queue_wait_seconds", ticket.wait)
+        return ticket
+
+    def release(self, ticket: Ticket, used_tokens: float | None = None, error: BaseException | None = None) -> None:
+        """Fim da chamada: devolve a vaga, corrige o balde de tokens e alimenta o disjuntor."""
+        with self._cond:
+            now = self.clock()
+            self._in_flight -= 1
+            if ticket.probe:
+                self._probe_in_flight = False
+            if used_tokens is not None:
+                self._tokens.adjust(ticket.tokens - used_tokens)
+            if error is not None and is_service_failure(error):
+                self.counters["failures"] += 1
+                self._consecutive_failures += 1
+                if _status_code(error) == 429:
+                    self.counters["rate_limited"] += 1
+                    pause = _retry_after(error) or self.settings.default_retry_after
+                    self._paused_until = max(self._paused_until, now + pause)
+                    self._requests.drain(now)
+                if ticket.probe or self._consecutive_failures >= max(1, self.settings.breaker_failures):
+                    if self._breaker != BREAKER_OPEN:
+                        self._trip(now)
+            elif error is None:
+                self._consecutive_failures = 0
+                if self._breaker == BREAKER_HALF_OPEN:
+                    self._breaker = BREAKER_CLOSED
+                    logger.info("Disjuntor do OCR fechado: a API voltou a responder")
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, job: OCRJob, tokens: float = 0):
+        """acquire/release em volta de uma chamada; o bloco pode informar o consumo real em usage['tokens']."""
+        ticket = self.acquire(job, tokens)
+        usage: dict[str, Any] = {}
+        try:
+            yield usage
+        except BaseException as e:
+            self.release(ticket, error=e)
+            raise
+        self.release(ticket, used_tokens=usage.get("tokens"))
+
+    def stats(self) -> dict:
+        """Fila (por prioridade), chamadas em andamento, disjuntor e tempo de espera na fila."""
+        with self._cond:
+            waits = sorted(self._waits)
+            queued = {priority: sum(len(t) for t in queue.values()) for priority, queue in self._queues.items()}
+            stats = {"queued": sum(queued.values()), "queued_by_priority": queued, "in_flight": self._in_flight,
+                     "breaker": self._breaker, **self.counters}
+        if waits:
+            stats.update(wait_p50=round(waits[int(0.50 * (len(waits) - 1))], 3),
+                         wait_p95=round(waits[int(0.95 * (len(waits) - 1))], 3),
+                         wait_max=round(waits[-1], 3))
+        return stats
+
+
+_default_scheduler: OCRScheduler | None = None
+_clients: dict[tuple[str, str | None], Any] = {}
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> OCRScheduler:
+    """Agendador do processo (limites das variáveis OCR_*)."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = OCRScheduler()
+        return _default_scheduler
+
+
+def get_openai_client(api_key: str, base_url: str | None = None) -> Any:
+    """Cliente OpenAI compartilhado por todas as ferramentas do processo (um pool de conexões por chave).
+
+    Sem retentativas próprias (max_retries=0): as retentativas são as da ferramenta, que passam pelo
+    agendador de novo; as do SDK furariam a fila e os limites.
+    """
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+    with _default_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            from openai import OpenAI
+
+            client = _clients[(api_key, base_url)] = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return client
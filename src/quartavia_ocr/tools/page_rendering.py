@@ -0,0 +1,260 @@
+"""Renderização das páginas para o OCR, otimizada para o tamanho do payload.
+
+Antes, toda página era renderizada em 2x (144 DPI) como PNG colorido. Aqui:
+  - o DPI é escolhido pelo tamanho do texto da página (camada de texto) ou pela
+    resolução da imagem escaneada embutida, dentro de [min_dpi, max_dpi];
+  - a página é renderizada em tons de cinza e codificada em JPEG/WebP (qualidade
+    configurável) ou PNG de 16 tons; no modo 'auto', páginas escaneadas vão em JPEG e
+    páginas com texto vetorial em PNG, que para texto nítido sai bem menor que o JPEG;
+  - margens em branco são cortadas;
+  - páginas muito altas podem ser divididas em faixas, cortando numa linha em branco.
+Cada página renderizada traz DPI, bytes e tempo, para ajustar tamanho x precisão por banco.
+"""
+import base64
+import io
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from quartavia_ocr import tracing
+from quartavia_ocr.tools.document_fetcher import PDFSource
+from quartavia_ocr.tools.document_session import page_lock, use_fitz
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+@dataclass
+class RenderSettings:
+    """Parâmetros da renderização (os padrões podem ser trocados por variáveis OCR_RENDER_*).
+
+    target_text_px: altura desejada (em pixels) do corpo de texto típico da página.
+    default_dpi: usado quando a página não tem texto nem imagem para estimar o tamanho.
+    scan_coverage: fração da página coberta por uma imagem a partir da qual ela é tratada
+        como escaneada (mesmo com uma camada de texto invisível por cima).
+    trim_threshold: pixels acima deste nível de cinza contam como fundo ao cortar margens.
+    max_tile_height: páginas mais altas que isto (em pixels) viram faixas; 0 desliga.
+    """
+    target_text_px: float = 18.0
+    min_dpi: int = 100
+    max_dpi: int = 220
+    default_dpi: int = 150
+    scan_coverage: float = 0.5
+    grayscale: bool = True
+    image_format: str = "auto"  # auto, jpeg, webp ou png
+    quality: int = 70
+    trim: bool = True
+    trim_threshold: int = 235
+    trim_margin: int = 12
+    max_tile_height: int = 2400
+
+    @classmethod
+    def from_env(cls) -> "RenderSettings":
+        return cls(
+            target_text_px=float(os.getenv("OCR_RENDER_TARGET_TEXT_PX", "18")),
+            min_dpi=int(os.getenv("OCR_RENDER_MIN_DPI", "100")),
+            max_dpi=int(os.getenv("OCR_RENDER_MAX_DPI", "220")),
+            default_dpi=int(os.getenv("OCR_RENDER_DEFAULT_DPI", "150")),
+            grayscale=os.getenv("OCR_RENDER_GRAYSCALE", "1") not in ("0", "false", "False"),
+            image_format=os.getenv("OCR_RENDER_FORMAT", "auto").lower(),
+            quality=int(os.getenv("OCR_RENDER_QUALITY", "70")),
+            trim=os.getenv("OCR_RENDER_TRIM", "1") not in ("0", "false", "False"),
+            max_tile_height=int(os.getenv("OCR_RENDER_TILE_HEIGHT", "2400")),
+        )
+
+    def signature(self) -> str:
+        """Identifica a configuração (entra na chave do cache de OCR)."""
+        return (f"{self.image_format}{self.quality}-{'g' if self.grayscale else 'c'}-"
+                f"{self.target_text_px:g}px{self.min_dpi}-{self.max_dpi}-{self.default_dpi}-s{self.scan_coverage:g}-"
+                f"t{int(self.trim)}{self.trim_threshold}-{self.max_tile_height}")
+
+
+@dataclass
+class RenderedPage:
+    """Uma página pronta para o OCR: uma ou mais imagens (faixas) em base64, com métricas."""
+    page_index: int  # base 0
+    images_b64: list[str]
+    mime_type: str
+    dpi: int
+    width: int
+    height: int
+    bytes: int
+    render_seconds: float
+    dpi_reason: str = ""
+    tile_heights: list[int] = field(default_factory=list)
+
+
+def _median_font_size(page) -> float | None:
+    import fitz
+
+    sizes = []
+    # TEXTFLAGS_TEXT deixa de fora os blocos de imagem (que trariam os bytes da imagem junto)
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT).get("blocks", []):
+        for line in block.get("lines", []):
+            for span in line.get("spans", []):
+                if span.get("text", "").strip():
+                    sizes.append(span["size"])
+    return statistics.median(sizes) if sizes else None
+
+
+def _largest_image(page) -> tuple[float, float] | None:
+    """(fração da página coberta, resolução efetiva em dpi) da maior imagem da página."""
+    best = None
+    page_area = page.rect.width * page.rect.height or 1
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        if x1 <= x0 or y1 <= y0 or not info.get("width"):
+            continue
+        coverage = (x1 - x0) * (y1 - y0) / page_area
+        if best is None or coverage > best[0]:
+            best = (coverage, info["width"] / ((x1 - x0) / 72))
+    return best
+
+
+def choose_dpi(page, settings: RenderSettings) -> tuple[int, str]:
+    """DPI para a página e o motivo da escolha ('imagem ...', 'texto ...' ou 'padrão')."""
+    image = _largest_image(page)
+    font_size = None if image and image[0] >= settings.scan_coverage else _median_font_size(page)
+    if image and (image[0] >= settings.scan_coverage or not font_size):
+        # Página escaneada: renderizar acima da resolução do scan só aumenta o arquivo
+        dpi, reason = image[1], f"imagem {image[1]:.0f}dpi"
+    elif font_size:
+        # Corpo de texto de font_size pt ocupa font_size * dpi / 72 pixels
+        dpi, reason = settings.target_text_px * 72 / font_size, f"texto {font_size:.1f}pt"
+    else:
+        dpi, reason = settings.default_dpi, "padrão"
+    return int(min(max(dpi, settings.min_dpi), settings.max_dpi)), reason
+
+
+def _trim(image, settings: RenderSettings):
+    """Corta as margens em branco, mantendo uma pequena borda."""
+    gray = image if image.mode == "L" else image.convert("L")
+    mask = gray.point(lambda v: 255 if v < settings.trim_threshold else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return image  # página em branco: deixa como está
+    m = settings.trim_margin
+    return image.crop((max(bbox[0] - m, 0), max(bbox[1] - m, 0),
+                       min(bbox[2] + m, image.width), min(bbox[3] + m, image.height)))
+
+
+def _blank_rows(image, threshold: int) -> list[bool]:
+    """Para cada linha de pixels, se ela é toda fundo."""
+    gray = image if image.mode == "L" else image.convert("L")
+    width, height = gray.size
+    data = gray.tobytes()
+    return [min(data[y * width:(y + 1) * width]) >= threshold for y in range(height)]
+
+
+def split_tiles(image, max_height: int, threshold: int) -> list:
+    """Divide uma imagem alta em faixas de até max_height, cortando em linhas em branco quando possível."""
+    if max_height <= 0 or image.height <= max_height:
+        return [image]
+    blank = _blank_rows(image, threshold)
+    tiles, top = [], 0
+    while image.height - top > max_height:
+        limit = top + max_height
+        # Procura, no último quarto da faixa, a linha em branco mais baixa para não cortar texto
+        cut = next((y for y in range(limit, limit - max_height // 4, -1) if blank[y]), limit)
+        tiles.append(image.crop((0, top, image.width, cut)))
+        top = cut
+    tiles.append(image.crop((0, top, image.width, image.height)))
+    return tiles
+
+
+def _page_format(settings: RenderSettings, dpi_reason: str) -> str:
+    if settings.image_format != "auto":
+        return settings.image_format
+    return "jpeg" if dpi_reason.startswith("imagem") else "png"
+
+
+# Paleta de 16 tons de cinza para o PNG de 4 bits
+_GRAY16_PALETTE = [level * 17 for level in range(16) for _ in range(3)]
+
+
+def _encode(image, image_format: str, settings: RenderSettings) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "png" and image.mode == "L":
+        # 16 tons bastam para texto (com antialiasing) e o PNG de 4 bits fica várias vezes menor
+        from PIL import Image
+        indexed = Image.frombytes("P", image.size, image.point(lambda v: v >> 4).tobytes())
+        indexed.putpalette(_GRAY16_PALETTE)
+        indexed.save(buffer, format="PNG", bits=4, compress_level=6)
+    elif image_format == "png":
+        image.save(buffer, format="PNG", compress_level=6)
+    elif image_format == "webp":
+        image.save(buffer, format="WEBP", quality=settings.quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=settings.quality, optimize=True)
+    return buffer.getvalue()
+
+
+def render_page(page, page_index: int, settings: RenderSettings) -> RenderedPage:
+    import fitz
+    from PIL import Image
+
+    start = time.perf_counter()
+    with tracing.span("render_page", page=page_index + 1) as span:
+        dpi, reason = choose_dpi(page, settings)
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY if settings.grayscale else fitz.csRGB, alpha=False)
+        image = Image.frombytes("L" if settings.grayscale else "RGB", (pix.width, pix.height), pix.samples)
+        if settings.trim:
+            image = _trim(image, settings)
+        tiles = split_tiles(image, settings.max_tile_height, settings.trim_threshold)
+        image_format = _page_format(settings, reason)
+        encoded = [_encode(tile, image_format, settings) for tile in tiles]
+        span.set("dpi", dpi)
+        span.set("format", image_format)
+        span.set("tiles", len(tiles))
+        span.add("pages_rendered")
+        span.add("render_bytes", sum(len(data) for data in encoded))
+    return RenderedPage(
+        page_index=page_index,
+        images_b64=[base64.b64encode(data).decode("utf-8") for data in encoded],
+        mime_type=MIME_TYPES[image_format],
+        dpi=dpi,
+        width=image.width,
+        height=image.height,
+        bytes=sum(len(data) for data in encoded),
+        render_seconds=time.perf_counter() - start,
+        dpi_reason=reason,
+        tile_heights=[tile.height for tile in tiles],
+    )
+
+
+def render_pages(source: PDFSource, page_numbers: list[int] | None = None,
+                 settings: RenderSettings | None = None) -> list[RenderedPage]:
+    """Renderiza as páginas indicadas (base 0; todas se None), na ordem pedida."""
+    settings = settings or RenderSettings()
+    pages = []
+    with use_fitz(source) as document:
+        with page_lock(document):
+            indices = range(len(document)) if page_numbers is None else page_numbers
+        for i in indices:
+            with page_lock(document):
+                pages.append(render_page(document.load_page(i), i, settings))
+    return pages
+
+
+def release_render_memory() -> None:
+    """Esvazia o cache interno do MuPDF (imagens decodificadas das páginas já renderizadas).
+
+    Sem isso, num PDF escaneado grande, cada página renderizada deixa a imagem
+    decodificada no cache (até 256 MB por padrão) e a memória cresce com o documento.
+    """
+    import fitz
+
+    fitz.TOOLS.store_shrink(100)
+
+
+def format_render_report(pages: list[RenderedPage]) -> str:
+    """Resumo por página (DPI, tamanho, faixas, bytes, tempo) e total."""
+    lines = []
+    for page in pages:
+        lines.append(f"página {page.page_index + 1}: {page.dpi}dpi ({page.dpi_reason}) {page.width}x{page.height}px "
+                     f"{len(page.images_b64)} faixa(s) {page.bytes / 1024:.1f}KB {page.render_seconds * 1000:.0f}ms")
+    total_bytes = sum(p.bytes for p in pages)
+    total_seconds = sum(p.render_seconds for p in pages)
+    lines.append(f"total: {len(pages)} páginas {total_bytes / 1024:.1f}KB "
+                 f"({total_bytes / 1024 / max(len(pages), 1):.1f}KB/página) {total_seconds * 1000:.0f}ms")
+    return "\n".join(lines)
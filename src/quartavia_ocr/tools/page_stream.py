@@ -0,0 +1,59 @@
+"""API de streaming por página das ferramentas de extração.
+
+Cada ferramenta tem um gerador iter_pages(source) que extrai (ou renderiza e faz
+o OCR), filtra e entrega uma página de cada vez, como PageResult, na ordem do PDF.
+O OCR trabalha em janelas de no máximo QUARTAVIA_STREAM_WINDOW páginas: as imagens
+de uma janela são descartadas antes de a próxima ser renderizada, então a memória
+fica limitada pela janela e não pelo tamanho do documento. O _run das ferramentas
+monta a saída a partir desses geradores.
+
+Uso direto (sem passar pelo agente):
+    for page in stream_pages("extrato.pdf", HybridPDFExtractorTool()):
+        print(page.page_number, page.method, page.filtered_text)
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from quartavia_ocr.tools.document_fetcher import download_pdf, is_url
+from quartavia_ocr.tools.document_session import current_run
+
+METHOD_NATIVE = "Texto Nativo"
+METHOD_OCR = "OCR"
+
+
+def default_stream_window() -> int:
+    """Máximo de páginas renderizadas (imagens) em memória ao mesmo tempo no OCR (QUARTAVIA_STREAM_WINDOW)."""
+    return int(os.getenv("QUARTAVIA_STREAM_WINDOW", "8"))
+
+
+@dataclass
+class PageResult:
+    """Resultado de uma página. raw_text None: a página não tem texto (nativo), o OCR falhou (error)
+    ou a triagem pulou a página (skipped)."""
+    page_number: int  # base 1
+    method: str
+    raw_text: str | None
+    filtered_text: str = ""
+    error: str | None = None
+    skipped: str | None = None  # motivo, quando a triagem (page_triage) pulou o OCR da página
+
+
+def stream_pages(file_path: str, extractor: Any, download=download_pdf) -> Iterator[PageResult]:
+    """Resolve o documento (baixa URLs uma vez) e repassa o iter_pages da ferramenta."""
+    run = current_run()
+    if run is not None:
+        # Dentro de uma execução, o documento (e o que as ferramentas já fizeram dele) vem da sessão
+        session = run.session(file_path)
+        if session is None:
+            raise ValueError(f"Falha ao obter o PDF: {file_path}")
+        source = session.content
+    elif is_url(file_path):
+        source = download(file_path)
+        if not source:
+            raise ValueError(f"Falha ao baixar PDF da URL: {file_path}")
+    elif not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+    else:
+        source = file_path
+    yield from extractor.iter_pages(source)
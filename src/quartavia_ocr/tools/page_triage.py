@@ -0,0 +1,174 @@
+"""Triagem das páginas antes do OCR: pula as que são só texto padrão.
+
+Termos e condições, ficha de compensação do boleto, propaganda de pontos: o
+filtro de linhas (text_filters) descarta esse texto de qualquer jeito, mas só
+depois de a página ter sido renderizada e paga na API de OCR. Aqui cada página
+recebe uma nota de 0 a 1 (chance de ter lançamentos) a partir de evidências
+baratas, e as que ficam abaixo de OCR_TRIAGE_THRESHOLD não vão para o OCR:
+  - texto da própria página (camada de texto do PDF, mesmo num PDF escaneado),
+    desde que a camada seja confiável: só vale para pular se em alguma página do
+    documento ela traz lançamentos. Uma camada lixo (fonte sem mapeamento, texto
+    embaralhado) não tem data nem valor em lugar nenhum, e é justamente o PDF
+    que precisa do OCR; aí as páginas são avaliadas como se não tivessem texto;
+  - ou, se OCR_TRIAGE_BACKEND apontar para um backend local (ocr_backends), um
+    OCR rápido numa renderização de baixa resolução;
+  - sem texto confiável, só a imagem: páginas sem nenhum texto e praticamente sem
+    tinta são puladas; as demais vão para o OCR (sem evidência, nunca se pula).
+A nota do texto é a do próprio filtro: linhas que ele manteria (LineClassifier)
+e que têm data ou valor; OCR_TRIAGE_FULL_SCORE_LINES delas valem nota 1.
+"""
+import logging
+import os
+from dataclasses import dataclass
+
+from quartavia_ocr import tracing
+from quartavia_ocr.tools.document_session import page_lock
+from quartavia_ocr.tools.page_rendering import RenderSettings, render_page
+from quartavia_ocr.tools.text_condenser import is_data_line
+from quartavia_ocr.tools.text_filters import DEFAULT_CLASSIFIER, KEPT_LABELS, LABEL_IGNORED
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TEXT_LAYER = "texto"
+SOURCE_QUICK_OCR = "ocr rápido"
+SOURCE_IMAGE = "imagem"
+
+
+@dataclass
+class TriageSettings:
+    """Parâmetros da triagem (variáveis OCR_TRIAGE_*).
+
+    threshold: páginas com nota abaixo disto são puladas; 0 desliga o corte.
+    min_text_chars: texto (camada ou OCR rápido) mais curto que isto não é evidência.
+    blank_ink_ratio: fração de pixels escuros abaixo da qual a página conta como em branco.
+    backend: backend local para o OCR rápido ('' = só camada de texto e detecção de página em branco).
+    """
+    enabled: bool = True
+    threshold: float = 0.3
+    full_score_lines: int = 3
+    min_text_chars: int = 80
+    blank_ink_ratio: float = 0.0005
+    backend: str = ""
+    dpi: int = 100
+    min_confidence: float = 0.6
+
+    @classmethod
+    def from_env(cls) -> "TriageSettings":
+        return cls(
+            enabled=os.getenv("OCR_TRIAGE", "1") not in ("0", "false", "False"),
+            threshold=float(os.getenv("OCR_TRIAGE_THRESHOLD", "0.3")),
+            full_score_lines=int(os.getenv("OCR_TRIAGE_FULL_SCORE_LINES", "3")),
+            min_text_chars=int(os.getenv("OCR_TRIAGE_MIN_TEXT_CHARS", "80")),
+            blank_ink_ratio=float(os.getenv("OCR_TRIAGE_BLANK_INK_RATIO", "0.0005")),
+            backend=os.getenv("OCR_TRIAGE_BACKEND", "").lower(),
+            dpi=int(os.getenv("OCR_TRIAGE_DPI", "100")),
+            min_confidence=float(os.getenv("OCR_TRIAGE_MIN_CONFIDENCE", "0.6")),
+        )
+
+    def signature(self) -> str:
+        """Identifica a configuração (entra na chave do cache de OCR: páginas puladas mudam a saída)."""
+        if not self.enabled or self.threshold <= 0:
+            return "triage-off"
+        return (f"triage{self.threshold:g}-{self.full_score_lines}-{self.min_text_chars}-{self.blank_ink_ratio:g}"
+                f"-{self.backend or 'none'}{self.dpi}@{self.min_confidence:g}")
+
+
+@dataclass
+class TriageResult:
+    page_number: int  # base 1
+    score: float
+    skip: bool
+    source: str  # de onde veio a evidência: texto, ocr rápido ou imagem
+    reason: str
+
+    def describe(self) -> str:
+        verdict = "pulada" if self.skip else "OCR"
+        return f"página {self.page_number}: {verdict} (nota {self.score:.2f}, {self.source}: {self.reason})"
+
+
+def score_text(text: str, full_score_lines: int = 3) -> tuple[float, str]:
+    """Nota (0..1) de um texto de página: linhas que o filtro manteria e que têm data ou valor."""
+    labels = DEFAULT_CLASSIFIER.classify_lines(text.split("\n"))
+    data_lines = sum(1 for line, label in labels if label in KEPT_LABELS and is_data_line(line))
+    ignored = sum(1 for _, label in labels if label == LABEL_IGNORED)
+    score = min(1.0, data_lines / max(1, full_score_lines))
+    return score, f"{data_lines} linha(s) de lançamento, {ignored} descartada(s) pelo filtro"
+
+
+def text_layer_trusted(document, settings: TriageSettings) -> bool:
+    """A camada de texto do documento traz lançamentos em alguma página (e então vale para pular páginas)?"""
+    with page_lock(document):
+        page_count = len(document)
+    for i in range(page_count):
+        with page_lock(document):
+            text = document.load_page(i).get_text()
+        if len(text.strip()) >= settings.min_text_chars and score_text(text, settings.full_score_lines)[0] > 0:
+            return True
+    return False
+
+
+def ink_ratio(fitz_page, dpi: int = 24) -> float:
+    """Fração de pixels escuros numa renderização minúscula (detecta página em branco)."""
+    import fitz
+
+    pix = fitz_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    samples = pix.samples
+    return sum(1 for value in samples if value < 200) / max(1, len(samples))
+
+
+def _result(page_index: int, score: float, settings: TriageSettings, source: str, reason: str) -> TriageResult:
+    return TriageResult(page_index + 1, score, score < settings.threshold, source, reason)
+
+
+def triage_pages(document, page_indices: list[int], settings: TriageSettings, backend=None,
+                 trusted: bool | None = None) -> dict[int, TriageResult]:
+    """Nota de cada página (base 0) de um documento fitz aberto. Retorna {índice: TriageResult}.
+
+    backend: ProcessPoolOCRBackend para o OCR rápido das páginas sem camada de texto (opcional).
+    trusted: resultado de text_layer_trusted(document) (calculado aqui se None).
+    """
+    results: dict[int, TriageResult] = {}
+    with tracing.span("triage", pages=len(page_indices), backend=backend.name if backend else None) as span:
+        if trusted is None:
+            trusted = text_layer_trusted(document, settings)
+        span.set("text_layer_trusted", trusted)
+        undecided = []
+        for i in page_indices:
+            with page_lock(document):
+                page = document.load_page(i)
+                text = page.get_text()
+                blank = not text.strip() and ink_ratio(page) < settings.blank_ink_ratio
+            if trusted and len(text.strip()) >= settings.min_text_chars:
+                score, reason = score_text(text, settings.full_score_lines)
+                results[i] = _result(i, score, settings, SOURCE_TEXT_LAYER, reason)
+            elif blank:
+                results[i] = _result(i, 0.0, settings, SOURCE_IMAGE, "página em branco")
+            else:
+                undecided.append(i)
+
+        if undecided and backend is not None:
+            quick = RenderSettings(min_dpi=settings.dpi, max_dpi=settings.dpi, default_dpi=settings.dpi,
+                                   image_format="png", trim=False, max_tile_height=0)
+            rendered = []
+            for i in undecided:
+                with page_lock(document):
+                    rendered.append(render_page(document.load_page(i), i, quick))
+            # O OCR rápido roda fora do lock: outras threads da execução seguem usando o documento
+            for i, ocr in zip(undecided, backend.recognize(rendered)):
+                confident = ocr.confidence is None or ocr.confidence >= settings.min_confidence
+                if ocr.error is None and ocr.text and len(ocr.text.strip()) >= settings.min_text_chars and confident:
+                    score, reason = score_text(ocr.text, settings.full_score_lines)
+                    results[i] = _result(i, score, settings, SOURCE_QUICK_OCR, reason)
+            undecided = [i for i in undecided if i not in results]
+
+        for i in undecided:
+            reason = "sem texto para avaliar" if trusted else "camada de texto sem lançamentos no documento"
+            results[i] = TriageResult(i + 1, 1.0, False, SOURCE_IMAGE, reason)
+
+        skipped = sum(1 for result in results.values() if result.skip)
+        span.add("triage_skipped_pages", skipped)
+    return results
+
+
+def format_triage_report(results: list[TriageResult]) -> str:
+    return "\n".join(result.describe() for result in results)
@@ -0,0 +1,289 @@
+"""Extração estruturada de linhas de transação a partir das coordenadas das palavras.
+
+Em vez de entregar ao LLM o texto achatado (layout=True) para ele remontar
+data/descrição/valor, este módulo usa pdfplumber.extract_words para detectar as
+colunas da tabela (pelo cabeçalho, quando existe, ou pela posição dos valores) e
+emite as linhas já estruturadas. Cada banco pode ter um BankLayout próprio,
+registrado com register_layout.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pdfplumber
+
+from quartavia_ocr.tools.document_fetcher import PDFSource
+from quartavia_ocr.tools.document_session import ARTIFACT_TEXT, page_lock, session_for, use_pdfplumber
+
+# Papéis de coluna reconhecidos no cabeçalho da tabela
+ROLE_DATE = "data"
+ROLE_DESCRIPTION = "descricao"
+ROLE_AMOUNT = "valor"
+ROLE_CREDIT = "credito"
+ROLE_DEBIT = "debito"
+ROLE_BALANCE = "saldo"
+AMOUNT_ROLES = (ROLE_AMOUNT, ROLE_CREDIT, ROLE_DEBIT, ROLE_BALANCE)
+
+HEADER_WORDS = {
+    "data": ROLE_DATE,
+    "lançamento": ROLE_DESCRIPTION, "lancamento": ROLE_DESCRIPTION, "histórico": ROLE_DESCRIPTION,
+    "historico": ROLE_DESCRIPTION, "descrição": ROLE_DESCRIPTION, "descricao": ROLE_DESCRIPTION,
+    "movimentação": ROLE_DESCRIPTION, "movimentacao": ROLE_DESCRIPTION, "estabelecimento": ROLE_DESCRIPTION,
+    "valor": ROLE_AMOUNT, "crédito": ROLE_CREDIT, "credito": ROLE_CREDIT, "créditos": ROLE_CREDIT,
+    "débito": ROLE_DEBIT, "debito": ROLE_DEBIT, "débitos": ROLE_DEBIT, "saldo": ROLE_BALANCE,
+}
+
+AMOUNT_TOKEN_RE = re.compile(r'^\(?[-+]?(?:R\$)?[-+]?\d{1,3}(?:\.\d{3})*,\d{2}\)?[-+DC]?$')
+DATE_RE = re.compile(
+    r'^(?:\d{2}/\d{2}(?:/\d{2,4})?'
+    r'|\d{2}\s+(?:de\s+)?(?:jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez)[a-zç]*\.?(?:\s+(?:de\s+)?\d{4})?)',
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class BankLayout:
+    """Template de layout de um banco.
+
+    bank_name: nome do banco no ExtractionResult (vazio no genérico).
+    detect_keywords: termos (minúsculos) cuja presença na 1ª página identifica o banco.
+    skip_keywords: linhas que contêm estes termos (como palavras inteiras; '^' prende ao
+        início da linha) nunca viram transação. 'TotalPass' e 'Posto Total' são comerciantes.
+    trailing_balance: sem cabeçalho, um segundo valor no fim da linha é o saldo.
+    positive_is_expense: em faturas de cartão, valores sem sinal são despesas.
+    inherit_date: linhas sem data herdam a data da linha anterior.
+    value_on_next_line: valor isolado na linha seguinte completa a transação pendente.
+    """
+    name: str
+    bank_name: str = ""
+    detect_keywords: tuple[str, ...] = ()
+    skip_keywords: tuple[str, ...] = ("saldo do dia", "saldo anterior", "saldo atual", "saldo final",
+                                      "total da fatura", "total desta fatura", "total de", "total a pagar",
+                                      "valor total", "subtotal", "^total")
+    trailing_balance: bool = False
+    positive_is_expense: bool = False
+    inherit_date: bool = True
+    value_on_next_line: bool = True
+    y_tolerance: float = 3.0
+
+
+@dataclass
+class TransactionRow:
+    """Linha de transação estruturada, pronta para o crew ou um formatador determinístico."""
+    page: int
+    data: str
+    descricao: str
+    valor: float
+    tipo: str  # 'despesa' ou 'receita'
+    saldo: float | None = None
+
+    def to_compact(self) -> str:
+        return f"{self.page}|{self.data}|{self.descricao}|{self.valor:.2f}|{self.tipo}"
+
+
+LAYOUTS: dict[str, BankLayout] = {}
+
+
+def register_layout(layout: BankLayout) -> BankLayout:
+    """Registra (ou substitui) o template de um banco."""
+    LAYOUTS[layout.name] = layout
+    return layout
+
+
+GENERIC_LAYOUT = register_layout(BankLayout(name="generico"))
+register_layout(BankLayout(name="btg", bank_name="BTG Pactual", detect_keywords=("btg pactual", "banco btg")))
+register_layout(BankLayout(name="bradesco", bank_name="Bradesco", detect_keywords=("bradesco",),
+                           trailing_balance=True))
+register_layout(BankLayout(name="inter", bank_name="Banco Inter",
+                           detect_keywords=("banco inter", "inter&co", "bancointer"), positive_is_expense=True))
+
+
+# Versão da lógica de extração de linhas (usada na chave do cache, junto com os templates
+# registrados): incremente ao alterar como as linhas são montadas ou puladas.
+ROWS_RULES_VERSION = "2"
+
+
+def rows_version() -> str:
+    """Identifica as regras de extração: muda sozinha quando um template é registrado ou alterado."""
+    layouts = repr(sorted((name, repr(layout)) for name, layout in LAYOUTS.items()))
+    return ROWS_RULES_VERSION + "-" + hashlib.sha256(layouts.encode("utf-8")).hexdigest()[:12]
+
+
+def detect_layout(text: str) -> BankLayout:
+    """Escolhe o template pelo texto da primeira página (ou o genérico)."""
+    text_lower = text.lower()
+    for layout in LAYOUTS.values():
+        if any(keyword in text_lower for keyword in layout.detect_keywords):
+            return layout
+    return GENERIC_LAYOUT
+
+
+@lru_cache(maxsize=32)
+def _keyword_pattern(keywords: tuple[str, ...]) -> re.Pattern:
+    """Regex que acha qualquer um dos termos como palavras inteiras ('^termo': só no início da linha)."""
+    parts = [("^" + re.escape(k[1:]) if k.startswith("^") else r"\b" + re.escape(k)) + r"\b" for k in keywords]
+    return re.compile("|".join(parts) or r"(?!)")
+
+
+def parse_amount(token: str) -> tuple[float, int] | None:
+    """Converte '1.234,56', '-R$10,00', '(5,00)', '10,00D' em (valor absoluto, sinal)."""
+    token = token.strip()
+    if not AMOUNT_TOKEN_RE.match(token):
+        return None
+    sign = -1 if (token.startswith("(") or "-" in token or token.endswith("D")) else 1
+    digits = re.sub(r'[^\d,]', '', token).replace(",", ".")
+    return float(digits), sign
+
+
+def _group_lines(words: list[dict], y_tolerance: float) -> list[list[dict]]:
+    """Agrupa palavras em linhas visuais pela coordenada 'top'."""
+    lines: list[list[dict]] = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and abs(word["top"] - lines[-1][0]["top"]) <= y_tolerance:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w["x0"]) for line in lines]
+
+
+def _merge_currency_tokens(line: list[dict]) -> list[dict]:
+    """Junta 'R$' (e um '-' solto) ao número seguinte: ['-', 'R$', '10,00'] -> '-R$10,00'."""
+    merged: list[dict] = []
+    for word in line:
+        if merged and merged[-1]["text"] in ("R$", "-R$", "-", "+") and re.match(r'^[-\d(]', word["text"]):
+            prev = merged.pop()
+            word = {**word, "text": prev["text"] + word["text"], "x0": prev["x0"]}
+        elif merged and merged[-1]["text"] == "-" and word["text"] == "R$":
+            prev = merged.pop()
+            word = {**word, "text": "-R$", "x0": prev["x0"]}
+        merged.append(word)
+    return merged
+
+
+def _detect_header(lines: list[list[dict]]) -> dict[str, float] | None:
+    """Procura a linha de cabeçalho e devolve {papel: centro x da coluna}."""
+    for line in lines:
+        columns: dict[str, float] = {}
+        for word in line:
+            role = HEADER_WORDS.get(word["text"].lower().strip(":"))
+            if role and role not in columns:
+                columns[role] = (word["x0"] + word["x1"]) / 2
+        amount_roles = [r for r in columns if r in AMOUNT_ROLES]
+        if ROLE_DATE in columns and amount_roles and len(columns) >= 3:
+            return columns
+    return None
+
+
+def _split_date(line: list[dict]) -> tuple[str | None, list[dict]]:
+    """Separa a data do início da linha (pode ocupar até 5 palavras: '12 de out de 2025')."""
+    for n in range(min(5, len(line)), 0, -1):
+        candidate = " ".join(w["text"] for w in line[:n])
+        match = DATE_RE.match(candidate)
+        if match and match.end() == len(candidate):
+            return candidate, line[n:]
+    return None, line
+
+
+def _nearest_role(x_center: float, columns: dict[str, float]) -> str:
+    amount_columns = {role: x for role, x in columns.items() if role in AMOUNT_ROLES}
+    return min(amount_columns, key=lambda role: abs(amount_columns[role] - x_center))
+
+
+def extract_page_rows(page: pdfplumber.page.Page, page_number: int, layout: BankLayout,
+                      columns: dict[str, float] | None = None) -> tuple[list[TransactionRow], dict[str, float] | None]:
+    """Extrai as linhas de transação de uma página.
+
+    'columns' é o cabeçalho detectado em páginas anteriores (tabelas que continuam
+    sem repetir o cabeçalho); o cabeçalho vigente é devolvido junto com as linhas.
+    """
+    words = page.extract_words(x_tolerance=1.5, y_tolerance=layout.y_tolerance)
+    lines = [_merge_currency_tokens(line) for line in _group_lines(words, layout.y_tolerance)]
+    columns = _detect_header(lines) or columns
+
+    rows: list[TransactionRow] = []
+    pending: dict | None = None  # data + descrição aguardando o valor na linha seguinte
+    last_date: str | None = None
+    for line in lines:
+        text_lower = " ".join(w["text"] for w in line).lower()
+        if _keyword_pattern(layout.skip_keywords).search(text_lower):
+            pending = None
+            continue
+        if columns and sum(1 for w in line if HEADER_WORDS.get(w["text"].lower().strip(":"))) >= 3:
+            continue  # a própria linha de cabeçalho
+
+        date, rest = _split_date(line)
+        amounts = [(w, parse_amount(w["text"])) for w in rest]
+        amounts = [(w, parsed) for w, parsed in amounts if parsed is not None]
+        amount_words = {id(w) for w, _ in amounts}
+        description = " ".join(w["text"] for w in rest if id(w) not in amount_words).strip()
+
+        if not amounts:
+            if date and description:
+                pending = {"data": date, "descricao": description}
+                last_date = date
+            elif pending and description and not date:
+                pending["descricao"] += " " + description  # descrição quebrada em duas linhas
+            continue
+
+        if not date and not description and pending and layout.value_on_next_line:
+            date, description = pending["data"], pending["descricao"]
+        elif not date and layout.inherit_date and last_date and description:
+            date = last_date
+        pending = None
+        if not date or not description:
+            continue
+        last_date = date
+
+        value, sign, balance, kind = None, 1, None, None
+        for word, (amount, amount_sign) in amounts:
+            role = _nearest_role((word["x0"] + word["x1"]) / 2, columns) if columns else None
+            if role == ROLE_BALANCE:
+                balance = amount * amount_sign
+            elif value is None:
+                value, sign = amount, amount_sign
+                kind = {ROLE_CREDIT: "receita", ROLE_DEBIT: "despesa"}.get(role)
+            elif not columns and layout.trailing_balance:
+                balance = amount * amount_sign
+        if value is None:
+            continue
+        if kind is None:
+            if layout.positive_is_expense:
+                kind = "receita" if sign < 0 else "despesa"
+            else:
+                kind = "despesa" if sign < 0 else "receita"
+        rows.append(TransactionRow(page=page_number, data=date, descricao=description,
+                                   valor=value, tipo=kind, saldo=balance))
+    return rows, columns
+
+
+def page_text(page, page_index: int, session=None) -> str:
+    """page.extract_text() da página (base 0), reaproveitado da sessão do documento se houver."""
+    if session is None:
+        return page.extract_text() or ""
+    return session.page_artifact(ARTIFACT_TEXT, page_index, lambda: page.extract_text() or "")
+
+
+def extract_rows(source: PDFSource, layout: BankLayout | str | None = None) -> tuple[list[TransactionRow], BankLayout]:
+    """Extrai as linhas estruturadas de todas as páginas (caminho ou bytes), detectando o layout se preciso."""
+    session = session_for(source)
+    with use_pdfplumber(source) as pdf:
+        if isinstance(layout, str):
+            layout = LAYOUTS[layout]
+        with page_lock(pdf):
+            page_count = len(pdf.pages)
+            if layout is None:
+                layout = detect_layout(page_text(pdf.pages[0], 0, session) if page_count else "")
+        rows: list[TransactionRow] = []
+        columns = None
+        for i in range(page_count):
+            with page_lock(pdf):
+                page_rows, columns = extract_page_rows(pdf.pages[i], i + 1, layout, columns)
+            rows.extend(page_rows)
+    return rows, layout
+
+
+def format_rows(rows: list[TransactionRow], layout: BankLayout) -> str:
+    """Lista compacta (uma transação por linha) para o agente ou um formatador."""
+    header = f"# layout={layout.name} linhas={len(rows)} colunas=pagina|data|descricao|valor|tipo"
+    return "\n".join([header] + [row.to_compact() for row in rows])
@@ -0,0 +1,241 @@
+"""Condensação do texto extraído antes de ir para o contexto do agente.
+
+A saída das ferramentas (principalmente o "--- DADOS (SEM FILTRO) ---" com
+layout=True) traz longas sequências de espaços de alinhamento e os mesmos
+cabeçalhos e rodapés em todas as páginas. Aqui, página a página:
+  - espaços de layout viram no máximo dois (ainda separam as colunas);
+  - linhas de cabeçalho/rodapé (primeiras e últimas linhas da página) que se
+    repetem na maioria das páginas ficam só na primeira ocorrência; números que
+    mudam de página para página ("página 3 de 10") não impedem a repetição;
+  - fora do cabeçalho/rodapé nada é deduplicado, e linhas com data ou valor, ou
+    vizinhas de uma (a descrição de um lançamento em várias linhas: data /
+    "PIX ENVIADO" / nome / valor), nunca são removidas por repetição;
+  - com um orçamento de tokens (desligado por padrão: o crew completo não tem
+    como pedir o resto do documento), saem primeiro as linhas que não são nem
+    vizinhas de lançamento e, por fim, as últimas páginas, com um aviso de que
+    a extração ficou incompleta. Documentos longos vão pelo modo em partes.
+Os tokens são contados com o tiktoken (encoding do modelo) e, se ele não
+estiver disponível, por uma estimativa de ~4 caracteres por token.
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
+
+from quartavia_ocr import tracing
+
+logger = logging.getLogger(__name__)
+
+PAGE_MARKER_RE = re.compile(r"^\s*--- .*P[ÁA]GINA \d+.* ---\s*$")
+_LAYOUT_SPACES_RE = re.compile(r"[ \t ]{3,}")
+_DATA_LINE_RE = re.compile(r"\d[\d.]*,\d{2}\b|\b\d{1,2}/\d{1,2}\b|\b\d{1,2} (?:de )?[a-zç]{3}", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"\d+")
+_METHOD_PREFIX = "Método:"  # "Método: Texto Nativo/OCR" de cada página fica: diz de onde veio o texto
+
+
+@dataclass
+class CondenseSettings:
+    """Parâmetros da condensação (variáveis QUARTAVIA_CONDENSE_* / QUARTAVIA_TOKEN_BUDGET).
+
+    token_budget: máximo de tokens do texto entregue ao agente; 0 (padrão) desliga o corte.
+    edge_lines: quantas linhas do início e do fim de cada página são candidatas a cabeçalho/rodapé.
+    repeat_ratio: fração das páginas em que a linha precisa aparecer para contar como repetida.
+    """
+    enabled: bool = True
+    token_budget: int = 0
+    edge_lines: int = 4
+    repeat_ratio: float = 0.5
+    encoding: str = "o200k_base"
+
+    @classmethod
+    def from_env(cls) -> "CondenseSettings":
+        return cls(
+            enabled=os.getenv("QUARTAVIA_CONDENSE", "1") not in ("0", "false", "False"),
+            token_budget=int(os.getenv("QUARTAVIA_TOKEN_BUDGET", "0")),
+            edge_lines=int(os.getenv("QUARTAVIA_CONDENSE_EDGE_LINES", "4")),
+            repeat_ratio=float(os.getenv("QUARTAVIA_CONDENSE_REPEAT_RATIO", "0.5")),
+            encoding=os.getenv("QUARTAVIA_TOKEN_ENCODING", "o200k_base"),
+        )
+
+
+@dataclass
+class CondensedText:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    counter: str  # 'tiktoken:<encoding>' ou 'estimativa'
+    lines_before: int = 0
+    lines_after: int = 0
+    truncated_pages: int = 0
+
+    def report(self) -> str:
+        saved = 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+        report = (f"{self.tokens_before} -> {self.tokens_after} tokens ({saved:.0%} a menos, {self.counter}), "
+                  f"{self.lines_before} -> {self.lines_after} linhas")
+        if self.truncated_pages:
+            report += f", {self.truncated_pages} página(s) cortada(s) pelo orçamento"
+        return report
+
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=4)
+def get_token_counter(encoding: str = "o200k_base") -> tuple[Callable[[str], int], str]:
+    """(função que conta tokens, nome do contador). Cai na estimativa se o tiktoken não carregar."""
+    try:
+        import tiktoken
+
+        tokenizer = tiktoken.get_encoding(encoding)
+        tokenizer.encode("teste")
+    except Exception as e:  # sem o pacote ou sem o arquivo do encoding (ambiente offline)
+        logger.info("tiktoken indisponível (%s); usando estimativa de tokens por caracteres.", e)
+        return _estimate_tokens, "estimativa"
+    return (lambda text: len(tokenizer.encode(text, disallowed_special=()))), f"tiktoken:{encoding}"
+
+
+def is_data_line(line: str) -> bool:
+    """Linha com data ou valor: candidata a lançamento, nunca removida por repetição."""
+    return bool(_DATA_LINE_RE.search(line))
+
+
+def _near_data(page: list[str]) -> set[int]:
+    """Índices das linhas com data/valor e das suas vizinhas (ignorando linhas em branco)."""
+    content = [i for i, line in enumerate(page) if line and not PAGE_MARKER_RE.match(line)]
+    near: set[int] = set()
+    for pos, i in enumerate(content):
+        if is_data_line(page[i]):
+            near.update(content[max(0, pos - 1):pos + 2])
+    return near
+
+
+def collapse_whitespace(line: str) -> str:
+    return _LAYOUT_SPACES_RE.sub("  ", line.strip())
+
+
+def split_pages(text: str) -> list[list[str]]:
+    """Divide nos marcadores '--- ... PÁGINA n ... ---'; o marcador fica como primeira linha da página.
+
+    O que vem antes do primeiro marcador (cabeçalho da ferramenta) é uma "página" própria.
+    """
+    pages: list[list[str]] = [[]]
+    for line in text.split("\n"):
+        if PAGE_MARKER_RE.match(line):
+            pages.append([line.strip()])
+        else:
+            pages[-1].append(line)
+    return pages if pages[0] else pages[1:]
+
+
+def _repeated_edge_lines(pages: list[list[str]], settings: CondenseSettings) -> set[str]:
+    """Chaves das linhas de cabeçalho/rodapé presentes em pelo menos repeat_ratio das páginas."""
+    content_pages = [[line for line in page if line and not PAGE_MARKER_RE.match(line)] for page in pages]
+    content_pages = [page for page in content_pages if page]
+    if len(content_pages) < 2:
+        return set()
+    counts: dict[str, int] = {}
+    for page in content_pages:
+        n = settings.edge_lines
+        edges = page[:n] + page[-n:] if len(page) > 2 * n else page
+        for key in {_edge_key(line) for line in edges}:
+            counts[key] = counts.get(key, 0) + 1
+    threshold = max(2, settings.repeat_ratio * len(content_pages))
+    return {key for key, count in counts.items() if count >= threshold}
+
+
+def _edge_key(line: str) -> str:
+    # Números de página/datas de emissão mudam entre páginas; valores de lançamento não são mascarados
+    return line if is_data_line(line) and "," in line else _DIGITS_RE.sub("#", line)
+
+
+def _join(pages: list[list[str]]) -> str:
+    return "\n".join(line for page in pages for line in page).strip("\n")
+
+
+def page_number(marker: str) -> int | None:
+    """Número da página de um marcador '--- ... PÁGINA n ... ---'."""
+    match = re.search(r"P[ÁA]GINA (\d+)", marker)
+    return int(match.group(1)) if match else None
+
+
+def condense(text: str, settings: CondenseSettings | None = None,
+             count_tokens: Callable[[str], int] | None = None) -> CondensedText:
+    """Condensa a saída de uma ferramenta de extração dentro do orçamento de tokens."""
+    settings = settings or CondenseSettings()
+    counter_name = "personalizado"
+    if count_tokens is None:
+        count_tokens, counter_name = get_token_counter(settings.encoding)
+
+    with tracing.span("condense") as span:
+        tokens_before = count_tokens(text)
+        pages = [[collapse_whitespace(line) for line in page] for page in split_pages(text)]
+        lines_before = sum(1 for line in text.split("\n") if line.strip())
+
+        repeated = _repeated_edge_lines(pages, settings)
+        seen_edges: set[str] = set()
+        condensed_pages = []
+        for page in pages:
+            near = _near_data(page)
+            kept = []
+            for i, line in enumerate(page):
+                if not line:
+                    if kept and kept[-1]:
+                        kept.append("")  # no máximo uma linha em branco seguida
+                    continue
+                if PAGE_MARKER_RE.match(line) or line.startswith(_METHOD_PREFIX):
+                    kept.append(line)
+                    continue
+                key = _edge_key(line)
+                if key in repeated and i not in near:
+                    if key in seen_edges:
+                        continue
+                    seen_edges.add(key)
+                kept.append(line)
+            condensed_pages.append(kept)
+
+        result = _join(condensed_pages)
+        tokens_after = count_tokens(result)
+        truncated = 0
+        if settings.token_budget and tokens_after > settings.token_budget:
+            # 1) só as linhas de lançamento e as vizinhas delas (mais marcadores e o cabeçalho da ferramenta)
+            essential_pages = []
+            for p, page in enumerate(condensed_pages):
+                near = _near_data(page)
+                essential_pages.append([line for i, line in enumerate(page)
+                                        if PAGE_MARKER_RE.match(line) or line.startswith(_METHOD_PREFIX)
+                                        or i in near or (p == 0 and i < 2)])
+            condensed_pages = essential_pages
+            result = _join(condensed_pages)
+            tokens_after = count_tokens(result)
+            # 2) corta páginas do fim até caber, avisando a partir de onde o texto ficou de fora
+            while tokens_after > settings.token_budget and len(condensed_pages) > 1:
+                condensed_pages.pop()
+                truncated += 1
+                last_page = next((page_number(line) for page in reversed(condensed_pages) for line in page
+                                  if PAGE_MARKER_RE.match(line)), None) or "?"
+                result = _join(condensed_pages) + (
+                    f"\n[... {truncated} página(s) após a página {last_page} omitida(s) pelo limite de "
+                    f"{settings.token_budget} tokens; a extração deste texto está incompleta ...]")
+                tokens_after = count_tokens(result)
+
+        condensed = CondensedText(result, tokens_before, tokens_after, counter_name, lines_before,
+                                  sum(1 for line in result.split("\n") if line.strip()), truncated)
+        span.set("tokens_before", tokens_before)
+        span.set("tokens_after", tokens_after)
+        span.set("truncated_pages", truncated)
+        span.add("tokens_saved", tokens_before - tokens_after)
+    if truncated:
+        logger.warning("Texto cortado pelo orçamento de tokens: %s", condensed.report())
+    else:
+        logger.info("Texto condensado: %s", condensed.report())
+    return condensed
+
+
+def condense_tool_output(result: str, settings: CondenseSettings) -> str:
+    """Aplica a condensação à saída de uma ferramenta; mensagens de erro passam intactas."""
+    if not settings.enabled or not result or result.startswith("Erro"):
+        return result
+    return condense(result, settings).text
@@ -0,0 +1,225 @@
+"""Palavras-chave globais e filtro de linhas usados pelas ferramentas de extração.
+
+Módulo leve (sem crewai/openai) para poder ser importado pelos workers do
+pool de processos da extração nativa.
+"""
+import hashlib
+import re  # Para expressões regulares na filtragem
+from bisect import bisect_right
+
+from quartavia_ocr import tracing
+
+IGNORE_KEYWORDS_GLOBAL = [
+    'total', 'data', 'movimentação', 'beneficiário', 'valor', 'limite de crédito', 
+    'pagamento mínimo', 'encargos', 'fale com a gente', 'ouvidoria', 'sac', 
+    'vencimento', 'saldo por transação', 'agência / cedente', 'n° documento', 
+    'resumo da fatura', 'despesas do mês', 'pontos loop', 'fatura anterior', 
+    'créditos e estornos', 'total da fatura', 'juros', 'iof', 'taxas', 
+    'lançamentos nacionais', 'compras à vista', 'outros valores', 'histórico',
+    'moeda de origem', 'cotação us$', 'aplicativo bradesco', 'situação do extrato',
+    # Novos filtros para remover informações irrelevantes
+    'pagamento via', 'qr code', 'boleto', 'escaneie', 'autenticação mecânica',
+    'ficha de compensação', 'força para pagar', 'parcelamento', 'parcela',
+    'próximo agendamento', 'simulação', 'super app', 'fatura atual',
+    'descritivo detalhado', 'pontos em', 'pontos a receber', 'débito automático',
+    'termos e condições', 'loop', 'elegíveis para pontuação', 'creditados',
+    'clientes inter', 'pagamento integral', 'dias úteis', 'olá', 'sua fatura chegou',
+    'caso o pagamento', 'prazo para reconhecimento', 'liberação do limite',
+    'faça o pagamento', 'limite será liberado', 'precisa de uma força',
+    'confira as opções', 'disponíveis pra você', 'caso opte pelo',
+    'importante saber', 'você pode acessar', 'essa é a soma', 'suas despesas',
+    'durante esse mês', 'mês passado', 'consulte os termos', 'após realizar',
+    'rotativo'
+]
+KEEP_KEYWORDS_GLOBAL = [
+    'saldo do dia', 'pix enviado', 'pix recebido', 'deposito', 'saque', 'ted',
+    'doc', 'transferencia', 'resgate', 'aplicacao', 'investimento', 'cartao',
+    'compra', 'posto', 'drogaria', 'supermercado', 'loja', 'pagamento on line',
+    'debito automatico', 'tarifa', 'anuidade', 'iof', 'saldo anterior',
+    'saldo atual', 'extrato', 'conta corrente', 'poupanca'
+]
+# Operações e estabelecimentos que caracterizam uma linha de transação
+TRANSACTION_OP_KEYWORDS = [
+    'pix enviado', 'pix recebido', 'deposito', 'saque', 'ted', 'doc',
+    'transferencia', 'resgate', 'aplicacao'
+]
+MERCHANT_KEYWORDS = ['posto', 'drogaria', 'supermercado', 'loja', 'shopping', 'mercado']
+
+# Rótulos atribuídos pelo LineClassifier
+LABEL_EMPTY = "vazia"            # vazia ou com menos de 3 caracteres
+LABEL_NOISE = "ruido"            # código de barras / cartão mascarado
+LABEL_TRANSACTION = "transacao"  # transação sem palavra a ignorar
+LABEL_FORCE_KEEP = "forcada"     # contém palavra-chave de KEEP
+LABEL_IGNORED = "ignorada"       # transação, mas com palavra-chave de IGNORE
+LABEL_IRRELEVANT = "irrelevante" # nenhum indício de transação
+KEPT_LABELS = frozenset({LABEL_TRANSACTION, LABEL_FORCE_KEEP})
+
+
+def keyword_trie_pattern(keywords: list[str]) -> str:
+    """Compila uma lista de palavras-chave em uma regex em forma de trie.
+
+    Só interessa saber SE alguma palavra ocorre, então palavras que contêm
+    outra da lista são descartadas e cada ramo termina na primeira palavra
+    completa. O motor do 're' testa um único caractere por ramo em cada posição.
+    """
+    words = sorted(set(keywords), key=len)
+    minimal = []
+    for word in words:
+        if not any(shorter in word for shorter in minimal):
+            minimal.append(word)
+
+    trie: dict = {}
+    for word in minimal:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        if "" in node:
+            return ""
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class LineClassifier:
+    """Classificador pré-compilado que rotula todas as linhas de uma página de uma vez.
+
+    Equivale a legacy_clean_and_filter_lines, mas em vez de ~120 buscas por
+    linha roda regexes em forma de trie sobre o texto inteiro da página e mapeia
+    as ocorrências de volta para as linhas. As linhas recebidas não devem conter
+    '\n' (são o resultado de text.split('\n')).
+    """
+
+    def __init__(
+        self,
+        ignore_keywords: list[str] = IGNORE_KEYWORDS_GLOBAL,
+        keep_keywords: list[str] = KEEP_KEYWORDS_GLOBAL,
+        op_keywords: list[str] = TRANSACTION_OP_KEYWORDS,
+        merchant_keywords: list[str] = MERCHANT_KEYWORDS,
+    ):
+        # Nenhum padrão varrido no texto inteiro pode atravessar '\n' ('\s' vira
+        # [^\S\n]), assim cada ocorrência fica restrita a uma única linha.
+        self._transaction_re = re.compile(keyword_trie_pattern(op_keywords + merchant_keywords + ['saldo']))
+        self._value_re = re.compile(r'r\$[^\S\n]*\d+[.,]\d{2}')
+        self._keep_re = re.compile(keyword_trie_pattern(keep_keywords))
+        # Padrões caros (ou só relevantes para poucas linhas) rodam por linha candidata
+        self._ignore_re = re.compile(keyword_trie_pattern(ignore_keywords))
+        self._dated_value_re = re.compile(r'\d{2}.*de.*\d{4}.*r\$')
+        self._noise_re = re.compile(r'[\d\s\.\*]{21,}|\d{4}\*+\d{4}')
+
+    @staticmethod
+    def _mark_lines(pattern: re.Pattern, text: str, line_starts: list[int]) -> set[int]:
+        """Índices das linhas com pelo menos uma ocorrência do padrão."""
+        hits = set()
+        for match in pattern.finditer(text):
+            hits.add(bisect_right(line_starts, match.start()) - 1)
+        return hits
+
+    def classify_lines(self, text_lines: list[str]) -> list[tuple[str, str]]:
+        """Rotula cada linha, devolvendo (linha sem espaços nas pontas, rótulo)."""
+        stripped = [line.strip() for line in text_lines]
+        lowered = [line.lower() for line in stripped]
+        text = "\n".join(lowered)
+
+        line_starts = []
+        offset = 0
+        for line in lowered:
+            line_starts.append(offset)
+            offset += len(line) + 1
+
+        transaction = self._mark_lines(self._transaction_re, text, line_starts)
+        transaction |= self._mark_lines(self._value_re, text, line_starts)
+        keep = self._mark_lines(self._keep_re, text, line_starts)
+
+        labels = []
+        for i, line in enumerate(stripped):
+            if len(line) < 3:
+                label = LABEL_EMPTY
+            elif (line[0].isdigit() or line[0] in ".*") and self._noise_re.fullmatch(line):
+                label = LABEL_NOISE
+            elif i in keep:
+                label = LABEL_FORCE_KEEP
+            elif i in transaction or ("r$" in lowered[i] and self._dated_value_re.search(lowered[i])):
+                label = LABEL_IGNORED if self._ignore_re.search(lowered[i]) else LABEL_TRANSACTION
+            else:
+                label = LABEL_IRRELEVANT
+            labels.append((line, label))
+        return labels
+
+    def filter_lines(self, text_lines: list[str]) -> list[str]:
+        """Linhas mantidas (sem espaços nas pontas), na ordem original."""
+        return [line for line, label in self.classify_lines(text_lines) if label in KEPT_LABELS]
+
+    def filter_text(self, text: str) -> str:
+        """Filtra o texto de uma página inteira de uma vez."""
+        return "\n".join(self.filter_lines(text.split("\n")))
+
+
+DEFAULT_CLASSIFIER = LineClassifier()
+
+# Identifica a versão das regras de filtragem (usada na chave do cache de extração):
+# muda sozinha quando as listas de palavras-chave mudam; incremente FILTER_RULES_VERSION
+# ao alterar a lógica do classificador.
+FILTER_RULES_VERSION = "2"
+FILTER_VERSION = FILTER_RULES_VERSION + "-" + hashlib.sha256(
+    repr((IGNORE_KEYWORDS_GLOBAL, KEEP_KEYWORDS_GLOBAL, TRANSACTION_OP_KEYWORDS, MERCHANT_KEYWORDS)).encode("utf-8")
+).hexdigest()[:12]
+
+
+def clean_and_filter_lines(text_lines: list[str]) -> str:
+    """Filtra linhas para manter apenas transações e informações financeiras relevantes"""
+    with tracing.span("filter", lines_in=len(text_lines)) as span:
+        kept = DEFAULT_CLASSIFIER.filter_lines(text_lines)
+        span.set("lines_out", len(kept))
+    return "\n".join(kept)
+
+
+def legacy_clean_and_filter_lines(text_lines: list[str]) -> str:
+    """Implementação original (linha a linha), mantida como referência de equivalência e benchmark"""
+    filtered_data = []
+    
+    for line in text_lines:
+        line_strip = line.strip()
+        if not line_strip or len(line_strip) < 3:
+            continue
+            
+        line_lower = line_strip.lower()
+        
+        # Verifica se é uma linha de transação ou informação relevante
+        is_transaction = (
+            # Linhas com datas e valores (padrão de transação)
+            bool(re.search(r'\d{2}.*de.*\d{4}.*r\$', line_lower)) or
+            # Linhas com valores monetários significativos
+            bool(re.search(r'r\$\s*\d+[.,]\d{2}', line_lower)) or
+            # Linhas com operações financeiras específicas
+            any(op in line_lower for op in ['pix enviado', 'pix recebido', 'deposito', 'saque', 'ted', 'doc', 'transferencia', 'resgate', 'aplicacao']) or
+            # Linhas com estabelecimentos comerciais
+            bool(re.search(r'(posto|drogaria|supermercado|loja|shopping|mercado)', line_lower)) or
+            # Linhas com saldo
+            'saldo' in line_lower
+        )
+        
+        # Verifica se deve ser ignorada (palavras-chave irrelevantes)
+        should_ignore = any(keyword in line_lower for keyword in IGNORE_KEYWORDS_GLOBAL)
+        
+        # Força manter se for palavra-chave importante
+        force_keep = any(keyword in line_lower for keyword in KEEP_KEYWORDS_GLOBAL)
+        
+        # Ignora linhas com apenas códigos de barras ou hashes
+        if re.match(r'^[\d\s\.\*]+$', line_strip) and len(line_strip) > 20:
+            continue
+            
+        # Ignora linhas com apenas asteriscos e números (número de cartão mascarado sozinho)
+        if re.match(r'^\d{4}\*+\d{4}$', line_strip):
+            continue
+            
+        # Adiciona à lista se for transação relevante e não deve ser ignorada
+        if (is_transaction or force_keep) and not should_ignore:
+            filtered_data.append(line_strip)
+        elif force_keep:  # Força manter mesmo se houver palavras para ignorar
+            filtered_data.append(line_strip)
+            
+    return "\n".join(filtered_data)
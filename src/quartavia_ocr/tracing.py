@@ -0,0 +1,278 @@
+"""Spans cronometrados e contadores por estágio (download, abertura, extração por
+página, filtro, renderização, chamada de OCR, kickoff do crew).
+
+Desligado por padrão: span() devolve um objeto vazio compartilhado e count() só
+testa uma variável, então a instrumentação quase não custa nada. Para ligar:
+    QUARTAVIA_TRACING=jsonl  grava um JSON por span em QUARTAVIA_TRACE_FILE
+                             (padrão quartavia_trace.jsonl) e os totais dos
+                             contadores ao final do processo;
+    QUARTAVIA_TRACING=otel   exporta pelo OpenTelemetry (tracer e meter
+                             'quartavia_ocr'); provedores e exportadores são os
+                             configurados pelo ambiente, p.ex. com
+                             `opentelemetry-instrument quartavia_ocr ...`.
+Ou chame configure() com um sink (MemorySink nos testes).
+
+Os atributos registrados são métricas (páginas, caracteres, bytes, tentativas,
+tempos), nunca o texto do extrato.
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("quartavia_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """Span ativo: acumula atributos e contadores até o fim do bloco."""
+
+    def __init__(self, sink: "Sink", name: str, attributes: dict[str, Any]):
+        self.sink = sink
+        self.name = name
+        self.attributes = attributes
+        self.counters: dict[str, float] = {}
+        self.span_id = f"{os.getpid()}-{next(_span_ids)}"
+        self.parent: Span | None = None
+        self.status = "ok"
+        self.error: str | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, counter: str, value: float = 1) -> None:
+        """Soma num contador do span e no total do processo."""
+        self.counters[counter] = self.counters.get(counter, 0) + value
+        self.sink.count(counter, value, {"span": self.name})
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self)
+        self._handle = self.sink.start(self)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.duration = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.status, self.error = "error", f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.sink.end(self, self._handle)
+
+
+class _NoopSpan:
+    """Usado com o tracing desligado: não mede nem guarda nada."""
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, counter: str, value: float = 1) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Sink:
+    """Destino dos spans e contadores."""
+
+    def __init__(self):
+        self.totals: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def start(self, span: Span) -> Any:
+        return None
+
+    def end(self, span: Span, handle: Any) -> None:
+        pass
+
+    def count(self, name: str, value: float, attributes: dict[str, Any]) -> None:
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0) + value
+
+    def flush(self) -> None:
+        pass
+
+
+def span_record(span: Span) -> dict:
+    record = {
+        "type": "span",
+        "name": span.name,
+        "span_id": span.span_id,
+        "parent_id": span.parent.span_id if span.parent else None,
+        "start": round(span.start_time, 6),
+        "duration_ms": round(span.duration * 1000, 3),
+        "status": span.status,
+        "attributes": span.attributes,
+    }
+    if span.counters:
+        record["counters"] = span.counters
+    if span.error:
+        record["error"] = span.error
+    return record
+
+
+class MemorySink(Sink):
+    """Guarda os spans encerrados em memória (testes e benchmarks)."""
+
+    def __init__(self):
+        super().__init__()
+        self.spans: list[dict] = []
+
+    def end(self, span: Span, handle: Any) -> None:
+        with self._lock:
+            self.spans.append(span_record(span))
+
+    def named(self, name: str) -> list[dict]:
+        return [s for s in self.spans if s["name"] == name]
+
+
+class JSONLSink(Sink):
+    """Um JSON por linha: cada span ao terminar e os totais dos contadores no flush."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def end(self, span: Span, handle: Any) -> None:
+        line = json.dumps(span_record(span), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self.totals:
+                self._file.write(json.dumps({"type": "counters", "pid": os.getpid(), "time": round(time.time(), 6),
+                                             "totals": self.totals}) + "\n")
+                self.totals = {}
+            self._file.flush()
+
+
+class OpenTelemetrySink(Sink):
+    """Encaminha spans e contadores para a API do OpenTelemetry."""
+
+    def __init__(self):
+        super().__init__()
+        from opentelemetry import context, metrics, trace
+
+        self._context = context
+        self._trace = trace
+        self.tracer = trace.get_tracer("quartavia_ocr")
+        self.meter = metrics.get_meter("quartavia_ocr")
+        self._counters: dict[str, Any] = {}
+
+    def start(self, span: Span) -> Any:
+        otel_span = self.tracer.start_span(span.name, attributes=_otel_attributes(span.attributes))
+        token = self._context.attach(self._trace.set_span_in_context(otel_span))
+        return otel_span, token
+
+    def end(self, span: Span, handle: Any) -> None:
+        otel_span, token = handle
+        otel_span.set_attributes(_otel_attributes({**span.attributes, **span.counters}))
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end()
+        self._context.detach(token)
+
+    def count(self, name: str, value: float, attributes: dict[str, Any]) -> None:
+        super().count(name, value, attributes)
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = self.meter.create_counter(f"quartavia.{name}")
+        counter.add(value, _otel_attributes(attributes))
+
+
+def _otel_attributes(attributes: dict[str, Any]) -> dict[str, Any]:
+    # O OpenTelemetry só aceita str/bool/int/float (e sequências deles)
+    return {k: v if isinstance(v, (str, bool, int, float)) else str(v) for k, v in attributes.items() if v is not None}
+
+
+_sink: Sink | None = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure(sink: Sink | str | None = None, path: str | None = None) -> Sink | None:
+    """Troca o destino: um Sink, 'jsonl', 'otel' ou None/'' para desligar. Devolve o sink ativo."""
+    global _sink, _configured
+    if isinstance(sink, str):
+        kind = sink.strip().lower()
+        if kind == "jsonl":
+            sink = JSONLSink(path or os.getenv("QUARTAVIA_TRACE_FILE", "quartavia_trace.jsonl"))
+        elif kind in ("otel", "opentelemetry"):
+            sink = OpenTelemetrySink()
+        elif kind in ("", "0", "off", "none"):
+            sink = None
+        else:
+            raise ValueError(f"QUARTAVIA_TRACING desconhecido: {sink} (use jsonl, otel ou off)")
+    with _configure_lock:
+        if _sink is not None:
+            _sink.flush()
+        _sink, _configured = sink, True
+    return _sink
+
+
+def get_sink() -> Sink | None:
+    if not _configured:
+        configure(os.getenv("QUARTAVIA_TRACING", ""))
+    return _sink
+
+
+def span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """Bloco cronometrado: `with span("render_page", page=3) as s: ...; s.set("bytes", n)`."""
+    sink = _sink if _configured else get_sink()
+    if sink is None:
+        return NOOP_SPAN
+    return Span(sink, name, attributes)
+
+
+def count(name: str, value: float = 1, **attributes: Any) -> None:
+    """Soma num contador (do span atual, se houver, e do processo)."""
+    sink = _sink if _configured else get_sink()
+    if sink is None:
+        return
+    current = _current_span.get()
+    if current is not None and current.sink is sink:
+        current.add(name, value)
+    else:
+        sink.count(name, value, attributes)
+
+
+def load_env() -> None:
+    """Carrega o .env nas variáveis de ambiente (sem sobrescrever as já definidas).
+
+    Importar os módulos do pacote não lê o .env: as CLIs, o serviço e a montagem do
+    crew chamam isto antes de ler qualquer configuração.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def configure_logging() -> None:
+    """Nível dos logs das CLIs e do serviço por QUARTAVIA_LOG_LEVEL (padrão WARNING; DEBUG mostra o detalhe por página)."""
+    logging.basicConfig(level=os.getenv("QUARTAVIA_LOG_LEVEL", "WARNING").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def flush() -> None:
+    if _sink is not None:
+        _sink.flush()
+
+
+atexit.register(flush)
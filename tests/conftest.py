@@ -0,0 +1,38 @@
+import fitz
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_extraction_cache(tmp_path, monkeypatch):
+    """Cada teste usa um cache de extração próprio, sem tocar em ~/.cache."""
+    monkeypatch.setenv("QUARTAVIA_CACHE_DIR", str(tmp_path / "extraction_cache"))
+
+
+@pytest.fixture(autouse=True)
+def isolated_category_memo(tmp_path, monkeypatch):
+    """O memo de categorias aprendido nos testes não vai para ~/.cache."""
+    monkeypatch.setenv("QUARTAVIA_CATEGORY_MEMO", str(tmp_path / "category_memo.json"))
+
+
+@pytest.fixture
+def make_pdf():
+    """Fábrica de PDFs de teste: make_pdf(path, pages=[[(x, y, texto), ...], ...]).
+
+    Uma página também pode ser só um texto (escrito em (72, 72)) ou vazia ([]: sem
+    camada de texto). Devolve o caminho como str, ou os bytes do PDF se path for None.
+    """
+    def make(path, pages, fontsize=9):
+        doc = fitz.open()
+        for items in pages:
+            page = doc.new_page()
+            for x, y, text in [(72, 72, items)] if isinstance(items, str) else items:
+                page.insert_text((x, y), text, fontsize=fontsize)
+        try:
+            if path is None:
+                return doc.tobytes()
+            doc.save(str(path))
+            return str(path)
+        finally:
+            doc.close()
+
+    return make
@@ -0,0 +1,61 @@
+import json
+
+from quartavia_ocr.batch import iter_sources, main, run_batch
+from quartavia_ocr.models import ExtractionResult
+
+CALLS = []
+
+
+def fake_processor(source):
+    CALLS.append(source)
+    if "quebrado" in source:
+        raise RuntimeError("PDF ilegível")
+    return ExtractionResult.from_raw(
+        '```json\n{"success": true, "bank_name": "BTG", "document_type": "extrato", "transactions_count": 1, '
+        '"transactions": [{"data": "2025-10-01", "descricao": "PIX", "valor": 10.0}]}\n```')
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_iter_sources_from_directory_and_manifest(tmp_path):
+    (tmp_path / "docs" / "sub").mkdir(parents=True)
+    for name in ("b.pdf", "a.PDF", "sub/c.pdf", "notas.txt"):
+        (tmp_path / "docs" / name).write_bytes(b"%PDF")
+    assert [p.split("docs")[1] for p in iter_sources(str(tmp_path / "docs"))] == ["/a.PDF", "/b.pdf", "/sub/c.pdf"]
+
+    manifest = tmp_path / "manifesto.jsonl"
+    manifest.write_text('{"file_path": "https://x/1.pdf"}\n"/tmp/2.pdf"\n\n{"url": "https://x/1.pdf"}\n')
+    assert iter_sources(str(manifest)) == ["https://x/1.pdf", "/tmp/2.pdf"]
+
+
+def test_batch_writes_one_result_per_document_and_resumes(tmp_path):
+    output = str(tmp_path / "saida.jsonl")
+    sources = ["a.pdf", "quebrado.pdf", "b.pdf"]
+    CALLS.clear()
+
+    stats = run_batch(sources, output, workers=2, executor="thread", processor=fake_processor)
+    records = {r["source"]: r for r in _read(output)}
+    assert set(records) == set(sources)
+    assert records["a.pdf"]["transactions"][0]["descricao"] == "PIX"
+    assert records["quebrado.pdf"] == {**records["quebrado.pdf"], "success": False,
+                                       "error_message": "RuntimeError: PDF ilegível"}
+    assert stats["documents"] == 3 and stats["failed"] == 1 and "latency_p95" in stats
+
+    # Retomada: nada é reprocessado; com --retry-failed, só o que falhou
+    CALLS.clear()
+    assert run_batch(sources + ["c.pdf"], output, executor="thread", processor=fake_processor)["documents"] == 1
+    assert CALLS == ["c.pdf"]
+    CALLS.clear()
+    run_batch(sources, output, executor="thread", retry_failed=True, processor=fake_processor)
+    assert CALLS == ["quebrado.pdf"]
+
+
+def test_cli_skips_everything_already_checkpointed(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.pdf").write_bytes(b"%PDF")
+    output = tmp_path / "saida.jsonl"
+    output.write_text(json.dumps({"success": True, "source": str(tmp_path / "docs" / "a.pdf")}) + "\n")
+    assert main([str(tmp_path / "docs"), "-o", str(output)])["documents"] == 0
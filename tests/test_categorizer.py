@@ -0,0 +1,46 @@
+import json
+
+from quartavia_ocr.categorizer import MerchantCategorizer, load_taxonomy, normalize_description
+from quartavia_ocr.tools.custom_tool import LocalCategorizerTool
+
+
+def test_taxonomy_is_compiled_from_task_prompt():
+    taxonomy = load_taxonomy()
+    categories = {category for category, _, _ in taxonomy}
+    assert len(categories) == 10
+    assert ("COMUNICACAO", "Apps") in {(c, s) for c, s, _ in taxonomy}
+
+
+def test_normalize_description():
+    assert normalize_description("UBER *TRIP 1234 São Paulo") == "uber trip sao paulo"
+
+
+def test_keyword_index():
+    categorizer = MerchantCategorizer()
+    assert categorizer.categorize("SPOTIFY*PREMIUM") == ("COMUNICACAO", "Apps")
+    assert categorizer.categorize("LATAM AIRLINES PARC 2/10") == ("LAZER", "Viagens")
+    assert categorizer.categorize("POSTO IPIRANGA 123") == ("TRANSPORTE", "Combustível")
+    assert categorizer.categorize("COMPRA POS 4411 XPTO") is None
+
+
+def test_memo_is_learned_from_results_and_persisted(tmp_path):
+    memo_path = str(tmp_path / "memo.json")
+    categorizer = MerchantCategorizer(memo_path=memo_path)
+    result = {"transactions": [
+        {"descricao": "PADOCA DO ZE 0231", "categoria": "ALIMENTACAO", "subcategoria": "Padaria"},
+        {"descricao": "XPTO SERVICOS", "categoria": "DIVERSOS", "subcategoria": "Outros"},
+    ]}
+    learned = categorizer.learn_from_result("```json\n" + json.dumps(result) + "\n```")
+
+    assert learned == 1
+    reloaded = MerchantCategorizer(memo_path=memo_path)
+    assert reloaded.categorize("PADOCA DO ZE 9999") == ("ALIMENTACAO", "Padaria")
+    assert reloaded.categorize("XPTO SERVICOS") is None
+
+
+def test_local_categorizer_tool_marks_unknown():
+    output = LocalCategorizerTool()._run("NETFLIX.COM\nLOJA DESCONHECIDA XYZ")
+    assert output.splitlines() == [
+        "NETFLIX.COM => COMUNICACAO > Apps",
+        "LOJA DESCONHECIDA XYZ => ?",
+    ]
@@ -0,0 +1,90 @@
+import asyncio
+
+from quartavia_ocr.chunked import (
+    CONTINUATION_MARKER,
+    ChunkSettings,
+    arun_chunked,
+    merge_results,
+    split_into_chunks,
+)
+from quartavia_ocr.models import ExtractionResult, Transaction
+from quartavia_ocr.tools.text_condenser import CondenseSettings
+
+
+def _document(pages):
+    blocks = []
+    for n in range(1, pages + 1):
+        blocks.append(f"\n--- DADOS (PÁGINA {n}) ---\n")
+        blocks.append("Método: Texto Nativo\n")
+        blocks.append(f"0{n}/10/2025 MERCADO {n} 10,00\n0{n}/10/2025 UBER TRIP 15,00")
+    return "\n".join(blocks)
+
+
+def _transaction(day, descricao, valor):
+    return Transaction(data=f"2025-10-0{day}", descricao=descricao, valor=valor)
+
+
+def _result(*transactions, **kwargs):
+    return ExtractionResult(success=True, transactions_count=len(transactions), transactions=list(transactions),
+                            **kwargs)
+
+
+def test_split_into_chunks_groups_pages_and_repeats_boundary_lines():
+    chunks = split_into_chunks(_document(5), pages_per_chunk=2, overlap_lines=1)
+
+    assert [c.page_range for c in chunks] == ["páginas 1 a 2", "páginas 3 a 4", "página 5"]
+    assert chunks[0].overlap_lines == 0 and CONTINUATION_MARKER not in chunks[0].text
+    # A parte seguinte começa com o último lançamento da anterior, antes do marcador da sua primeira página
+    assert chunks[1].overlap_lines == 1
+    assert chunks[1].text.startswith(f"{CONTINUATION_MARKER}\n02/10/2025 UBER TRIP 15,00\n\n--- DADOS (PÁGINA 3) ---")
+    assert "MERCADO 5" in chunks[2].text and "MERCADO 4" not in chunks[2].text
+    assert split_into_chunks("texto sem marcadores", 2)[0].page_range == "documento inteiro"
+
+
+def test_merge_drops_only_boundary_duplicates_and_recounts():
+    uber = _transaction(2, "UBER TRIP", 15.0)
+    first = _result(_transaction(1, "MERCADO", 10.0), uber, uber, document_type="other")
+    # Repete só UMA das duas corridas da fronteira: a outra continua sendo uma transação
+    second = _result(_transaction(2, "Uber  trip", 15.0), _transaction(3, "MERCADO", 10.0),
+                     _transaction(3, "MERCADO", 10.0), bank_name="BTG", document_type="extrato")
+    third = ExtractionResult.failure("Nenhuma transação encontrada no documento")
+
+    merged = merge_results([first, second, third], overlaps=[0, 2, 1])
+
+    assert merged.success
+    assert [(t.data, t.descricao) for t in merged.transactions] == [
+        ("2025-10-01", "MERCADO"), ("2025-10-02", "UBER TRIP"), ("2025-10-02", "UBER TRIP"),
+        ("2025-10-03", "MERCADO"), ("2025-10-03", "MERCADO")]
+    assert merged.transactions_count == 5
+    assert merged.bank_name == "BTG" and merged.document_type == "extrato"
+    assert merged.error_message is None
+    # Sem sobreposição, nada é considerado duplicado
+    assert merge_results([first, second]).transactions_count == 6
+
+
+def test_chunks_run_concurrently_and_a_failed_chunk_does_not_lose_the_others():
+    class FakeExtractor:
+        condense_settings = CondenseSettings(token_budget=0)
+
+        def extract_full_text(self, file_path):
+            return _document(6)
+
+    running = {"now": 0, "max": 0}
+
+    async def processor(chunk):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if chunk.index == 1:
+            raise RuntimeError("limite de taxa")
+        first = int(chunk.page_range.split()[1])
+        return _result(*(_transaction(n, f"MERCADO {n}", 10.0) for n in range(first, first + 2)))
+
+    settings = ChunkSettings(pages_per_chunk=2, overlap_lines=0, max_concurrency=2)
+    merged = asyncio.run(arun_chunked("extrato.pdf", settings, processor, FakeExtractor()))
+
+    assert running["max"] == 2
+    assert [t.descricao for t in merged.transactions] == ["MERCADO 1", "MERCADO 2", "MERCADO 5", "MERCADO 6"]
+    assert merged.transactions_count == 4
+    assert merged.error_message == "páginas 3 a 4: RuntimeError: limite de taxa"
@@ -0,0 +1,111 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from quartavia_ocr.tools import document_fetcher
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool
+from quartavia_ocr.tools.document_fetcher import URL_LOCK_STRIPES, DocumentFetcher, FetchError
+
+
+@pytest.fixture
+def pdf_server(make_pdf):
+    """Servidor HTTP local que serve um PDF com ETag e conta os GETs completos e os 304."""
+    state = {"content": make_pdf(None, ["01/10/2025 PIX ENVIADO Fulano R$ 10,00"]), "etag": '"v1"', "full": 0, "not_modified": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == state["etag"]:
+                state["not_modified"] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            state["full"] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(state["content"])))
+            self.send_header("ETag", state["etag"])
+            self.end_headers()
+            self.wfile.write(state["content"])
+
+        def do_HEAD(self):
+            self.send_response(304 if self.headers.get("If-None-Match") == state["etag"] else 200)
+            self.send_header("ETag", state["etag"])
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = f"http://127.0.0.1:{server.server_address[1]}/extrato.pdf"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_recent_download_is_reused_from_memory(pdf_server):
+    fetcher = DocumentFetcher()
+    assert fetcher.fetch(pdf_server["url"]) == fetcher.fetch(pdf_server["url"]) == pdf_server["content"]
+    assert pdf_server["full"] == 1
+    assert fetcher.stats["memory_hits"] == 1
+
+
+def test_stats_are_exact_under_concurrent_fetches(pdf_server):
+    fetcher = DocumentFetcher()
+    # URLs diferentes quase sempre caem em locks distintos: os contadores são atualizados em paralelo
+    urls = [f"{pdf_server['url']}?v={n}" for n in range(4)]
+    for url in urls:
+        fetcher.fetch(url)
+    threads = [threading.Thread(target=lambda url=url: [fetcher.fetch(url) for _ in range(50)]) for url in urls * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetcher.stats == {"downloads": 4, "memory_hits": 400, "not_modified": 0}
+
+
+def test_url_locks_do_not_grow_with_distinct_urls(pdf_server):
+    fetcher = DocumentFetcher(max_cached_documents=2)
+    for i in range(5):
+        fetcher.fetch(f"{pdf_server['url']}?v={i}")
+    assert len(fetcher._cache) == 2
+    assert len(fetcher._url_locks) == URL_LOCK_STRIPES
+    assert fetcher._url_lock(pdf_server["url"]) is fetcher._url_lock(pdf_server["url"])
+
+
+def test_stale_download_is_revalidated_with_etag(pdf_server):
+    fetcher = DocumentFetcher(max_age_seconds=0)
+    fetcher.fetch(pdf_server["url"])
+    assert fetcher.fetch(pdf_server["url"]) == pdf_server["content"]
+    assert (pdf_server["full"], pdf_server["not_modified"]) == (1, 1)
+
+
+def test_head_revalidation_detects_a_reupload(pdf_server, make_pdf):
+    fetcher = DocumentFetcher()
+    fetcher.fetch(pdf_server["url"])
+    validators = fetcher.validators(pdf_server["url"])
+    assert validators == {"etag": '"v1"'}
+    assert fetcher.unchanged(pdf_server["url"], **validators)
+
+    pdf_server.update(content=make_pdf(None, ["outro documento"]), etag='"v2"')
+    assert not fetcher.unchanged(pdf_server["url"], **validators)
+    assert pdf_server["full"] == 1  # a revalidação não baixa o corpo
+
+
+def test_documents_over_the_limit_are_rejected(pdf_server):
+    with pytest.raises(FetchError):
+        DocumentFetcher(max_bytes=100).fetch(pdf_server["url"])
+
+
+def test_native_and_ocr_tools_share_one_download(pdf_server, monkeypatch):
+    from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+
+    monkeypatch.setenv("QUARTAVIA_CACHE_ENABLED", "0")
+    monkeypatch.setattr(document_fetcher, "_default_fetcher", DocumentFetcher())
+
+    assert "PIX ENVIADO" in NativePDFExtractorTool()._run(pdf_server["url"])
+    pages = PDFToOCRTool()._render_pages(document_fetcher.download_pdf(pdf_server["url"]))
+    assert len(pages) == 1
+    assert pdf_server["full"] == 1
@@ -0,0 +1,162 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from quartavia_ocr.fast_path import FastPathSettings, run_with_fast_path
+from quartavia_ocr.models import ExtractionResult
+from quartavia_ocr.tools import custom_tool
+from quartavia_ocr.tools.custom_tool import (
+    HybridPDFExtractorTool,
+    NativePDFExtractorTool,
+    PDFToOCRTool,
+    StructuredRowExtractorTool,
+)
+from quartavia_ocr.tools.document_session import (
+    DocumentRun,
+    current_run,
+    document_run,
+    page_lock,
+    session_for,
+    use_fitz,
+    use_pdfplumber,
+    use_run,
+)
+from quartavia_ocr.tools.page_triage import TriageSettings
+
+URL = "https://exemplo.com/extrato.pdf"
+
+
+class CountingCompletions:
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=f"01/10/2025 PIX CHAMADA {self.calls} R$ 1,00"))], usage=None)
+
+
+@pytest.fixture
+def pdf_bytes(make_pdf):
+    # Página 2 escaneada: sem camada de texto
+    return make_pdf(None, ["01/10/2025 PIX RECEBIDO FULANO R$ 250,00", []])
+
+
+def _ocr_tool(client):
+    tool = PDFToOCRTool(cache=None, scheduler=None, replay_store=None, triage_settings=TriageSettings(enabled=False))
+    tool.client, tool.model_name = client, "fake-model"
+    return tool
+
+
+def test_tools_share_bytes_handles_and_pages_within_a_run(pdf_bytes):
+    downloads = []
+    client = CountingCompletions()
+
+    def download(url):
+        downloads.append(url)
+        return pdf_bytes
+
+    with document_run(download=download) as run:
+        native = NativePDFExtractorTool(cache=None)
+        ocr = _ocr_tool(client)
+        assert "PIX RECEBIDO" in native._run(URL)
+        assert ocr._run(URL).count("PIX CHAMADA") == 2
+        # O híbrido usa o texto nativo da página 1 e o OCR da página 2, ambos já feitos na execução
+        hybrid = HybridPDFExtractorTool(cache=None, native_tool=native, ocr_tool=ocr)._run(URL)
+        assert "PIX RECEBIDO" in hybrid and "PIX CHAMADA 2" in hybrid
+
+        session = run.session(URL)
+        assert downloads == [URL] and client.calls == 2
+        assert session.stats["opens"] == 2  # um pdfplumber e um fitz para as três ferramentas
+        assert session_for(session.content) is session
+
+    assert current_run() is None
+    assert session.closed and session.content == b"" and session._fitz is None
+
+
+def test_run_is_closed_on_error_and_shared_with_the_crew(pdf_bytes, tmp_path):
+    path = tmp_path / "extrato.pdf"
+    path.write_bytes(pdf_bytes)
+    sessions = []
+
+    def crew(source):
+        sessions.append(current_run().session(source))
+        StructuredRowExtractorTool(cache=None)._run(source)
+        return ExtractionResult(success=True, transactions_count=0)
+
+    run_with_fast_path(str(path), crew, FastPathSettings())
+    session, = sessions
+    # O crew usa o PDF já aberto e o texto da página 1 já lido pelo caminho determinístico
+    assert session.stats["opens"] == 1 and session.stats["artifact_hits"] >= 1
+    assert session.closed
+
+    with pytest.raises(RuntimeError):
+        with document_run() as run:
+            session = run.session(str(path))
+            session.fitz()
+            raise RuntimeError("falha no meio da execução")
+    assert session.closed and current_run() is None
+
+
+def test_slow_download_does_not_block_the_run(pdf_bytes, tmp_path):
+    path = tmp_path / "extrato.pdf"
+    path.write_bytes(pdf_bytes)
+    release = threading.Event()
+
+    def download(url):
+        release.wait(5)
+        return pdf_bytes
+
+    run = DocumentRun(download=download)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        remote = [executor.submit(run.session, URL) for _ in range(2)]
+        # Com os dois downloads parados, o arquivo local ainda abre
+        local = run.session(str(path))
+        assert local is not None and not any(f.done() for f in remote)
+        release.set()
+        first, second = (f.result() for f in remote)
+    assert first is second is run.session(URL)
+    run.close()
+
+
+def test_handles_are_locked_per_page_and_per_handle(pdf_bytes, tmp_path, monkeypatch):
+    path = str(tmp_path / "extrato.pdf")
+    with open(path, "wb") as f:
+        f.write(pdf_bytes)
+
+    def try_lock(handle):
+        # Noutra thread da execução: o lock está livre?
+        def attempt():
+            with use_run(run):
+                lock = page_lock(handle)
+                acquired = lock.acquire(timeout=0.2)
+                if acquired:
+                    lock.release()
+                return acquired
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(attempt).result()
+
+    with document_run() as run:
+        session = run.session(path)
+        with use_fitz(path) as document, use_pdfplumber(path) as pdf:
+            with page_lock(document):
+                assert not try_lock(document)
+                assert try_lock(pdf)  # o pdfplumber não espera uma renderização do fitz
+            assert try_lock(document)
+
+        # Um gerador parado entre páginas não segura o handle
+        pages = NativePDFExtractorTool(cache=None).iter_pages(session.content)
+        next(pages)
+        assert try_lock(pdf)
+        pages.close()
+
+        # A extração paralela recebe o caminho do arquivo local, não os bytes do PDF
+        sources = []
+        monkeypatch.setattr(custom_tool, "parallel_min_pages", lambda: 1)
+        monkeypatch.setattr(custom_tool, "iter_pages_parallel",
+                            lambda source, count, workers: sources.append(source) or iter([None] * count))
+        list(NativePDFExtractorTool(cache=None, max_workers=2).iter_pages(session.content))
+        assert sources == [path]
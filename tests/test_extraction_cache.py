@@ -0,0 +1,104 @@
+import os
+import time
+
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool
+from quartavia_ocr.tools.extraction_cache import ExtractionCache, run_with_cache
+
+STATEMENT = ["01/10/2025 PIX ENVIADO Fulano R$ 10,00"]
+
+
+def test_get_set_and_counters(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    key = cache.make_key("abc", "native:1")
+    assert cache.get(key) is None
+    cache.set(key, "resultado")
+    assert cache.get(key) == "resultado"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert cache.make_key("abc", "ocr:x:1") != key
+
+
+def test_ttl_expiry(tmp_path):
+    cache = ExtractionCache(str(tmp_path), ttl_seconds=0.01)
+    key = cache.make_key("abc", "native:1")
+    cache.set(key, "resultado")
+    time.sleep(0.05)
+    assert cache.get(key) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=1500)
+    keys = [cache.make_key(str(i), "native:1") for i in range(3)]
+    cache.set(keys[0], "a" * 500)
+    cache.set(keys[1], "b" * 500)
+    old = time.time() - 100
+    os.utime(cache._entry_path(keys[0]), (old, old))
+    os.utime(cache._entry_path(keys[1]), (old - 10, old - 10))
+    cache.get(keys[0])  # volta a ser o mais recente
+    cache.set(keys[2], "c" * 500)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_url_hit_skips_download(tmp_path, make_pdf):
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    pdf_path = str(tmp_path / "origem.pdf")
+    make_pdf(pdf_path, STATEMENT)
+    downloads = []
+
+    def download(url):
+        downloads.append(url)
+        with open(pdf_path, "rb") as f:
+            return f.read()
+
+    url = "https://example.com/extrato.pdf"
+    first = run_with_cache(cache, "native:1", url, lambda source: f"extraído de {len(source)} bytes", download=download)
+    second = run_with_cache(cache, "native:1", url, lambda source: "não deveria rodar", download=download)
+    assert first == second == f"extraído de {os.path.getsize(pdf_path)} bytes"
+    assert len(downloads) == 1
+
+
+def test_reuploaded_url_is_revalidated_before_trusting_the_alias(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"), alias_ttl_seconds=0)
+    server = {"content": b"versao 1", "etag": '"v1"', "downloads": 0, "checks": 0}
+
+    def download(url):
+        server["downloads"] += 1
+        return server["content"]
+
+    def revalidate(url, validators):
+        server["checks"] += 1
+        return validators == {"etag": server["etag"]}
+
+    def run(validators):
+        return run_with_cache(cache, "native:1", "https://example.com/extrato.pdf", lambda source: source.decode(),
+                              download=download, revalidate=revalidate, validators=lambda url: validators)
+
+    assert run({"etag": '"v1"'}) == "versao 1"
+    assert run({"etag": '"v1"'}) == "versao 1" and server["downloads"] == 1  # HEAD confirmou: sem download
+    # Reenvio na mesma URL: o servidor muda o ETag e o alias antigo deixa de valer
+    server.update(content=b"versao 2", etag='"v2"')
+    assert run({"etag": '"v2"'}) == "versao 2"
+    assert server["downloads"] == 2 and server["checks"] == 2
+
+    # Sem ETag/Last-Modified o alias só vale por alias_ttl_seconds (aqui, zero)
+    server.update(content=b"versao 3", etag=None)
+    assert run({}) == "versao 3"
+    assert run({}) == "versao 3" and server["downloads"] == 4
+    assert cache.stats()["stale_aliases"] == 3
+
+
+def test_native_tool_uses_cache_for_same_content(tmp_path, make_pdf):
+    pdf_a = str(tmp_path / "a.pdf")
+    pdf_b = str(tmp_path / "b.pdf")
+    make_pdf(pdf_a, STATEMENT)
+    with open(pdf_a, "rb") as src, open(pdf_b, "wb") as dst:
+        dst.write(src.read())  # reenvio do mesmo arquivo com outro nome
+
+    tool = NativePDFExtractorTool()
+    first = tool._run(pdf_a)
+    second = NativePDFExtractorTool()._run(pdf_b)
+    assert first == second
+    assert "PIX ENVIADO" in first
+    assert tool.cache.stats()["hits"] == 1
@@ -0,0 +1,126 @@
+from quartavia_ocr.categorizer import MerchantCategorizer
+from quartavia_ocr.fast_path import (
+    PATH_CREW,
+    PATH_DETERMINISTIC,
+    REASON_INCOMPLETE_CHAIN,
+    REASON_MISMATCH,
+    REASON_NO_TOTALS,
+    REASON_UNCATEGORIZED,
+    FastPathSettings,
+    normalize_date,
+    parse_installments,
+    run_with_fast_path,
+    summarize_paths,
+    try_fast_path,
+)
+from quartavia_ocr.models import ExtractionResult
+
+CARD = [
+    (40, 50, "Banco Inter - Fatura do cartão   Vencimento 10/11/2025"),
+    (40, 80, "Data"), (150, 80, "Estabelecimento"), (450, 80, "Valor"),
+    (40, 95, "05 de out. 2025"), (150, 95, "LOJAS RENNER PARC 3/6"), (450, 95, "R$ 100,00"),
+    (40, 110, "07 de out. 2025"), (150, 110, "NETFLIX.COM"), (450, 110, "R$ 39,90"),
+    (40, 125, "08 de out. 2025"), (150, 125, "PAGAMENTO RECEBIDO"), (450, 125, "-R$ 50,00"),
+]
+
+
+def _categorizer():
+    categorizer = MerchantCategorizer(memo_path=None)
+    # Aprendidos de execuções anteriores do crew; PIX e MERCADO a taxonomia já conhece
+    categorizer.learn("LOJAS RENNER", "CUIDADO_PESSOAL", "Vestuário / Calçados / Acessórios")
+    categorizer.learn("PAGAMENTO RECEBIDO", "SERVICOS_FINANCEIROS", "Outros")
+    return categorizer
+
+
+def _outcome(source, categorizer=None):
+    return try_fast_path(source, FastPathSettings(), categorizer=categorizer or _categorizer())
+
+
+def test_installments_and_dates():
+    assert parse_installments("LOJA PARC 3/6") == (3, 6)
+    assert parse_installments("CURSO PARCELA 1 DE 12") == (1, 12)
+    assert parse_installments("SAPATOS (02/10)") == (2, 10)
+    assert parse_installments("LOJA 24/7") is None
+    assert parse_installments("UBER TRIP") is None
+    # 'dd/mm' perto da data da transação é data (vencimento, data da compra), não parcela
+    assert parse_installments("PAGTO BOLETO 05/10", "2025-10-07") is None
+    assert parse_installments("CURSO 01/12", "2025-10-07") == (1, 12)
+    assert parse_installments("SAPATOS (05/10)", "2025-10-07") == (5, 10)
+
+    assert normalize_date("05 de out. 2025", None) == "2025-10-05"
+    assert normalize_date("05/10/25", None) == "2025-10-05"
+    # Sem ano: o da data de referência do documento, ou o anterior se o mês vier depois dela
+    assert normalize_date("28/12", (2026, 1)) == "2025-12-28"
+    assert normalize_date("04 OUT", (2025, 11)) == "2025-10-04"
+    assert normalize_date("04 OUT", None) is None
+
+
+def test_card_statement_reconciled_with_invoice_total(tmp_path, make_pdf):
+    source = make_pdf(tmp_path / "fatura.pdf", [CARD + [(40, 150, "Total da fatura"), (450, 150, "R$ 89,90")]])
+    outcome = _outcome(source)
+
+    assert outcome.checks == ["total da fatura"]
+    result = outcome.result
+    assert result.extraction_path == PATH_DETERMINISTIC
+    assert result.document_type == "credit-card-statement" and result.bank_name == "Banco Inter"
+    assert result.transactions_count == 3
+    store, netflix, payment = result.transactions
+    assert (store.data, store.valor, store.tipo) == ("2025-10-05", 100.0, "despesa")
+    assert (store.parcelado, store.numero_parcelas, store.total_parcelas) == (True, 3, 6)
+    assert (netflix.categoria, netflix.subcategoria, netflix.parcelado) == ("COMUNICACAO", "Apps", False)
+    assert (payment.tipo, payment.valor) == ("receita", 50.0)
+
+
+def test_account_statement_reconciled_with_balances(tmp_path, make_pdf):
+    source = make_pdf(tmp_path / "extrato.pdf", [[
+        (40, 50, "BRADESCO - EXTRATO CONTA CORRENTE"),
+        (40, 80, "Data"), (110, 80, "Histórico"), (330, 80, "Crédito"), (410, 80, "Débito"), (490, 80, "Saldo"),
+        (40, 95, "01/10/2025"), (110, 95, "SALDO ANTERIOR"), (490, 95, "1.000,00"),
+        (40, 110, "02/10/2025"), (110, 110, "PIX RECEBIDO FULANO"), (330, 110, "250,00"), (490, 110, "1.250,00"),
+        (40, 125, "03/10/2025"), (110, 125, "COMPRA MERCADO"), (410, 125, "45,90"), (490, 125, "1.204,10"),
+        (40, 140, "03/10/2025"), (110, 140, "SALDO ATUAL"), (490, 140, "1.204,10"),
+    ]])
+    outcome = _outcome(source)
+
+    assert outcome.checks == ["saldo anterior/atual", "saldo por linha (2)"]
+    assert outcome.result.document_type == "extrato"
+    assert [t.descricao for t in outcome.result.transactions] == ["PIX RECEBIDO FULANO", "COMPRA MERCADO"]
+
+
+def test_partial_balance_chain_and_unknown_merchants_go_to_the_crew(tmp_path, make_pdf):
+    header = [(40, 50, "BRADESCO - EXTRATO CONTA CORRENTE"), (40, 80, "Data"), (110, 80, "Histórico"),
+              (330, 80, "Crédito"), (410, 80, "Débito"), (490, 80, "Saldo")]
+    # Sem saldo anterior impresso e com uma linha sem saldo: a corrente não prova que nada ficou de fora
+    partial = make_pdf(tmp_path / "parcial.pdf", [header + [
+        (40, 95, "02/10/2025"), (110, 95, "PIX RECEBIDO FULANO"), (330, 95, "250,00"), (490, 95, "1.250,00"),
+        (40, 110, "03/10/2025"), (110, 110, "COMPRA MERCADO"), (410, 110, "45,90"), (490, 110, "1.204,10"),
+        (40, 125, "04/10/2025"), (110, 125, "COMPRA MERCADO"), (410, 125, "4,10"),
+    ]])
+    outcome = _outcome(partial)
+    assert outcome.result is None and outcome.reason == REASON_INCOMPLETE_CHAIN
+
+    reconciled = make_pdf(tmp_path / "fatura.pdf", [CARD + [(40, 150, "Total da fatura"), (450, 150, "R$ 89,90")]])
+    outcome = _outcome(reconciled, MerchantCategorizer(memo_path=None))
+    assert outcome.result is None and outcome.reason == REASON_UNCATEGORIZED
+    assert outcome.checks == ["total da fatura"]
+
+
+def test_crew_runs_when_totals_do_not_reconcile(tmp_path, make_pdf):
+    wrong_total = make_pdf(tmp_path / "errada.pdf", [CARD + [(40, 150, "Total da fatura"), (450, 150, "R$ 189,90")]])
+    no_totals = make_pdf(tmp_path / "sem_total.pdf", [CARD])
+    calls = []
+
+    def crew(source):
+        calls.append(source)
+        return ExtractionResult(success=True, transactions_count=0)
+
+    results = [run_with_fast_path(source, crew, FastPathSettings()) for source in (wrong_total, no_totals)]
+
+    assert calls == [wrong_total, no_totals]
+    assert [r.extraction_path for r in results] == [PATH_CREW, PATH_CREW]
+    assert [r.fallback_reason for r in results] == [REASON_MISMATCH, REASON_NO_TOTALS]
+    assert run_with_fast_path(no_totals, crew, FastPathSettings(enabled=False)).fallback_reason is not None
+
+    records = [r.model_dump(exclude_none=True) for r in results] + [{"extraction_path": PATH_DETERMINISTIC}] * 2
+    assert summarize_paths(records) == {"fast_path_hits": 2, "fast_path_hit_rate": 0.5,
+                                        "fallback_reasons": {REASON_MISMATCH: 1, REASON_NO_TOTALS: 1}}
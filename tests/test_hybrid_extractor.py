@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import fitz
+
+from quartavia_ocr.tools.custom_tool import HybridPDFExtractorTool, NativePDFExtractorTool, PDFToOCRTool
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        text = "05/10/2025 COMPRA CARTAO RECIBO ESCANEADO R$ 77,00"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def _make_mixed_pdf(make_pdf, path):
+    # Página 3 "escaneada": só uma imagem, sem camada de texto
+    scanned = fitz.open(stream=make_pdf(None, [[(72, 72, "RECIBO")]], fontsize=30), filetype="pdf")
+    statement = [f"0{n}/10/2025 PIX ENVIADO Fulano {n} R$ {n}0,00" for n in (1, 2)]
+    doc = fitz.open(stream=make_pdf(None, statement + [[]], fontsize=11), filetype="pdf")
+    doc[2].insert_image(doc[2].rect, pixmap=scanned[0].get_pixmap())
+    doc.save(path)
+    doc.close()
+    scanned.close()
+
+
+def test_hybrid_ocrs_only_image_pages_in_page_order(tmp_path, make_pdf):
+    pdf_path = str(tmp_path / "misto.pdf")
+    _make_mixed_pdf(make_pdf, pdf_path)
+
+    completions = FakeCompletions()
+    ocr_tool = PDFToOCRTool()
+    ocr_tool.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    ocr_tool.model_name = "fake-model"
+    tool = HybridPDFExtractorTool(ocr_tool=ocr_tool)
+
+    output = tool._run(pdf_path)
+
+    assert completions.calls == 1
+    assert output.index("PÁGINA 1") < output.index("PÁGINA 2") < output.index("PÁGINA 3")
+    assert "Método: OCR\n\n05/10/2025 COMPRA CARTAO RECIBO ESCANEADO R$ 77,00" in output
+    assert output.count("Método: Texto Nativo") == 2
+
+
+def test_native_tool_flags_pages_without_text(tmp_path, make_pdf):
+    pdf_path = str(tmp_path / "misto.pdf")
+    _make_mixed_pdf(make_pdf, pdf_path)
+
+    output = NativePDFExtractorTool()._run(pdf_path)
+
+    assert "Páginas sem texto nativo: 3" in output
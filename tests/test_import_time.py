@@ -0,0 +1,67 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+# Orçamento por módulo (interpretador novo, como numa CLI ou no spawn de um worker)
+IMPORT_BUDGET_SECONDS = float(os.getenv("QUARTAVIA_IMPORT_BUDGET", "1.0"))
+HEAVY_MODULES = ("crewai", "openai", "litellm", "fitz", "agentops")
+
+
+def _import_in_fresh_interpreter(module):
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    cumulative = [int(m.group(1)) for m in re.finditer(rf'^import time:\s+\d+ \|\s+(\d+) \|\s*{re.escape(module)}$',
+                                                         proc.stderr, re.MULTILINE)]
+    return cumulative[-1] / 1e6, [m for m in proc.stdout.strip().split(",") if m]
+
+
+@pytest.mark.parametrize("module", [
+    "quartavia_ocr.main",
+    "quartavia_ocr.batch",
+    "quartavia_ocr.service",
+    "quartavia_ocr.tools.native_extraction",
+])
+def test_entry_points_import_fast_without_heavy_dependencies(module):
+    seconds, heavy = _import_in_fresh_interpreter(module)
+    assert heavy == []
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_importing_crew_has_no_side_effects():
+    # Interpretador novo: no processo dos testes o crew pode já estar em sys.modules. O crewAI vem
+    # antes: ao ser importado, o litellm acrescenta o diretório atual ao sys.path e o crewai.project
+    # carrega o .env por conta própria; aqui só conta o que os módulos do quartavia_ocr fazem.
+    code = (
+        "import sys, dotenv, crewai.project\n"
+        "calls = []\n"
+        "dotenv.load_dotenv = lambda *args, **kwargs: calls.append(args) or True\n"
+        "path_before = list(sys.path)\n"
+        "import quartavia_ocr.crew as crew\n"
+        "assert sys.path == path_before\n"
+        "assert not crew._telemetry_initialized\n"
+        "assert not hasattr(crew, 'pdf_tool')\n"
+        "assert calls == [], calls\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+
+def test_settings_are_read_when_used_not_when_imported(monkeypatch):
+    from quartavia_ocr.service import ExtractionService
+    from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool, PDFToOCRTool
+    from quartavia_ocr.tools.document_session import DocumentSession
+
+    # Como o .env carregado pela CLI depois que os módulos já foram importados
+    monkeypatch.setenv("QUARTAVIA_NATIVE_WORKERS", "3")
+    monkeypatch.setenv("QUARTAVIA_STREAM_WINDOW", "2")
+    monkeypatch.setenv("QUARTAVIA_SESSION_RENDER_MB", "1")
+    monkeypatch.setenv("QUARTAVIA_SERVICE_QUEUE_SIZE", "5")
+
+    assert NativePDFExtractorTool(cache=None).max_workers == 3
+    assert PDFToOCRTool(cache=None, scheduler=None, replay_store=None).max_pages_in_memory == 2
+    assert DocumentSession("extrato.pdf", b"%PDF").render_budget == 1024 * 1024
+    assert ExtractionService(processor_factory=lambda: None).queue_size == 5
@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+
+import pdfplumber
+import pytest
+
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool
+from quartavia_ocr.tools.extraction_cache import ExtractionCache
+from quartavia_ocr.tools.native_extraction import extract_page_lines_chain, extract_page_lines_single_pass
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks")
+
+
+@pytest.fixture
+def corpus(monkeypatch):
+    monkeypatch.syspath_prepend(BENCHMARKS_DIR)
+    import synthetic_corpus
+
+    yield synthetic_corpus
+    sys.modules.pop("synthetic_corpus", None)
+
+
+@pytest.mark.parametrize("layout", ["bradesco", "nubank"])
+def test_single_pass_matches_the_fallback_chain(corpus, layout):
+    source, _ = corpus.generate_statement("mixed", 3, layout)
+    with pdfplumber.open(io.BytesIO(source)) as pdf:
+        for page in pdf.pages:
+            chain = extract_page_lines_chain(page)
+            page.close()
+            assert extract_page_lines_single_pass(page) == chain
+            page.close()
+    # Página 3 do PDF misto é imagem: nenhuma linha, nos dois motores
+    assert chain is None
+
+
+def test_tool_releases_page_caches_after_each_page(corpus, monkeypatch):
+    source, _ = corpus.generate_statement("native", 2, "bradesco")
+    opened = []
+    real_open = pdfplumber.open
+
+    def tracking_open(*args, **kwargs):
+        pdf = real_open(*args, **kwargs)
+        opened.append(pdf)
+        return pdf
+
+    monkeypatch.setattr(pdfplumber, "open", tracking_open)
+    NativePDFExtractorTool(cache=None, max_workers=1)._extract_pages(source)
+
+    pages = opened[0].pages
+    assert len(pages) == 2
+    assert not any(hasattr(page, "_layout") or hasattr(page, "_objects") for page in pages)
+
+
+def test_each_engine_has_its_own_cache_namespace(tmp_path, make_pdf, monkeypatch):
+    source = make_pdf(tmp_path / "extrato.pdf", ["01/10/2025 PIX ENVIADO Fulano R$ 10,00"])
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    tool = NativePDFExtractorTool(cache=cache)
+
+    monkeypatch.setenv("QUARTAVIA_NATIVE_ENGINE", "chain")
+    chain_namespace = tool.cache_namespace()
+    tool._run(source)
+    monkeypatch.setenv("QUARTAVIA_NATIVE_ENGINE", "singlepass")
+    tool._run(source)
+
+    assert chain_namespace != tool.cache_namespace()
+    # A troca de motor não responde com o texto guardado pelo outro
+    assert cache.stats()["hits"] == 0 and cache.stats()["stores"] == 2
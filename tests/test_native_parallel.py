@@ -0,0 +1,31 @@
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool
+from quartavia_ocr.tools.native_extraction import split_page_ranges
+
+
+def _make_statement_pdf(make_pdf, path, pages):
+    statement = [[(72, 72 + 14 * i, line) for i, line in enumerate([
+        "EXTRATO CONTA CORRENTE",
+        f"Saldo anterior R$ {1000 + n},00",
+        f"0{n % 9 + 1}/10/2025 PIX ENVIADO Fulano R$ {n + 10},50",
+        f"0{n % 9 + 1}/10/2025 SUPERMERCADO BOM PRECO R$ {n + 3},99",
+        "Ouvidoria 0800 000 0000",
+    ])] for n in range(pages)]
+    make_pdf(path, statement + [[]], fontsize=10)  # página sem texto no final
+
+
+def test_split_page_ranges_covers_all_pages_in_order():
+    ranges = split_page_ranges(11, 3)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 11
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert split_page_ranges(0, 4) == []
+
+
+def test_parallel_extraction_matches_sequential(tmp_path, make_pdf):
+    pdf_path = str(tmp_path / "extrato.pdf")
+    _make_statement_pdf(make_pdf, pdf_path, 12)
+
+    sequential = NativePDFExtractorTool(max_workers=1)._run(pdf_path)
+    parallel = NativePDFExtractorTool(max_workers=3)._run(pdf_path)
+
+    assert "--- DADOS (PÁGINA 12) ---" in sequential
+    assert parallel == sequential
@@ -1,24 +1,102 @@
-import sys
+import json
 import os
+from types import SimpleNamespace
 
-# diretório raiz do projeto
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, project_root)
-
-from src.quartavia_ocr.tools.custom_tool import PDFExtractTool
-
-def test_pdf_extract():
-    # instância da ferramenta
-    pdf_tool = PDFExtractTool()
-    
-    pdf_path = "C:/Users/dmarq/Downloads/Extrato-21-09-2025-a-21-10-2025-PDF.pdf"
-    
-    # extrai o texto
-    result = pdf_tool._run(pdf_path)
-    
-    print("=== Texto Extraído do PDF ===")
-    print(result)
-    print("============================")
-
-if __name__ == "__main__":
-    test_pdf_extract()
\ No newline at end of file
+import pytest
+
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+
+@pytest.fixture
+def benchmarks_path(monkeypatch):
+    # Os benchmarks são scripts soltos (não um pacote): importa pelo diretório
+    monkeypatch.syspath_prepend(BENCHMARKS_DIR)
+
+
+@pytest.mark.parametrize("layout", ["bradesco", "inter", "nubank", "itau"])
+def test_native_extraction_of_synthetic_statement(tmp_path, benchmarks_path, layout):
+    from synthetic_corpus import generate_statement
+
+    content, page_lines = generate_statement("native", 2, layout)
+    pdf_path = tmp_path / f"{layout}.pdf"
+    pdf_path.write_bytes(content)
+
+    result = NativePDFExtractorTool(cache=None)._run(str(pdf_path))
+
+    assert "--- DADOS (PÁGINA 2) ---" in result
+    assert "Ouvidoria" not in result
+    # O valor da primeira transação desenhada aparece no texto extraído
+    first_row = page_lines[0][2 if layout != "nubank" else 1]
+    assert first_row.split()[-1] in result
+
+
+def test_mixed_statement_reports_image_pages(tmp_path, benchmarks_path):
+    from synthetic_corpus import generate_statement
+
+    content, _ = generate_statement("mixed", 3, "itau")
+    pdf_path = tmp_path / "misto.pdf"
+    pdf_path.write_bytes(content)
+
+    result = NativePDFExtractorTool(cache=None)._run(str(pdf_path))
+
+    assert "Páginas sem texto nativo: 3" in result
+
+
+def test_benchmark_suite_writes_comparable_json(tmp_path, benchmarks_path):
+    import bench_suite
+
+    output = tmp_path / "suite.json"
+    report = bench_suite.main(["--sizes", "2", "--kinds", "mixed", "--layouts", "bradesco", "-o", str(output)])
+
+    saved = json.loads(output.read_text(encoding="utf-8"))
+    assert saved["meta"]["sizes"] == [2]
+    assert [row["stage"] for row in saved["results"]] == list(bench_suite.STAGES)
+    assert all(row["pages_per_second"] > 0 and row["peak_rss_mb"] > 0 for row in saved["results"])
+    assert saved["results"][3]["failed_pages"] == 0
+    assert bench_suite.compare(report, saved)
+
+
+def test_ocr_streaming_keeps_peak_rss_flat_as_pages_grow(benchmarks_path):
+    import bench_stream_memory
+
+    small = bench_stream_memory.measure(4, window=2)
+    large = bench_stream_memory.measure(16, window=2)
+
+    assert small["pages_ok"] == 4 and large["pages_ok"] == 16
+    # 4x mais páginas, mesma janela: o pico quase não sai do patamar de antes da extração
+    assert large["growth_mb"] - small["growth_mb"] < 3
+    assert large["growth_mb"] < 5
+
+
+def test_stream_pages_yields_each_page_before_rendering_the_next_window(tmp_path, benchmarks_path, monkeypatch):
+    from synthetic_corpus import generate_statement
+
+    from quartavia_ocr.tools import custom_tool
+    from quartavia_ocr.tools.page_stream import stream_pages
+
+    content, _ = generate_statement("mixed", 6, "inter", image_dpi=72)
+    pdf_path = tmp_path / "misto.pdf"
+    pdf_path.write_bytes(content)
+    rendered = []
+    real_render_page = custom_tool.render_page
+    monkeypatch.setattr(custom_tool, "render_page",
+                        lambda page, i, settings: rendered.append(i) or real_render_page(page, i, settings))
+
+    def create(model, messages, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="05/10/2025 PIX R$ 1,00"))])
+
+    ocr_tool = custom_tool.PDFToOCRTool(cache=None, max_pages_in_memory=1)
+    ocr_tool.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    hybrid = custom_tool.HybridPDFExtractorTool(cache=None, ocr_tool=ocr_tool)
+
+    pages = stream_pages(str(pdf_path), hybrid)
+    first = next(pages)
+    assert (first.page_number, first.method) == (1, "Texto Nativo") and rendered == []
+    rest = list(pages)
+    # Páginas 3 e 6 são imagens: OCR, uma janela de cada vez, na ordem do PDF
+    assert [(p.page_number, p.method) for p in rest] == [
+        (2, "Texto Nativo"), (3, "OCR"), (4, "Texto Nativo"), (5, "Texto Nativo"), (6, "OCR")]
+    assert rendered == [2, 5]
+    assert rest[1].filtered_text == "05/10/2025 PIX R$ 1,00"
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+
+from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+from quartavia_ocr.tools.ocr_backends import (
+    ProcessPoolOCRBackend,
+    lines_from_easyocr,
+    lines_from_tesseract_data,
+    register_backend,
+    unregister_backend,
+)
+
+
+def fake_page(images_b64, confidence_by_image):
+    """Worker do backend falso (função de módulo: precisa ser picklable para o pool spawn)."""
+    page, confidence = confidence_by_image[images_b64[0]]
+    if confidence is None:
+        return "", None, "falha simulada"
+    return f"01/10/2025 PIX LOCAL PAGINA {page} R$ {page},00", confidence, None
+
+
+class FakeLocalBackend(ProcessPoolOCRBackend):
+    name = "fake-local"
+    confidence_by_image: dict = {}
+
+    def __init__(self):
+        super().__init__(workers=2)
+
+    def page_function(self):
+        return fake_page
+
+    def page_args(self):
+        return (self.confidence_by_image,)
+
+
+class FakeCompletions:
+    def __init__(self, page_by_image):
+        self.page_by_image = page_by_image
+        self.pages = []
+
+    def create(self, model, messages, **kwargs):
+        page = self.page_by_image[messages[0]["content"][1]["image_url"]["url"].split(",", 1)[1]]
+        self.pages.append(page)
+        text = f"01/10/2025 PIX API PAGINA {page} R$ {page},00"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+@pytest.fixture(autouse=True)
+def fake_backend():
+    register_backend(FakeLocalBackend)
+    yield
+    unregister_backend(FakeLocalBackend.name)
+
+
+def _make_tool(make_pdf, tmp_path, confidences, with_client=True):
+    pdf_path = make_pdf(tmp_path / "scan.pdf", [f"pagina {n + 1}" for n in range(len(confidences))], fontsize=11)
+
+    tool = PDFToOCRTool(ocr_backend="fake-local", escalation_confidence=0.8)
+    pages = tool._render_pages(pdf_path)
+    FakeLocalBackend.confidence_by_image = {p.images_b64[0]: (p.page_index + 1, c) for p, c in zip(pages, confidences)}
+    completions = FakeCompletions({p.images_b64[0]: p.page_index + 1 for p in pages})
+    tool.client = SimpleNamespace(chat=SimpleNamespace(completions=completions)) if with_client else None
+    tool._client_pending = False
+    tool.model_name = "fake-model"
+    return tool, completions, pdf_path
+
+
+def test_low_confidence_pages_escalate_to_api(tmp_path, make_pdf):
+    tool, completions, pdf_path = _make_tool(make_pdf, tmp_path, [0.95, 0.40, None, 0.90])
+    output = tool._run(pdf_path)
+
+    # Só a página de baixa confiança e a que falhou no backend local vão para a API
+    assert sorted(completions.pages) == [2, 3]
+    assert "PIX LOCAL PAGINA 1" in output and "PIX LOCAL PAGINA 4" in output
+    assert "PIX API PAGINA 2" in output and "PIX API PAGINA 3" in output
+    assert output.index("PAGINA 1") < output.index("PAGINA 2") < output.index("PAGINA 3") < output.index("PAGINA 4")
+    assert "fake-local local + OpenAI" in output
+    assert "página 2: fake-local 0.40 -> api" in tool.last_ocr_report
+
+
+def test_local_backend_works_without_api_client(tmp_path, make_pdf):
+    tool, completions, pdf_path = _make_tool(make_pdf, tmp_path, [0.95, 0.40], with_client=False)
+    output = tool._run(pdf_path)
+
+    # Sem cliente não há escalação: fica o texto local, mesmo com confiança baixa
+    assert completions.pages == []
+    assert "PIX LOCAL PAGINA 1" in output and "PIX LOCAL PAGINA 2" in output
+    assert tool.cache_namespace("ocr").endswith(":fake-local@0.8")
+
+
+def test_lines_from_tesseract_data_groups_words_by_line():
+    data = {
+        "text": ["", "01/10", "PIX", "50,00", "", "SALDO", "ruido"],
+        "conf": [-1, 90, 80, 70, -1, 60, 10],
+        "block_num": [1, 1, 1, 1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1, 1, 1, 1],
+        "line_num": [0, 1, 1, 1, 2, 2, 2],
+    }
+    text, confidence, words = lines_from_tesseract_data(data)
+    assert text == "01/10 PIX 50,00\nSALDO ruido"
+    assert words == 5
+    assert abs(confidence - 0.62) < 1e-9
+
+
+def test_lines_from_easyocr_orders_boxes_into_lines():
+    def box(x, y, text, conf):
+        return [[x, y], [x + 40, y], [x + 40, y + 10], [x, y + 10]], text, conf
+
+    results = [box(100, 11, "50,00", 0.9), box(0, 10, "01/10", 0.8), box(50, 12, "PIX", 0.7), box(0, 40, "SALDO", 0.6)]
+    text, confidence, words = lines_from_easyocr(results)
+    assert text == "01/10 PIX 50,00\nSALDO"
+    assert words == 4
+    assert abs(confidence - 0.75) < 1e-9
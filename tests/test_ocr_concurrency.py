@@ -0,0 +1,74 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+
+
+class FakeCompletions:
+    """Imita client.chat.completions.create, respondendo pela imagem recebida."""
+
+    def __init__(self, page_by_image, flaky_pages=(), broken_pages=(), delay=0.02):
+        self.page_by_image = page_by_image
+        self.flaky_pages = set(flaky_pages)
+        self.broken_pages = set(broken_pages)
+        self.delay = delay
+        self.calls = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def create(self, model, messages, **kwargs):
+        url = messages[0]["content"][1]["image_url"]["url"]
+        page = self.page_by_image[url.split(",", 1)[1]]
+        with self.lock:
+            self.calls[page] = self.calls.get(page, 0) + 1
+            attempt = self.calls[page]
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if page in self.broken_pages or (page in self.flaky_pages and attempt == 1):
+                raise RuntimeError(f"falha simulada na página {page}")
+            text = f"01/10/2025 PIX ENVIADO PAGINA {page} R$ {page},00"
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def _make_tool(make_pdf, tmp_path, pages, **fake_kwargs):
+    pdf_path = make_pdf(tmp_path / "scan.pdf", [f"pagina {n + 1}" for n in range(pages)], fontsize=11)
+
+    tool = PDFToOCRTool()
+    pages = tool._render_pages(pdf_path)
+    completions = FakeCompletions({page.images_b64[0]: page.page_index + 1 for page in pages}, **fake_kwargs)
+    tool.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    tool.model_name = "fake-model"
+    tool.retry_backoff = 0.001
+    return tool, completions, pdf_path
+
+
+def test_concurrent_ocr_keeps_page_order_and_bounds_in_flight(tmp_path, make_pdf):
+    tool, completions, pdf_path = _make_tool(make_pdf, tmp_path, 8, flaky_pages=[3])
+    tool.max_concurrency = 3
+
+    output = tool._run(pdf_path)
+
+    positions = [output.index(f"PAGINA {n} ") for n in range(1, 9)]
+    assert positions == sorted(positions)
+    assert completions.peak_in_flight <= 3
+    assert completions.calls[3] == 2
+    assert "FALHA" not in output
+
+
+def test_failed_pages_are_reported(tmp_path, make_pdf):
+    tool, completions, pdf_path = _make_tool(make_pdf, tmp_path, 4, broken_pages=[2])
+    tool.max_retries = 2
+
+    output = tool._run(pdf_path)
+
+    assert completions.calls[2] == 3
+    assert "PAGINA 2 " not in output
+    assert "--- PÁGINAS COM FALHA NO OCR: 2 ---" in output
+    assert "falha simulada na página 2" in output
@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+from quartavia_ocr.tools.ocr_scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    CircuitOpenError,
+    OCRJob,
+    OCRScheduler,
+    SchedulerSettings,
+    get_openai_client,
+)
+from quartavia_ocr.tools.page_triage import TriageSettings
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        time.sleep(0.005)
+
+
+def test_interactive_first_then_round_robin_across_jobs():
+    scheduler = OCRScheduler(SchedulerSettings(max_in_flight=1))
+    holder = scheduler.acquire(OCRJob("ocupa"))
+    granted = []
+    threads = []
+
+    def call(job, label):
+        ticket = scheduler.acquire(job)
+        granted.append(label)
+        scheduler.release(ticket)
+
+    # Enfileira um de cada vez, para que a ordem de chegada seja conhecida
+    arrivals = [(OCRJob("lote-a"), "a1"), (OCRJob("lote-a"), "a2"), (OCRJob("lote-a"), "a3"),
+                (OCRJob("lote-b"), "b1"), (OCRJob("http", PRIORITY_INTERACTIVE), "http")]
+    for n, (job, label) in enumerate(arrivals, 1):
+        threads.append(threading.Thread(target=call, args=(job, label)))
+        threads[-1].start()
+        _wait_until(lambda: scheduler.stats()["queued"] == n)
+
+    assert scheduler.stats()["queued_by_priority"] == {PRIORITY_INTERACTIVE: 1, PRIORITY_BATCH: 4}
+    time.sleep(0.01)
+    scheduler.release(holder)
+    for thread in threads:
+        thread.join(5)
+
+    assert granted == ["http", "a1", "b1", "a2", "a3"]
+    stats = scheduler.stats()
+    assert stats["queued"] == 0 and stats["in_flight"] == 0 and stats["granted"] == 6
+    assert stats["wait_max"] >= 0.01
+
+
+def test_token_bucket_waits_and_refunds_unused_tokens():
+    # 1000 tokens/s, no máximo 1s acumulado
+    scheduler = OCRScheduler(SchedulerSettings(tokens_per_minute=60_000, burst_seconds=1))
+    job = OCRJob("doc")
+
+    first = scheduler.acquire(job, tokens=1000)
+    start = time.monotonic()
+    scheduler.release(scheduler.acquire(job, tokens=300), used_tokens=300)
+    assert time.monotonic() - start >= 0.25  # esperou o balde encher de novo
+
+    # O estimado (1000) era mais do que o consumido (100): a diferença volta para o balde
+    scheduler.release(first, used_tokens=100)
+    start = time.monotonic()
+    scheduler.release(scheduler.acquire(job, tokens=800))
+    assert time.monotonic() - start < 0.2
+
+
+def test_circuit_breaker_opens_fails_fast_and_closes_after_probe():
+    scheduler = OCRScheduler(SchedulerSettings(breaker_failures=2, breaker_cooldown=0.2))
+    job = OCRJob("doc")
+
+    scheduler.release(scheduler.acquire(job), error=StatusError(400))  # erro do pedido: não conta
+    for _ in range(2):
+        scheduler.release(scheduler.acquire(job), error=StatusError(503))
+    with pytest.raises(CircuitOpenError):
+        scheduler.acquire(job)
+    assert scheduler.stats()["breaker"] == "aberto"
+
+    time.sleep(0.25)
+    probe = scheduler.acquire(job)
+    assert scheduler.stats()["breaker"] == "teste"
+    scheduler.release(probe)
+    assert scheduler.stats()["breaker"] == "fechado"
+    assert scheduler.stats()["rejected"] == 1 and scheduler.stats()["breaker_trips"] == 1
+
+
+@pytest.fixture
+def fake_api():
+    """API local compatível com chat.completions: o primeiro pedido toma 429, os demais respondem."""
+    state = {"calls": 0, "in_flight": 0, "peak_in_flight": 0, "rate_limited": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            with lock:
+                state["calls"] += 1
+                call = state["calls"]
+                state["in_flight"] += 1
+                state["peak_in_flight"] = max(state["peak_in_flight"], state["in_flight"])
+            try:
+                time.sleep(0.02)
+                if call == 1:
+                    state["rate_limited"] += 1
+                    body, status = {"error": {"message": "Rate limit", "type": "requests"}}, 429
+                else:
+                    body, status = {
+                        "id": f"cmpl-{call}", "object": "chat.completion", "created": 0, "model": "fake-model",
+                        "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                            "role": "assistant", "content": f"01/10/2025 PIX CHAMADA {call} R$ 1,00"}}],
+                        "usage": {"prompt_tokens": 90, "completion_tokens": 10, "total_tokens": 100},
+                    }, 200
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("retry-after-ms", "50")
+                self.end_headers()
+                self.wfile.write(payload)
+            finally:
+                with lock:
+                    state["in_flight"] -= 1
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["base_url"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_documents_share_the_process_limits(tmp_path, fake_api, make_pdf):
+    scheduler = OCRScheduler(SchedulerSettings(max_in_flight=2, requests_per_minute=6000))
+    client = get_openai_client("sk-teste", base_url=fake_api["base_url"])
+    outputs = {}
+
+    def process(name):
+        pdf_path = make_pdf(tmp_path / f"{name}.pdf", [f"{name} pagina {n + 1}" for n in range(4)], fontsize=11)
+        tool = PDFToOCRTool(cache=None, scheduler=scheduler, retry_backoff=0.001, max_concurrency=4,
+                            triage_settings=TriageSettings(enabled=False))
+        tool.client, tool.model_name = client, "fake-model"
+        outputs[name] = tool._run(pdf_path)
+
+    threads = [threading.Thread(target=process, args=(name,)) for name in ("doc1", "doc2")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    # 4 chamadas de cada documento ao mesmo tempo, mas nunca mais de 2 na API
+    assert fake_api["peak_in_flight"] <= 2
+    assert all(output.count("PIX CHAMADA") == 4 and "FALHA" not in output for output in outputs.values())
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == fake_api["rate_limited"] == 1
+    assert stats["granted"] == fake_api["calls"] == 9  # o 429 foi refeito pela ferramenta, pela fila
+    assert stats["breaker"] == "fechado" and stats["in_flight"] == 0
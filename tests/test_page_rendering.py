@@ -0,0 +1,111 @@
+import base64
+import io
+from types import SimpleNamespace
+
+import fitz
+from PIL import Image
+
+from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+from quartavia_ocr.tools.page_rendering import RenderSettings, choose_dpi, render_pages, split_tiles
+
+
+def _text_pdf(path, fontsize=10, lines=30, height=842):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=height)
+    for n in range(lines):
+        page.insert_text((72, 72 + n * fontsize * 2.5), f"0{n % 9 + 1}/10/2025 PIX ENVIADO Fulano R$ {n},00",
+                         fontsize=fontsize)
+    doc.save(path)
+    doc.close()
+
+
+def test_dpi_follows_text_size_and_scan_resolution(tmp_path):
+    settings = RenderSettings()
+    doc = fitz.open()
+    small = doc.new_page()
+    small.insert_text((72, 72), "texto pequeno", fontsize=5)
+    large = doc.new_page()
+    large.insert_text((72, 72), "texto grande", fontsize=16)
+    scan = doc.new_page(width=612, height=792)
+    buffer = io.BytesIO()
+    Image.new("L", (850, 1100), 255).save(buffer, format="PNG")  # 850px em 8,5" = 100 dpi
+    scan.insert_image(scan.rect, stream=buffer.getvalue())
+    doc.new_page()
+    small, large, scan, blank = (doc[i] for i in range(4))
+
+    assert choose_dpi(small, settings)[0] == settings.max_dpi
+    assert choose_dpi(large, settings)[0] == settings.min_dpi
+    assert choose_dpi(scan, settings) == (100, "imagem 100dpi")
+    assert choose_dpi(blank, settings) == (settings.default_dpi, "padrão")
+
+
+def test_rendering_is_grayscale_trimmed_and_smaller_than_legacy_png(tmp_path):
+    pdf_path = str(tmp_path / "extrato.pdf")
+    _text_pdf(pdf_path)
+
+    [page] = render_pages(pdf_path)
+    image = Image.open(io.BytesIO(base64.b64decode(page.images_b64[0])))
+    # Texto vetorial: PNG de 16 tons de cinza (o JPEG borra e cresce com texto nítido)
+    assert (image.format, image.mode, page.mime_type) == ("PNG", "P", "image/png")
+    assert len(set(image.convert("RGB").getcolors())) <= 16
+    full_width = 595 * page.dpi / 72
+    assert page.width < full_width * 0.9  # margem direita em branco cortada
+
+    with fitz.open(pdf_path) as doc:
+        legacy = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(2, 2)).tobytes("png")
+    assert page.bytes < len(legacy) / 2
+
+    jpeg_page = render_pages(pdf_path, settings=RenderSettings(image_format="jpeg", quality=60))[0]
+    assert Image.open(io.BytesIO(base64.b64decode(jpeg_page.images_b64[0]))).format == "JPEG"
+
+
+def test_scanned_pages_are_sent_as_jpeg(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    buffer = io.BytesIO()
+    Image.effect_noise((1275, 1650), 40).save(buffer, format="PNG")  # "papel" escaneado a 150 dpi
+    page.insert_image(page.rect, stream=buffer.getvalue())
+
+    [rendered] = render_pages(doc.tobytes())
+    assert rendered.mime_type == "image/jpeg"
+    assert rendered.dpi == 150
+
+
+def test_tall_pages_are_split_on_blank_rows(tmp_path):
+    pdf_path = str(tmp_path / "longo.pdf")
+    _text_pdf(pdf_path, lines=200, height=5200)
+    settings = RenderSettings(max_tile_height=1500)
+
+    [page] = render_pages(pdf_path, settings=settings)
+    assert len(page.images_b64) == len(page.tile_heights) > 2
+    assert sum(page.tile_heights) == page.height
+    assert max(page.tile_heights) <= 1500
+    for b64 in page.images_b64[1:]:
+        tile = Image.open(io.BytesIO(base64.b64decode(b64))).convert("L")
+        # A primeira linha de cada faixa é fundo: o corte não atravessou texto
+        assert min(tile.crop((0, 0, tile.width, 1)).tobytes()) >= settings.trim_threshold - 40
+
+
+def test_split_tiles_without_limit_keeps_the_image():
+    image = Image.new("L", (100, 5000), 255)
+    assert split_tiles(image, 0, 235) == [image]
+
+
+def test_tiles_are_ocred_and_joined_in_order(tmp_path):
+    pdf_path = str(tmp_path / "longo.pdf")
+    _text_pdf(pdf_path, lines=200, height=5200)
+    tool = PDFToOCRTool()
+    tool.render_settings = RenderSettings(max_tile_height=1500)
+    [page] = tool._render_pages(pdf_path)
+    tile_number = {b64: n for n, b64 in enumerate(page.images_b64)}
+
+    def create(model, messages, **kwargs):
+        url = messages[0]["content"][1]["image_url"]["url"]
+        assert url.startswith("data:image/png;base64,")
+        text = f"01/10/2025 PIX FAIXA {tile_number[url.split(',', 1)[1]]} R$ 1,00"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    tool.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    [(text, error)] = tool._ocr_pages([page])
+    assert error is None
+    assert text.splitlines() == [f"01/10/2025 PIX FAIXA {n} R$ 1,00" for n in range(len(page.images_b64))]
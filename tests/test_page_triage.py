@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+from quartavia_ocr.tools.page_triage import TriageSettings, score_text
+
+TERMS_LINES = [
+    "CONDIÇÕES GERAIS DO CARTÃO DE CRÉDITO",
+    "Consulte os termos e condições do seu contrato no aplicativo.",
+    "O pagamento integral da fatura evita a cobrança de juros e encargos.",
+    "Importante saber: o limite de crédito pode ser revisto a qualquer momento.",
+    "Após realizar o pagamento, a compensação ocorre em até 3 dias úteis.",
+]
+STATEMENT_LINES = [
+    "05/10/2025 PIX ENVIADO FULANO R$ 10,00",
+    "06/10/2025 SUPERMERCADO BOM PRECO R$ 152,30",
+    "07/10/2025 POSTO SHELL CENTRO R$ 200,00",
+]
+
+
+def test_score_text_separates_boilerplate_from_transactions():
+    terms, _ = score_text("\n".join(TERMS_LINES))
+    statement, reason = score_text("\n".join(STATEMENT_LINES))
+
+    assert terms == 0.0
+    assert statement == 1.0
+    assert reason.startswith("3 linha(s) de lançamento")
+
+
+class CountingCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=f"01/10/2025 PIX ENVIADO CHAMADA {self.calls} R$ 1,00"))])
+
+
+def _lines(lines):
+    return [(40, 72 + 14 * n, line) for n, line in enumerate(lines)]
+
+
+def _make_tool(make_pdf, tmp_path, settings, first_page=TERMS_LINES, last_page=STATEMENT_LINES):
+    # Página 1: só termos e condições; 2: em branco; 3: lançamentos (a camada de texto é confiável)
+    pdf_path = make_pdf(tmp_path / "fatura.pdf", [_lines(first_page), [], _lines(last_page)])
+
+    tool = PDFToOCRTool(cache=None, triage_settings=settings)
+    completions = CountingCompletions()
+    tool.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    tool._client_pending = False
+    tool.model_name = "fake-model"
+    return tool, completions, pdf_path
+
+
+def test_ocr_tool_skips_boilerplate_and_blank_pages(tmp_path, make_pdf):
+    tool, completions, pdf_path = _make_tool(make_pdf, tmp_path, TriageSettings())
+    output = tool._run(pdf_path)
+
+    assert completions.calls == 1
+    assert "Páginas puladas pela triagem por não terem lançamentos: 1, 2" in output
+    report = tool.last_triage_report.splitlines()
+    assert report[0].startswith("página 1: pulada")
+    assert report[1] == "página 2: pulada (nota 0.00, imagem: página em branco)"
+    assert report[2].startswith("página 3: OCR")
+
+    skipped = [page.skipped is not None for page in tool.iter_pages(pdf_path)]
+    assert skipped == [True, True, False]
+
+
+def test_junk_text_layer_is_not_trusted_to_skip_pages(tmp_path, make_pdf):
+    # Camada de texto embaralhada: bastante texto, nenhuma data ou valor em nenhuma página
+    junk = ["ÐÑ¿Æ ÿþæ ¤§¶ ÞßÕ Ø×Ö ÔÓÒ ÑÐÏ ÎÍÌ ËÊÉ ÈÇÆ ÅÄÃ ÂÁÀ", "¿¾½ ¼»º ¹¸· ¶µ´ ³²± °¯® ­¬« ª©¨ §¦¥ ¤£¢"] * 3
+    tool, completions, pdf_path = _make_tool(make_pdf, tmp_path, TriageSettings(), first_page=junk, last_page=junk)
+    tool._run(pdf_path)
+
+    assert completions.calls == 2  # só a página em branco é pulada
+    report = tool.last_triage_report.splitlines()
+    assert report[0] == "página 1: OCR (nota 1.00, imagem: camada de texto sem lançamentos no documento)"
+    assert report[1].startswith("página 2: pulada")
+
+
+def test_zero_threshold_disables_triage(tmp_path, make_pdf):
+    tool, completions, pdf_path = _make_tool(make_pdf, tmp_path, TriageSettings(threshold=0))
+    output = tool._run(pdf_path)
+
+    assert completions.calls == 3
+    assert "triagem" not in output
+    assert tool.last_triage_report == ""
@@ -0,0 +1,91 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from crewai.llms.base_llm import BaseLLM
+
+from quartavia_ocr.replay import (
+    MODE_RECORD,
+    MODE_REPLAY,
+    ReplayLLM,
+    ReplayMissError,
+    ReplayStore,
+    build_crew_llm,
+    get_replay_store,
+)
+from quartavia_ocr.tools.custom_tool import PDFToOCRTool
+from quartavia_ocr.tools.page_triage import TriageSettings
+
+
+class CountingCompletions:
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=f"01/10/2025 PIX CHAMADA {self.calls} R$ 1,00"))], usage=SimpleNamespace(total_tokens=100))
+
+
+class EchoLLM(BaseLLM):
+    def __init__(self):
+        super().__init__(model="fake-model", temperature=0)
+        self.calls = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None):
+        self.calls += 1
+        return f"Final Answer: {messages[-1]['content']} #{self.calls}"
+
+
+def _ocr_tool(store, client=None):
+    tool = PDFToOCRTool(cache=None, replay_store=store, retry_backoff=0.001,
+                        triage_settings=TriageSettings(enabled=False))
+    tool.client, tool.model_name = client, "fake-model"
+    return tool
+
+
+def test_ocr_recorded_then_replayed_without_client(tmp_path, make_pdf):
+    pdf = make_pdf(tmp_path / "doc.pdf", ["pagina 1", "pagina 2"])
+    client = CountingCompletions()
+    recorded = _ocr_tool(ReplayStore(str(tmp_path / "gravacoes"), MODE_RECORD), client)._run(pdf)
+    assert client.calls == 2 and recorded.count("PIX CHAMADA") == 2
+    assert len(os.listdir(tmp_path / "gravacoes")) == 2
+
+    # Máquina sem rede nem chave: mesmas respostas, nenhuma chamada ao cliente
+    replay = ReplayStore(str(tmp_path / "gravacoes"), MODE_REPLAY)
+    assert _ocr_tool(replay)._run(pdf) == recorded
+    assert client.calls == 2
+    assert replay.stats()["hits"] == 2
+
+    # Página que não foi gravada (outra imagem): falha alto, sem retentativas
+    other = make_pdf(tmp_path / "outro.pdf", ["pagina 3"])
+    with pytest.raises(ReplayMissError):
+        _ocr_tool(replay)._run(other)
+    assert replay.stats()["misses"] == 1
+
+
+def test_crew_llm_recorded_then_replayed(tmp_path):
+    messages = [{"role": "user", "content": "categorize"}]
+    inner = EchoLLM()
+    recorder = build_crew_llm(ReplayStore(str(tmp_path), MODE_RECORD), inner)
+    recorder.stop = ["\nObservation:"]  # como o executor do agente faz
+    assert recorder.call(messages) == "Final Answer: categorize #1"
+    assert inner.stop == ["\nObservation:"]
+
+    player = ReplayLLM(EchoLLM(), ReplayStore(str(tmp_path), MODE_REPLAY))
+    player.stop = ["\nObservation:"]
+    assert player.call(messages) == "Final Answer: categorize #1"
+    assert player.inner.calls == 0
+    with pytest.raises(ReplayMissError):
+        player.call([{"role": "user", "content": "outro prompt"}])
+
+
+def test_replay_is_off_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv("QUARTAVIA_REPLAY", raising=False)
+    assert get_replay_store() is None and build_crew_llm() is None
+
+    monkeypatch.setenv("QUARTAVIA_REPLAY", "replay")
+    monkeypatch.setenv("QUARTAVIA_REPLAY_DIR", str(tmp_path))
+    store = get_replay_store()
+    assert store.mode == MODE_REPLAY and store is get_replay_store()
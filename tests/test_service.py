@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+import time
+
+from starlette.testclient import TestClient
+
+from quartavia_ocr.models import ExtractionResult
+from quartavia_ocr.service import ExtractionService, ServiceSettings, create_app
+
+
+class FakeProcessors:
+    """Fábrica de processadores falsos; 'release' segura os jobs enquanto não for liberado."""
+
+    def __init__(self):
+        self.created = 0
+        self.sources = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.created += 1
+
+        def process(source, progress):
+            self.sources.append(source)
+            progress("step", {"type": "AgentAction"})
+            self.release.wait(5)
+            if source.endswith("quebrado.pdf"):
+                raise RuntimeError("PDF ilegível")
+            return ExtractionResult(success=True, bank_name="BTG", transactions_count=0)
+
+        return process
+
+
+URL = "https://example.com/extrato.pdf"
+
+
+def _client(workers=2, queue_size=4, max_upload_bytes=1024):
+    factory = FakeProcessors()
+    settings = ServiceSettings(url_hosts=("example.com",), max_upload_bytes=max_upload_bytes)
+    return TestClient(create_app(ExtractionService(workers, queue_size, factory), settings)), factory
+
+
+def _events(client, job_id):
+    with client.stream("GET", f"/jobs/{job_id}/events") as response:
+        body = "".join(response.iter_text())
+    return [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+
+
+def test_workers_are_warmed_once_and_jobs_complete():
+    client, factory = _client(workers=2)
+    with client:
+        assert factory.created == 2
+        job = client.post("/extract", json={"file_path": URL}).json()
+        assert _events(client, job["job_id"]) == ["queued", "started", "step", "done"]
+        status = client.get(job["status_url"]).json()
+        assert status["status"] == "done" and status["result"]["bank_name"] == "BTG"
+
+        failed = client.post("/extract", data={"file_path": "https://example.com/quebrado.pdf"}).json()
+        assert _events(client, failed["job_id"])[-1] == "failed"
+        assert client.get(failed["status_url"]).json()["result"]["error_message"] == "RuntimeError: PDF ilegível"
+        assert factory.created == 2
+
+
+def test_upload_is_saved_and_removed_after_the_job():
+    client, factory = _client()
+    with client:
+        job = client.post("/extract", files={"file": ("extrato.pdf", b"%PDF-1.4 fake", "application/pdf")}).json()
+        _events(client, job["job_id"])
+        upload_path = factory.sources[0]
+        assert upload_path.endswith(".pdf")
+        assert not os.path.exists(upload_path)
+
+
+def test_full_queue_returns_429():
+    client, factory = _client(workers=1, queue_size=1)
+    factory.release.clear()
+    with client:
+        first = client.post("/extract", json={"file_path": URL}).json()
+        while client.get(first["status_url"]).json()["status"] != "running":
+            time.sleep(0.01)
+        statuses = [client.post("/extract", json={"file_path": f"{URL}?n={n}"}).status_code for n in range(1, 4)]
+        # 1 em execução + 1 na fila; o resto é recusado
+        assert statuses == [202, 429, 429]
+        assert client.get("/health").json()["rejected"] == statuses.count(429)
+        factory.release.set()
+
+
+def test_bad_requests():
+    client, _ = _client()
+    with client:
+        assert client.post("/extract", json={}).status_code == 400
+        assert client.get("/jobs/nao-existe").status_code == 404
+
+
+def test_local_paths_and_unlisted_urls_are_refused():
+    client, factory = _client()
+    with client:
+        for source in ("/etc/passwd", "file:///etc/passwd", "http://example.com/extrato.pdf",
+                       "https://169.254.169.254/latest/meta-data", "https://example.com.evil.io/a.pdf"):
+            assert client.post("/extract", json={"file_path": source}).status_code == 400
+            assert client.post("/extract", data={"file_path": source}).status_code == 400
+        assert factory.sources == []
+
+
+def test_oversized_upload_returns_413(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    client, factory = _client(max_upload_bytes=1024)
+    with client:
+        response = client.post("/extract", files={"file": ("extrato.pdf", b"%PDF-1.4 " + b"0" * 4096, "application/pdf")})
+        assert response.status_code == 413
+        # Sem Content-Length (envio em partes), o corpo é cortado ao passar do limite
+        chunks = iter([b"--x\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.pdf\"\r\n\r\n"]
+                      + [b"0" * 512] * 8 + [b"\r\n--x--\r\n"])
+        response = client.post("/extract", content=chunks, headers={"content-type": "multipart/form-data; boundary=x"})
+        assert response.status_code == 413
+        assert factory.sources == [] and os.listdir(tmp_path) == []
@@ -0,0 +1,95 @@
+import asyncio
+import io
+import json
+
+from quartavia_ocr.chunked import ChunkSettings
+from quartavia_ocr.fast_path import PATH_CREW, PATH_DETERMINISTIC, REASON_NO_TOTALS, FastPathSettings
+from quartavia_ocr.models import ExtractionResult, Transaction
+from quartavia_ocr.streaming import astream_document, awrite_ndjson
+from quartavia_ocr.tools.custom_tool import HybridPDFExtractorTool, NativePDFExtractorTool
+
+
+def _transaction(day, description, value):
+    return Transaction(data=f"2025-10-{day:02d}", descricao=description, valor=value, categoria="DIVERSOS",
+                       tipo="despesa", subcategoria="Outros", parcelado=False)
+
+
+def test_reconciled_statement_streams_per_page(tmp_path, make_pdf):
+    header = [(40, 50, "BRADESCO - EXTRATO CONTA CORRENTE"), (40, 80, "Data"), (110, 80, "Histórico"),
+              (330, 80, "Crédito"), (410, 80, "Débito"), (490, 80, "Saldo")]
+    source = make_pdf(tmp_path / "extrato.pdf", [
+        header + [(40, 95, "01/10/2025"), (110, 95, "SALDO ANTERIOR"), (490, 95, "1.000,00"),
+                  (40, 110, "02/10/2025"), (110, 110, "PIX RECEBIDO FULANO"), (330, 110, "250,00"),
+                  (490, 110, "1.250,00")],
+        header + [(40, 95, "03/10/2025"), (110, 95, "COMPRA MERCADO"), (410, 95, "45,90"), (490, 95, "1.204,10"),
+                  (40, 110, "03/10/2025"), (110, 110, "SALDO ATUAL"), (490, 110, "1.204,10")],
+    ])
+    out = io.StringIO()
+
+    summary = asyncio.run(awrite_ndjson(source, out, fast_path_settings=FastPathSettings()))
+
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(e["first_page"], e["transaction"]["descricao"]) for e in events[:-1]] == [
+        (1, "PIX RECEBIDO FULANO"), (2, "COMPRA MERCADO")]
+    assert events[-1] == summary
+    assert summary == {"event": "summary", "success": True, "transactions_count": 2, "document_type": "extrato",
+                       "bank_name": "Bradesco", "extraction_path": PATH_DETERMINISTIC}
+
+
+def test_chunks_stream_in_order_before_the_document_finishes(tmp_path, make_pdf):
+    source = make_pdf(tmp_path / "fatura.pdf", [
+        [(40, 95, f"0{n}/10/2025 LOJA {n} R$ {n}0,00"), (40, 110, f"0{n}/10/2025 OUTRA {n} R$ {n}1,00")]
+        for n in (1, 2, 3)])
+    first_sent = asyncio.Event()
+    finished = []
+
+    async def processor(chunk):
+        if chunk.index == 2:
+            await first_sent.wait()  # a última parte só termina depois que a primeira foi transmitida
+        finished.append(chunk.index)
+        n = chunk.index + 1
+        rows = [_transaction(n, f"LOJA {n}", n * 10.0), _transaction(n, f"OUTRA {n}", n * 10.0 + 1)]
+        if chunk.overlap_lines:  # a sobreposição repete a última linha da parte anterior
+            rows.insert(0, _transaction(n - 1, f"OUTRA {n - 1}", (n - 1) * 10.0 + 1))
+        return ExtractionResult(success=True, document_type="credit-card-statement", transactions_count=len(rows),
+                                transactions=rows)
+
+    async def consume():
+        events = []
+        async for event in astream_document(
+                source, processor, ChunkSettings(pages_per_chunk=1, overlap_lines=1),
+                FastPathSettings(), HybridPDFExtractorTool(cache=None, native_tool=NativePDFExtractorTool(cache=None))):
+            events.append(event)
+            if event["event"] == "transaction" and not first_sent.is_set():
+                assert 2 not in finished
+                first_sent.set()
+        return events
+
+    events = asyncio.run(consume())
+
+    transactions = [(e["first_page"], e["transaction"]["descricao"]) for e in events[:-1]]
+    assert transactions == [(1, "LOJA 1"), (1, "OUTRA 1"), (2, "LOJA 2"), (2, "OUTRA 2"), (3, "LOJA 3"), (3, "OUTRA 3")]
+    assert [e["seq"] for e in events[:-1]] == list(range(1, 7))
+    summary = events[-1]
+    assert summary["transactions_count"] == 6 and summary["document_type"] == "credit-card-statement"
+    assert summary["extraction_path"] == PATH_CREW and summary["fallback_reason"] == REASON_NO_TOTALS
+
+
+def test_failed_extraction_still_ends_with_a_summary(tmp_path, make_pdf):
+    source = make_pdf(tmp_path / "fatura.pdf", [[(40, 95, "01/10/2025 LOJA 1 R$ 10,00")]])
+
+    class BrokenExtractor:
+        def extract_full_text(self, file_path):
+            raise RuntimeError("PDF corrompido")
+
+    async def consume():
+        return [event async for event in astream_document(source, chunk_settings=ChunkSettings(),
+                                                          fast_path_settings=FastPathSettings(enabled=False),
+                                                          extractor=BrokenExtractor())]
+
+    events = asyncio.run(consume())
+
+    assert len(events) == 1
+    summary, = events
+    assert summary["event"] == "summary" and summary["success"] is False and summary["transactions_count"] == 0
+    assert "PDF corrompido" in summary["error_message"]
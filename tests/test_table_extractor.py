@@ -0,0 +1,81 @@
+from quartavia_ocr.tools.table_extractor import (
+    BankLayout,
+    LAYOUTS,
+    extract_rows,
+    format_rows,
+    parse_amount,
+    register_layout,
+    rows_version,
+)
+
+
+def test_parse_amount():
+    assert parse_amount("1.234,56") == (1234.56, 1)
+    assert parse_amount("-R$10,00") == (10.0, -1)
+    assert parse_amount("(5,00)") == (5.0, -1)
+    assert parse_amount("12/10") is None
+
+
+def test_header_columns_credit_debit_and_balance(tmp_path, make_pdf):
+    pdf_path = make_pdf(tmp_path / "bradesco.pdf", [[
+        (40, 50, "BRADESCO - EXTRATO CONTA CORRENTE"),
+        (40, 80, "Data"), (110, 80, "Histórico"), (330, 80, "Crédito"), (410, 80, "Débito"), (490, 80, "Saldo"),
+        (40, 95, "01/10/2025"), (110, 95, "SALDO ANTERIOR"), (490, 95, "1.000,00"),
+        (40, 110, "02/10/2025"), (110, 110, "PIX RECEBIDO FULANO"), (330, 110, "250,00"), (490, 110, "1.250,00"),
+        (40, 125, "03/10/2025"), (110, 125, "COMPRA MERCADO"), (410, 125, "45,90"), (490, 125, "1.204,10"),
+        (110, 140, "TARIFA BANCARIA"), (410, 140, "12,00"), (490, 140, "1.192,10"),
+    ]])
+
+    rows, layout = extract_rows(pdf_path)
+
+    assert layout.name == "bradesco"
+    assert [(r.data, r.descricao, r.valor, r.tipo, r.saldo) for r in rows] == [
+        ("02/10/2025", "PIX RECEBIDO FULANO", 250.0, "receita", 1250.0),
+        ("03/10/2025", "COMPRA MERCADO", 45.9, "despesa", 1204.1),
+        ("03/10/2025", "TARIFA BANCARIA", 12.0, "despesa", 1192.1),
+    ]
+
+
+def test_isolated_value_on_next_line_and_card_sign(tmp_path, make_pdf):
+    pdf_path = make_pdf(tmp_path / "inter.pdf", [[
+        (40, 50, "Banco Inter - Fatura do cartão"),
+        (40, 80, "05 de out. 2025"), (150, 80, "SPOTIFY"), (450, 80, "R$ 21,90"),
+        (40, 95, "06 de out. 2025"), (150, 95, "LATAM AIRLINES PARC 2/10"),
+        (450, 110, "R$ 228,66"),
+        (40, 125, "07 de out. 2025"), (150, 125, "ESTORNO LOJA"), (450, 125, "-R$ 10,00"),
+        (40, 140, "08 de out. 2025"), (150, 140, "TOTALPASS"), (450, 140, "R$ 99,90"),
+        (40, 155, "09 de out. 2025"), (150, 155, "POSTO TOTAL"), (450, 155, "R$ 150,00"),
+        (40, 170, "Total da fatura"), (450, 170, "R$ 490,46"),
+        (40, 185, "Total de pagamentos"), (450, 185, "R$ 0,00"),
+    ]])
+
+    rows, layout = extract_rows(pdf_path)
+
+    assert layout.name == "inter"
+    assert format_rows(rows, layout).splitlines()[1:] == [
+        "1|05 de out. 2025|SPOTIFY|21.90|despesa",
+        "1|06 de out. 2025|LATAM AIRLINES PARC 2/10|228.66|despesa",
+        "1|07 de out. 2025|ESTORNO LOJA|10.00|receita",
+        # Comerciantes com 'total' no nome não são linhas de total
+        "1|08 de out. 2025|TOTALPASS|99.90|despesa",
+        "1|09 de out. 2025|POSTO TOTAL|150.00|despesa",
+    ]
+
+
+def test_custom_layout_can_be_registered(tmp_path, make_pdf):
+    pdf_path = make_pdf(tmp_path / "novo.pdf", [[
+        (40, 50, "BANCO EXEMPLO S.A."),
+        (40, 80, "01/10"), (110, 80, "ASSINATURA"), (400, 80, "9,90"),
+    ]])
+    version = rows_version()
+    register_layout(BankLayout(name="exemplo", detect_keywords=("banco exemplo",), positive_is_expense=True))
+    try:
+        rows, layout = extract_rows(pdf_path)
+        # Um template novo (ou outras palavras puladas) muda a chave do cache das linhas
+        assert rows_version() != version
+    finally:
+        LAYOUTS.pop("exemplo")
+    assert rows_version() == version
+
+    assert layout.name == "exemplo"
+    assert rows[0].tipo == "despesa"
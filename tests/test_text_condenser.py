@@ -0,0 +1,73 @@
+from quartavia_ocr.tools.text_condenser import CondenseSettings, collapse_whitespace, condense, condense_tool_output
+
+
+def _word_count(text):
+    return len(text.split())
+
+
+def _statement(pages):
+    blocks = []
+    for n in range(1, pages + 1):
+        blocks.append(f"--- PÁGINA {n} (BRUTO) ---")
+        blocks.append(f"BANCO EXEMPLO S.A.          Extrato mensal          página {n} de {pages}")
+        blocks.append("Data        Histórico                          Valor")
+        blocks.append(f"0{n}/10/2025    UBER TRIP                          15,00")
+        blocks.append(f"0{n}/10/2025    UBER TRIP                          15,00")
+        blocks.append("Lançamentos sujeitos a confirmação")
+        blocks.append("Ouvidoria 0800 727 9933")
+        blocks.append("")
+        blocks.append("")
+    return "\n".join(blocks)
+
+
+def test_collapse_whitespace_keeps_column_separation():
+    assert collapse_whitespace("  01/10    PIX ENVIADO\t\t\t  10,00  ") == "01/10  PIX ENVIADO  10,00"
+
+
+def test_repeated_headers_and_footers_kept_once_and_transactions_preserved():
+    result = condense(_statement(4), CondenseSettings(token_budget=0), count_tokens=_word_count)
+
+    assert result.text.count("BANCO EXEMPLO S.A.") == 1  # "página n de 4" não impede a repetição
+    assert result.text.count("Ouvidoria") == 1
+    # Vizinha de lançamento: pode ser a descrição dele, então não sai por repetição
+    assert result.text.count("Lançamentos sujeitos a confirmação") == 4
+    # Duas corridas iguais no mesmo dia continuam sendo duas transações
+    for n in range(1, 5):
+        assert result.text.count(f"0{n}/10/2025  UBER TRIP  15,00") == 2
+        assert f"--- PÁGINA {n} (BRUTO) ---" in result.text
+    assert "\n\n\n" not in result.text
+    assert result.tokens_after < result.tokens_before
+    assert result.truncated_pages == 0
+
+
+def test_multiline_transactions_keep_their_descriptions():
+    text = "\n".join(["--- PÁGINA 1 (BRUTO) ---"] + [
+        line for day, value in ((1, "10,00"), (2, "15,00"), (3, "20,00"))
+        for line in (f"0{day}/10", "PIX ENVIADO", "Fulano", value)])
+
+    result = condense(text, CondenseSettings(), count_tokens=_word_count)
+
+    assert result.text.count("PIX ENVIADO") == 3 and result.text.count("Fulano") == 3
+    assert result.text.endswith("03/10\nPIX ENVIADO\nFulano\n20,00")
+    assert CondenseSettings().token_budget == 0  # sem corte por padrão
+
+
+def test_token_budget_drops_non_data_lines_then_last_pages():
+    text = "--- DADOS OCR (teste) ---\n" + _statement(10)
+    result = condense(text, CondenseSettings(token_budget=60), count_tokens=_word_count)
+
+    assert result.tokens_after <= 60
+    assert result.truncated_pages > 0
+    assert "--- PÁGINA 1 (BRUTO) ---" in result.text
+    assert "--- PÁGINA 10 (BRUTO) ---" not in result.text
+    assert "Ouvidoria" not in result.text
+    assert "omitida(s) pelo limite de 60 tokens; a extração deste texto está incompleta" in result.text
+    assert "01/10/2025  UBER TRIP  15,00" in result.text
+
+
+def test_tool_output_errors_and_disabled_settings_pass_through():
+    settings = CondenseSettings()
+    assert condense_tool_output("Erro: arquivo não encontrado: x.pdf", settings) == "Erro: arquivo não encontrado: x.pdf"
+    raw = "a     b"
+    assert condense_tool_output(raw, CondenseSettings(enabled=False)) == raw
+    assert condense_tool_output(raw, settings) == "a  b"
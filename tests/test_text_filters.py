@@ -0,0 +1,47 @@
+import random
+
+from quartavia_ocr.tools.text_filters import (
+    DEFAULT_CLASSIFIER,
+    LABEL_FORCE_KEEP,
+    LABEL_IGNORED,
+    LABEL_NOISE,
+    clean_and_filter_lines,
+    keyword_trie_pattern,
+    legacy_clean_and_filter_lines,
+)
+
+FRAGMENTS = [
+    "PIX ENVIADO", "pix recebido", "Total da fatura", "saldo", "Saldo do dia", "R$ 1.234,56",
+    "r$12,00", "10 de outubro de 2025", "creditados", "TED", "Ouvidoria", "SUPERMERCADO",
+    "mercado", "12345678901234567890123", "5234****9876", "Drogaria", "iof", "juros",
+    "Movimentação", "İSTANBUL", "\t", "\r", " ", "  ", "..", "**", "07/10", "ANUIDADE",
+]
+
+
+def _random_line(rng):
+    return " ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 5)))
+
+
+def test_classifier_matches_legacy_filter_on_random_lines():
+    rng = random.Random(1234)
+    for _ in range(300):
+        lines = [_random_line(rng) for _ in range(rng.randint(0, 40))]
+        assert clean_and_filter_lines(lines) == legacy_clean_and_filter_lines(lines)
+
+
+def test_classifier_labels():
+    labels = dict(DEFAULT_CLASSIFIER.classify_lines([
+        "Tarifa de juros",
+        "Total da fatura R$ 10,00",
+        "23790 12345 60000 12345 78901",
+        "PIX ENVIADO Fulano R$ 5,00",
+    ]))
+    # 'tarifa' (KEEP) prevalece sobre 'juros' (IGNORE)
+    assert labels["Tarifa de juros"] == LABEL_FORCE_KEEP
+    assert labels["Total da fatura R$ 10,00"] == LABEL_IGNORED
+    assert labels["23790 12345 60000 12345 78901"] == LABEL_NOISE
+    assert DEFAULT_CLASSIFIER.filter_text("a\nPIX ENVIADO Fulano R$ 5,00\nolá") == "PIX ENVIADO Fulano R$ 5,00"
+
+
+def test_keyword_trie_pattern_drops_redundant_keywords():
+    assert keyword_trie_pattern(["total", "total da fatura", "subtotal"]) == "total"
@@ -0,0 +1,115 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from quartavia_ocr import tracing
+from quartavia_ocr.tools.custom_tool import NativePDFExtractorTool, PDFToOCRTool
+
+
+@pytest.fixture
+def memory_sink():
+    sink = tracing.configure(tracing.MemorySink())
+    yield sink
+    tracing.configure(None)
+
+
+def _write_statement(make_pdf, path, pages=3):
+    make_pdf(path, [[(72, 72, "EXTRATO CONTA CORRENTE"),
+                     (72, 100, f"0{n + 1}/10/2025 PIX ENVIADO SEGREDO CLIENTE R$ 1{n},00")] for n in range(pages)],
+             fontsize=10)
+
+
+def test_disabled_tracing_returns_shared_noop_span():
+    tracing.configure(None)
+    with tracing.span("qualquer", page=1) as span:
+        span.set("bytes", 10)
+        span.add("pages")
+    assert span is tracing.NOOP_SPAN
+
+
+def test_native_extraction_emits_nested_stage_spans_without_text(tmp_path, memory_sink, make_pdf):
+    pdf_path = str(tmp_path / "extrato.pdf")
+    _write_statement(make_pdf, pdf_path)
+
+    NativePDFExtractorTool(cache=None)._run(pdf_path)
+
+    extract = memory_sink.named("extract")
+    assert [s["attributes"]["tool"] for s in extract] == ["native"]
+    pages = memory_sink.named("extract_page")
+    assert [s["attributes"]["page"] for s in pages] == [1, 2, 3]
+    assert all(s["parent_id"] == extract[0]["span_id"] for s in pages)
+    assert memory_sink.named("open")[0]["attributes"]["library"] == "pdfplumber"
+    assert len(memory_sink.named("filter")) == 3
+    assert memory_sink.totals["pages_extracted"] == 3
+    assert memory_sink.totals["chars_extracted"] > 0
+    # Só métricas: o conteúdo do extrato não vai para o trace
+    assert "SEGREDO" not in json.dumps(memory_sink.spans)
+
+
+def test_ocr_spans_count_calls_and_retries(tmp_path, memory_sink, make_pdf):
+    pdf_path = str(tmp_path / "scan.pdf")
+    _write_statement(make_pdf, pdf_path, pages=2)
+    attempts = {}
+
+    def create(model, messages, **kwargs):
+        url = messages[0]["content"][1]["image_url"]["url"]
+        attempts[url] = attempts.get(url, 0) + 1
+        if len(attempts) == 1 and attempts[url] == 1:
+            raise RuntimeError("falha simulada")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="01/10/2025 PIX R$ 1,00"))])
+
+    tool = PDFToOCRTool(cache=None, retry_backoff=0.001)
+    tool.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    tool.model_name = "fake-model"
+    tool._run(pdf_path)
+
+    ocr_pages = memory_sink.named("ocr_page")
+    assert sorted(s["attributes"]["page"] for s in ocr_pages) == [1, 2]
+    assert memory_sink.totals["ocr_calls"] == 3
+    assert memory_sink.totals["ocr_retries"] == 1
+    assert len(memory_sink.named("render_page")) == 2
+    assert memory_sink.totals["render_bytes"] > 0
+
+
+def test_jsonl_sink_writes_spans_and_counter_totals(tmp_path):
+    trace_path = tmp_path / "trace.jsonl"
+    tracing.configure("jsonl", path=str(trace_path))
+    try:
+        with tracing.span("download", host="exemplo") as span:
+            span.add("download_bytes", 1024)
+        with pytest.raises(ValueError):
+            with tracing.span("open"):
+                raise ValueError("pdf inválido")
+        tracing.count("cache_hits")
+    finally:
+        tracing.configure(None)
+
+    records = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").splitlines()]
+    assert [r["type"] for r in records] == ["span", "span", "counters"]
+    assert records[0]["counters"] == {"download_bytes": 1024}
+    assert records[1]["status"] == "error"
+    assert records[2]["totals"] == {"download_bytes": 1024, "cache_hits": 1}
+
+
+def test_opentelemetry_sink_exports_spans():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    sink = tracing.OpenTelemetrySink()
+    sink.tracer = provider.get_tracer("quartavia_ocr")
+    tracing.configure(sink)
+    try:
+        with tracing.span("crew_kickoff", entry="teste"):
+            with tracing.span("render_page", page=1) as span:
+                span.add("render_bytes", 500)
+    finally:
+        tracing.configure(None)
+
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert spans["render_page"].parent.span_id == spans["crew_kickoff"].context.span_id
+    assert spans["render_page"].attributes["render_bytes"] == 500